@@ -8,49 +8,145 @@
 # - Average Turn Around Time
 # FCFS executes processes strictly in the order they arrive,
 # without preemption or priority.
+#
+# The calculations are done by a NumPy engine (fcfs_schedule) working on
+# whole arrays at once, so it also handles workloads of millions of jobs;
+# fcfs_schedule_file streams such workloads from a CSV file in chunks.
 # ---------------------------------------------------------------
 
-def fcfs_scheduling(processes):
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Processes read from a file at a time by fcfs_schedule_file
+CHUNK_SIZE = 1_000_000
+
+
+# FCFS ENGINE
+
+def fcfs_schedule(burst_times, arrival_times=None, start_time=0):
+    """
+    Vectorized FCFS engine.
+    Input: burst_times -> array-like of burst times, in FCFS (arrival) order
+           arrival_times -> optional array-like of arrival times (default: all at time 0)
+           start_time -> time at which the CPU becomes free (used to chain chunks)
+    Returns a dict of NumPy arrays: start, completion, waiting, turnaround.
+
+    WHY: without idle time, each process completes at the running total of
+    the burst times (a cumulative sum). With arrival times the CPU may wait
+    for a process: completion_i = max(arrival_i, completion_{i-1}) + burst_i,
+    which unrolls to cumsum(burst) + running maximum of (arrival - burst
+    total before the process), computed with np.maximum.accumulate.
+    """
+    bursts = np.asarray(burst_times, dtype=np.float64)
+    if arrival_times is None:
+        arrivals = np.zeros(len(bursts))
+    else:
+        arrivals = np.asarray(arrival_times, dtype=np.float64)
+        if arrivals.shape != bursts.shape:
+            raise ValueError("burst_times and arrival_times must have the same length")
+        if np.any(np.diff(arrivals) < 0):
+            raise ValueError("FCFS needs the processes in arrival order")
+
+    burst_total = np.cumsum(bursts)
+    # Latest idle gap so far: how much later than back-to-back the CPU runs
+    delay = np.maximum.accumulate(arrivals - (burst_total - bursts))
+    completion = burst_total + np.maximum(delay, start_time)
+    start = completion - bursts
+
+    return {
+        "start": start,
+        "completion": completion,
+        "waiting": start - arrivals,          # WT = start - arrival
+        "turnaround": completion - arrivals,  # TAT = WT + BT
+    }
+
+
+def fcfs_schedule_file(path, chunk_size=CHUNK_SIZE, output_path=None):
+    """
+    Run FCFS over a CSV workload file without loading it whole.
+    The file has a burst_time column, optionally process and arrival_time
+    columns, with rows in arrival order. Each chunk starts when the previous
+    one leaves the CPU free. Per-process results are appended to output_path
+    (CSV) when given. Returns a summary dict (count, averages, maxima, makespan).
+    """
+    clock = 0.0
+    last_arrival = -np.inf
+    count = 0
+    total_waiting = total_turnaround = 0.0
+    max_waiting = 0.0
+
+    for i, chunk in enumerate(pd.read_csv(path, chunksize=chunk_size)):
+        arrivals = chunk["arrival_time"].to_numpy() if "arrival_time" in chunk else None
+        if arrivals is not None and len(arrivals) and arrivals[0] < last_arrival:
+            raise ValueError("FCFS needs the processes in arrival order")
+
+        if len(chunk) == 0:
+            continue
+        result = fcfs_schedule(chunk["burst_time"].to_numpy(), arrivals, start_time=clock)
+
+        count += len(chunk)
+        total_waiting += float(result["waiting"].sum())
+        total_turnaround += float(result["turnaround"].sum())
+        max_waiting = max(max_waiting, float(result["waiting"].max()))
+        clock = float(result["completion"][-1])
+        if arrivals is not None:
+            last_arrival = arrivals[-1]
+
+        if output_path is not None:
+            out = pd.DataFrame(result)
+            if "process" in chunk:
+                out.insert(0, "process", chunk["process"].to_numpy())
+            out.to_csv(output_path, mode="w" if i == 0 else "a", header=(i == 0), index=False)
+
+    return {
+        "processes": count,
+        "average_waiting": total_waiting / count if count else 0.0,
+        "average_turnaround": total_turnaround / count if count else 0.0,
+        "max_waiting": max_waiting,
+        "makespan": clock,
+    }
+
+
+def fcfs_scheduling(processes, display=True):
     """
     FCFS Scheduling Function
     Input: processes -> list of tuples in the form (process_number, burst_time)
     Example: [(1, 5), (2, 8), (3, 12)]
+    Returns the waiting and turnaround times (lists) and their averages;
+    the table is printed when display is True.
 
     WHY: FCFS assigns the CPU to the first process that arrives and continues
     until completion before starting the next process.
     """
-
-    waiting_times = []       # Stores Waiting Time (time a process waits before execution)
-    turnaround_times = []    # Stores Turn Around Time (WT + Burst Time)
-
-    waiting_times.append(0)  # The first process always starts immediately → WT = 0
-
-    # Compute Waiting Time for each process
-    for i in range(1, len(processes)):
-        # Waiting Time = previous process’s waiting time + previous process’s burst time
-        previous_burst_sum = waiting_times[i-1] + processes[i-1][1]
-        waiting_times.append(previous_burst_sum)
-
-    # Compute Turn Around Time for each process
-    for i in range(len(processes)):
-        tat = processes[i][1] + waiting_times[i]  # TAT = BT + WT
-        turnaround_times.append(tat)
+    result = fcfs_schedule([bt for _, bt in processes])
+    waiting_times = result["waiting"].astype(int).tolist()        # Time a process waits before execution
+    turnaround_times = result["turnaround"].astype(int).tolist()  # WT + Burst Time
 
     # Compute averages for class requirements
     avg_waiting = sum(waiting_times) / len(processes)
     avg_turnaround = sum(turnaround_times) / len(processes)
 
-    # Display results in a formatted table
-    print("\n--- FCFS CPU Scheduling ---\n")
-    print("Process\tBurst Time\tWaiting Time\tTurnaround Time")
-    print("----------------------------------------------------------")
-    for i in range(len(processes)):
-        p, bt = processes[i]
-        print(f"P{p}\t\t{bt}\t\t{waiting_times[i]}\t\t{turnaround_times[i]}")
+    if display:
+        # Display results in a formatted table
+        print("\n--- FCFS CPU Scheduling ---\n")
+        print("Process\tBurst Time\tWaiting Time\tTurnaround Time")
+        print("----------------------------------------------------------")
+        for i in range(len(processes)):
+            p, bt = processes[i]
+            print(f"P{p}\t\t{bt}\t\t{waiting_times[i]}\t\t{turnaround_times[i]}")
+
+        print("\nAverage Waiting Time:", round(avg_waiting, 2))
+        print("Average Turnaround Time:", round(avg_turnaround, 2))
+        print("\n----------------------------------------------------------\n")
 
-    print("\nAverage Waiting Time:", round(avg_waiting, 2))
-    print("Average Turnaround Time:", round(avg_turnaround, 2))
-    print("\n----------------------------------------------------------\n")
+    return {
+        "waiting_times": waiting_times,
+        "turnaround_times": turnaround_times,
+        "average_waiting": avg_waiting,
+        "average_turnaround": avg_turnaround,
+    }
 
 
 
@@ -63,9 +159,6 @@ default_processes = [
     (3, 12)
 ]
 
-# Run FCFS using default values to satisfy assignment requirements
-fcfs_scheduling(default_processes)
-
 
 
 # USER INPUT FUNCTION
@@ -84,4 +177,14 @@ def user_input_fcfs():
 
 
 
-user_input_fcfs()
+# Run only when executed as a script, so the engine can be imported
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # python CW2_M01079167_CST1500.py workload.csv [results.csv]
+        summary = fcfs_schedule_file(sys.argv[1], output_path=sys.argv[2] if len(sys.argv) > 2 else None)
+        for key, value in summary.items():
+            print(f"{key}: {round(value, 2)}")
+    else:
+        # Run FCFS using default values to satisfy assignment requirements
+        fcfs_scheduling(default_processes)
+        user_input_fcfs()
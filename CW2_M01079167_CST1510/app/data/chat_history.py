@@ -0,0 +1,81 @@
+from datetime import datetime
+from app.data.db import connect_readonly
+from app.data.metrics import DB_WRITES
+
+# Number of messages shown (and sent as context) before "Load older" is used
+CHAT_WINDOW = 20
+
+
+def append_messages(conn, username, domain, messages):
+    """
+    Append a batch of chat messages for a user on one domain page.
+    messages is a list of (role, text) tuples, role being "user" or "model".
+    The whole batch is written with a single executemany and one commit.
+    """
+    created_at = datetime.now().isoformat()
+    cursor = conn.cursor()
+    cursor.executemany("""
+        INSERT INTO chat_messages (username, domain, role, text, created_at)
+        VALUES (?, ?, ?, ?, ?)
+    """, [(username, domain, role, text, created_at) for role, text in messages])
+
+    # Commit the transaction to save changes permanently
+    conn.commit()
+    DB_WRITES.labels(table="chat_messages").inc(len(messages))
+
+
+def get_recent_messages(conn, username, domain, limit=CHAT_WINDOW):
+    """
+    Retrieve the most recent `limit` messages of a user on one domain page.
+    Returns a list of dicts (id, role, text) in chronological order.
+    Only `limit` rows are read thanks to the (username, domain, id) index.
+    """
+    if conn is None:
+        conn = connect_readonly()
+
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT id, role, text FROM chat_messages
+        WHERE username = ? AND domain = ?
+        ORDER BY id DESC
+        LIMIT ?
+    """, (username, domain, limit))
+    rows = cursor.fetchall()
+
+    # Rows come newest first, the chat shows them oldest first
+    return [{"id": row[0], "role": row[1], "text": row[2]} for row in reversed(rows)]
+
+
+def count_messages(conn, username, domain):
+    """
+    Return how many messages a user has stored on one domain page.
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT COUNT(*) FROM chat_messages WHERE username = ? AND domain = ?",
+        (username, domain)
+    )
+    return cursor.fetchone()[0]
+
+
+def clear_chat_history(conn, username, domain):
+    """
+    Delete the stored conversation of a user on one domain page.
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        "DELETE FROM chat_messages WHERE username = ? AND domain = ?",
+        (username, domain)
+    )
+    conn.commit()
+
+
+def to_gemini_contents(messages):
+    """
+    Convert stored messages into the `contents` format expected by Gemini.
+    Leading model messages are dropped because a conversation sent to
+    Gemini must start with a user turn.
+    """
+    while messages and messages[0]["role"] != "user":
+        messages = messages[1:]
+    return [{"role": m["role"], "parts": [{"text": m["text"]}]} for m in messages]
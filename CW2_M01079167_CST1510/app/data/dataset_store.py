@@ -0,0 +1,148 @@
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+from app.data.db import BASE_DIR
+from app.data.profiler import compute_content_hash
+
+# pyarrow is optional: without it datasets are stored as raw CSV
+# (still deduplicated by content hash) and read back with pandas
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.ipc as pa_ipc
+except ImportError:
+    pa = None
+
+# Stored files live under DATA/dataset_store/<first 2 hash chars>/<hash>.<ext>
+STORE_DIR = BASE_DIR / "DATA" / "dataset_store"
+
+# CSV bytes parsed per block; column types are inferred from the first block
+CSV_BLOCK_SIZE = 16 << 20
+
+# Rows per Arrow record batch when reading back without pyarrow
+PANDAS_BATCH_ROWS = 100_000
+
+
+def _path_for(content_hash, extension):
+    return STORE_DIR / content_hash[:2] / f"{content_hash}.{extension}"
+
+
+def dataset_path(content_hash):
+    """
+    Return the path of a stored dataset, or None if it is not in the store.
+    """
+    for extension in ("arrow", "csv"):
+        path = _path_for(content_hash, extension)
+        if path.exists():
+            return path
+    return None
+
+
+# ---------------------------
+# STORE A DATASET
+# ---------------------------
+def store_dataset(source, content_hash=None):
+    """
+    Put a CSV file (path or binary file object) into the store and return
+    (content_hash, path). The file is converted to the Arrow IPC columnar
+    format in streaming record batches, written to a temporary file and
+    moved into place, so readers never see a partial file.
+    Storing bytes that are already in the store only costs the hash.
+    """
+    if content_hash is None:
+        content_hash = compute_content_hash(source)
+
+    existing = dataset_path(content_hash)
+    if existing is not None:
+        return content_hash, existing
+
+    extension = "arrow" if pa is not None else "csv"
+    path = _path_for(content_hash, extension)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    is_path = isinstance(source, (str, os.PathLike))
+    if not is_path:
+        source.seek(0)
+
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            if pa is None:
+                if is_path:
+                    with open(source, "rb") as f:
+                        shutil.copyfileobj(f, tmp)
+                else:
+                    shutil.copyfileobj(source, tmp)
+            else:
+                reader = pa_csv.open_csv(
+                    source,
+                    read_options=pa_csv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+                    # Empty text fields are missing values, as with pandas.read_csv
+                    convert_options=pa_csv.ConvertOptions(strings_can_be_null=True)
+                )
+                with pa_ipc.new_file(tmp, reader.schema) as writer:
+                    for batch in reader:
+                        writer.write_batch(batch)
+        os.replace(tmp_name, path)
+    except Exception:
+        os.remove(tmp_name)
+        raise
+    finally:
+        if not is_path:
+            source.seek(0)
+
+    return content_hash, path
+
+
+# ---------------------------
+# READ A DATASET
+# ---------------------------
+def open_dataset(content_hash):
+    """
+    Open a stored dataset as a pyarrow Table backed by a memory map:
+    nothing is parsed or copied, pages are read from disk when a column
+    is actually used. Requires pyarrow and an Arrow file in the store.
+    """
+    path = dataset_path(content_hash)
+    if path is None:
+        raise FileNotFoundError(f"Dataset {content_hash} is not in the store.")
+    if pa is None or path.suffix != ".arrow":
+        raise RuntimeError("Memory-mapped reads need pyarrow and a dataset stored in Arrow format.")
+    return pa_ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+
+
+def iter_dataset_batches(content_hash, columns=None):
+    """
+    Yield the dataset as pandas DataFrames, one record batch at a time,
+    optionally restricted to some columns. Works with both storage formats.
+    """
+    path = dataset_path(content_hash)
+    if path is None:
+        raise FileNotFoundError(f"Dataset {content_hash} is not in the store.")
+
+    if path.suffix == ".arrow" and pa is not None:
+        reader = pa_ipc.open_file(pa.memory_map(str(path), "r"))
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            if columns is not None:
+                batch = batch.select(columns)
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=PANDAS_BATCH_ROWS, usecols=columns)
+
+
+def read_dataset_head(content_hash, rows=100):
+    """
+    Return the first rows of a stored dataset as a DataFrame,
+    reading only the record batches needed.
+    """
+    parts = []
+    remaining = rows
+    for batch in iter_dataset_batches(content_hash):
+        parts.append(batch.head(remaining))
+        remaining -= len(parts[-1])
+        if remaining <= 0:
+            break
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
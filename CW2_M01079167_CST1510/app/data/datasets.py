@@ -1,11 +1,17 @@
 import pandas as pd
-from app.data.db import connect_database
+from app.data.db import connect_database, connect_readonly
+from app.data.metrics import CSV_IMPORT_ROWS, CSV_IMPORT_SECONDS, DB_READ_ROWS, DB_READ_SECONDS, DB_WRITES
 
 def migrate_datasets_from_csv(file_path="DATA/datasets_metadata.csv", conn=None):
     """
     Load datasets from a CSV file and insert them into the datasets_metadata table.
     Expected columns: dataset_id, name, description, rows, columns, size
     """
+    with CSV_IMPORT_SECONDS.labels(table="datasets_metadata", source="migration").time():
+        _migrate_datasets(file_path, conn)
+
+
+def _migrate_datasets(file_path, conn):
     # Flag to know if we created a local connection (so we can close it later)
     local_conn = False
     if conn is None:
@@ -40,6 +46,7 @@ def migrate_datasets_from_csv(file_path="DATA/datasets_metadata.csv", conn=None)
                 row.get("columns"),      # Number of columns in the dataset
                 row.get("size"),         # Size of the dataset (e.g., MB)
             ))
+        CSV_IMPORT_ROWS.labels(table="datasets_metadata", source="migration", result="inserted").inc(len(df))
 
     # Close the connection if it was created locally
     if local_conn:
@@ -53,28 +60,32 @@ def get_all_datasets(conn=None):
     """
     if conn is None:
         # Create a new connection if none is provided
-        conn = connect_database()
+        conn = connect_readonly()
 
-    cursor = conn.cursor()
-    # Select all rows from the metadata table
-    cursor.execute("SELECT * FROM datasets_metadata")
-    rows = cursor.fetchall()
+    with DB_READ_SECONDS.labels(table="datasets_metadata").time():
+        cursor = conn.cursor()
+        # Select all rows from the metadata table
+        cursor.execute("SELECT * FROM datasets_metadata")
+        rows = cursor.fetchall()
+    DB_READ_ROWS.labels(table="datasets_metadata").inc(len(rows))
 
     # Convert query results into a DataFrame with proper column names
     df = pd.DataFrame(rows, columns=[col[0] for col in cursor.description])
     return df
 
 
-def insert_dataset(conn, dataset_id, name, description):
+def insert_dataset(conn, dataset_id, name, description, rows=None, columns=None, size=None, content_hash=None):
     """
     Insert a new dataset entry into the datasets_metadata table.
-    Only dataset_id, name, and description are provided here.
+    rows, columns and size are optional; when the dataset file was profiled,
+    pass the measured values and the content_hash linking it to its profile.
     """
     cursor = conn.cursor()
     cursor.execute("""
-        INSERT INTO datasets_metadata (dataset_id, name, description)
-        VALUES (?, ?, ?)
-    """, (dataset_id, name, description))
+        INSERT INTO datasets_metadata (dataset_id, name, description, rows, columns, size, content_hash)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (dataset_id, name, description, rows, columns, size, content_hash))
 
     # Commit the transaction to save changes permanently
-    conn.commit()
\ No newline at end of file
+    conn.commit()
+    DB_WRITES.labels(table="datasets_metadata").inc()
@@ -1,24 +1,130 @@
+import os
 import sqlite3
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 
+from app.data import metrics, query_profiler
+
 # Always use the absolute path of the project root
 # BASE_DIR points to the root directory of the project (3 levels up from this file)
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
 # DB_PATH builds the full path to the SQLite database file inside the DATA folder
-DB_PATH = BASE_DIR / "DATA" / "intelligence_platform.db"
+# APP_DB_PATH points the whole app at another database (benchmarks, load tests)
+DB_PATH = Path(os.environ.get("APP_DB_PATH", BASE_DIR / "DATA" / "intelligence_platform.db"))
+
+# Databases already switched to WAL by this process (the mode is stored in the file)
+_wal_enabled = set()
+
+# Open read snapshot of each page session (Streamlit may run a session's reruns in different threads)
+_snapshots = {}
 
-def connect_database(db_path=DB_PATH):
+
+def _enable_wal(conn, db_path):
+    """
+    Switch the database to write-ahead logging, once per process: readers
+    then see the last committed state without waiting for the writer, and
+    the writer commits without waiting for readers.
+    """
+    if str(db_path) in _wal_enabled:
+        return
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        _wal_enabled.add(str(db_path))
+    except sqlite3.OperationalError as err:
+        # Another connection holds a lock: the next connection tries again
+        print(f"[db] Could not enable WAL yet: {err}")
+
+
+def _connect(database, **kwargs):
+    # check_same_thread=False allows the connection to be shared across threads
+    metrics.DB_CONNECTIONS.inc()
+    if query_profiler.is_enabled():
+        # Statement timings, latency histograms and slow-query plans (APP_SQL_PROFILE=1)
+        return sqlite3.connect(database, check_same_thread=False, factory=query_profiler.ProfiledConnection, **kwargs)
+    return sqlite3.connect(database, check_same_thread=False, **kwargs)
+
+
+def connect_database(db_path=None):
     """
     Connect to SQLite database using absolute path.
     Returns a connection object that can be used to interact with the database.
+    Without db_path, DB_PATH is read at call time, so it can be changed at runtime.
+    This is the write path; readers use connect_readonly() or open_read_snapshot().
     """
+    if db_path is None:
+        db_path = DB_PATH
     try:
         # Establish connection to the SQLite database
-        # check_same_thread=False allows the connection to be shared across threads
-        return sqlite3.connect(str(db_path), check_same_thread=False)
+        conn = _connect(str(db_path))
+        _enable_wal(conn, db_path)
+        return conn
     except sqlite3.Error as err:
         # If connection fails, print an error message for debugging
         print(f"[db] Error connecting to database: {err}")
         # Re-raise the exception so the calling code knows something went wrong
         raise
+
+
+def connect_readonly(db_path=None):
+    """
+    Read-only connection (mode=ro URI) for the get_* readers and the
+    aggregations. It can never take the write lock, so with WAL a long
+    import or the writer thread never stalls it.
+    """
+    if db_path is None:
+        db_path = DB_PATH
+    try:
+        return _connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+    except sqlite3.Error as err:
+        print(f"[db] Error opening read-only connection: {err}")
+        raise
+
+
+def open_read_snapshot(key=None, db_path=None):
+    """
+    Read-only connection holding one read transaction, for one page rerun:
+    every query of the rerun sees the database as of the rerun start, even
+    while writes are committed. key identifies the page session (default:
+    the current thread); a snapshot the session left open is closed first.
+    Pages use read_snapshot(), which always ends it.
+    """
+    key = threading.get_ident() if key is None else key
+    close_read_snapshot(key)
+    conn = connect_readonly(db_path)
+    try:
+        conn.execute("BEGIN")
+        conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()  # The first read fixes the snapshot
+    except sqlite3.Error:
+        conn.close()
+        raise
+    _snapshots[key] = conn
+    return conn
+
+
+def close_read_snapshot(key=None, conn=None):
+    """
+    End the read snapshot of a session (default: the current thread), if
+    any. With conn, only that snapshot is ended: a newer rerun of the same
+    session keeps its own.
+    """
+    key = threading.get_ident() if key is None else key
+    if conn is None or _snapshots.get(key) is conn:
+        conn = _snapshots.pop(key, conn)
+    if conn is not None:
+        conn.close()
+
+
+@contextmanager
+def read_snapshot(key=None, db_path=None):
+    """
+    open_read_snapshot() for the body of a page: the snapshot (and its read
+    transaction, which would keep the WAL from being checkpointed) is ended
+    however the body exits, st.rerun() and st.stop() included.
+    """
+    conn = open_read_snapshot(key, db_path)
+    try:
+        yield conn
+    finally:
+        close_read_snapshot(key, conn)
@@ -0,0 +1,93 @@
+import numpy as np
+from app.data.sketches import MinHasher, estimate_jaccard
+
+# Two descriptions at least this similar (Jaccard on 5-character shingles)
+# are treated as the same incident reported again
+DUPLICATE_THRESHOLD = 0.8
+
+# 128 hash functions in 16 bands of 8 rows: pairs around 0.7 similarity and
+# above almost always share a bucket, pairs below 0.5 almost never do
+_hasher = MinHasher(num_perm=128, shingle_size=5, bands=16)
+
+
+def _candidate_ids(cursor, band_keys):
+    """
+    Incidents sharing at least one LSH bucket with the given band keys.
+    Each band is an indexed lookup, never a scan of all signatures.
+    """
+    candidates = set()
+    for band, key in enumerate(band_keys):
+        cursor.execute(
+            "SELECT incident_id FROM incident_lsh_buckets WHERE band = ? AND bucket = ?",
+            (band, key)
+        )
+        candidates.update(row[0] for row in cursor.fetchall())
+    return candidates
+
+
+# ---------------------------
+# ASSIGN DUPLICATE CLUSTER
+# ---------------------------
+def assign_duplicate_cluster(conn, incident_id, description):
+    """
+    Link an incident to its near-duplicates.
+    The description's MinHash signature is compared only with the incidents
+    found in the same LSH buckets; if one is similar enough the incident joins
+    its cluster, otherwise it starts a new cluster named after its own ID.
+    The signature and buckets are stored for future lookups.
+    Returns the cluster_id. The caller commits.
+    """
+    incident_id = str(incident_id)
+    cursor = conn.cursor()
+
+    if description is None or not str(description).strip():
+        # Nothing to compare: the incident is its own cluster
+        cursor.execute("UPDATE cyber_incidents SET cluster_id = ? WHERE incident_id = ?", (incident_id, incident_id))
+        return incident_id
+
+    signature = _hasher.signature(description)
+    band_keys = _hasher.band_hashes(signature)
+
+    best_id, best_similarity = None, DUPLICATE_THRESHOLD
+    candidates = _candidate_ids(cursor, band_keys) - {incident_id}
+    for candidate_id in candidates:
+        cursor.execute("SELECT signature FROM incident_signatures WHERE incident_id = ?", (candidate_id,))
+        row = cursor.fetchone()
+        if row is None:
+            continue
+        similarity = estimate_jaccard(signature, np.frombuffer(row[0], dtype=np.uint32))
+        if similarity >= best_similarity:
+            best_id, best_similarity = candidate_id, similarity
+
+    cluster_id = incident_id
+    if best_id is not None:
+        cursor.execute("SELECT cluster_id FROM cyber_incidents WHERE incident_id = ?", (best_id,))
+        row = cursor.fetchone()
+        cluster_id = row[0] if row and row[0] else best_id
+
+    cursor.execute(
+        "INSERT OR REPLACE INTO incident_signatures (incident_id, signature) VALUES (?, ?)",
+        (incident_id, signature.tobytes())
+    )
+    cursor.executemany(
+        "INSERT INTO incident_lsh_buckets (band, bucket, incident_id) VALUES (?, ?, ?)",
+        [(band, key, incident_id) for band, key in enumerate(band_keys)]
+    )
+    cursor.execute("UPDATE cyber_incidents SET cluster_id = ? WHERE incident_id = ?", (cluster_id, incident_id))
+    return cluster_id
+
+
+def assign_missing_clusters(conn):
+    """
+    Cluster every incident that has no cluster_id yet, in insertion order
+    (after a CSV migration, or once on a database created before clustering).
+    Returns the number of incidents processed.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT incident_id, description FROM cyber_incidents WHERE cluster_id IS NULL ORDER BY rowid")
+    rows = cursor.fetchall()
+    for incident_id, description in rows:
+        assign_duplicate_cluster(conn, incident_id, description)
+    conn.commit()
+    return len(rows)
+
@@ -1,12 +1,21 @@
 import pandas as pd  # Import pandas for data manipulation and CSV handling
-from app.data.db import connect_database  # Import the database connection function
+from app.data.db import connect_database, connect_readonly  # Import the database connection function
+from app.data.metrics import CSV_IMPORT_ROWS, CSV_IMPORT_SECONDS, DB_READ_ROWS, DB_READ_SECONDS, DB_WRITES
+from app.data.dedup import assign_duplicate_cluster, assign_missing_clusters  # Near-duplicate clustering
+from app.data.summaries import get_total_count  # Row totals kept by the summary triggers
 
 def migrate_incidents_from_csv(file_path="DATA/cyber_incidents.csv", conn=None):
     """
     Load incidents from a CSV file and insert them into the cyber_incidents table.
     Expected columns: incident_id, timestamp, severity, category, status, description
     Duplicate incident_id values will be ignored.
+    Near-duplicate descriptions are grouped under a common cluster_id.
     """
+    with CSV_IMPORT_SECONDS.labels(table="cyber_incidents", source="migration").time():
+        _migrate_incidents(file_path, conn)
+
+
+def _migrate_incidents(file_path, conn):
     df = pd.read_csv(file_path)  # Load the CSV file into a pandas DataFrame
 
     local_conn = False  # Track whether we need to close the connection later
@@ -16,6 +25,7 @@ def migrate_incidents_from_csv(file_path="DATA/cyber_incidents.csv", conn=None):
 
     cursor = conn.cursor()  # Create a cursor to execute SQL commands
 
+    inserted = 0
     for _, row in df.iterrows():  # Loop through each row in the DataFrame
         cursor.execute("""
             INSERT OR IGNORE INTO cyber_incidents (incident_id, timestamp, severity, category, status, description)
@@ -28,6 +38,11 @@ def migrate_incidents_from_csv(file_path="DATA/cyber_incidents.csv", conn=None):
             row.get("status"),        # Current status (e.g., Open, In Progress)
             row.get("description"),   # Description of the incident
         ))
+        inserted += cursor.rowcount  # 0 when the incident_id already exists
+    CSV_IMPORT_ROWS.labels(table="cyber_incidents", source="migration", result="inserted").inc(inserted)
+    CSV_IMPORT_ROWS.labels(table="cyber_incidents", source="migration", result="skipped").inc(len(df) - inserted)
+
+    assign_missing_clusters(conn)  # Link the new incidents to their near-duplicates (LSH lookup)
 
     if local_conn:
         conn.commit()  # Save changes to the database if we opened the connection
@@ -39,26 +54,155 @@ def get_all_incidents(conn=None):
     and return them as a pandas DataFrame.
     """
     if conn is None:
-        conn = connect_database()  # Create a new database connection if none is provided
+        conn = connect_readonly()  # Create a new database connection if none is provided
 
-    cursor = conn.cursor()  # Create a cursor to execute SQL commands
-    cursor.execute("SELECT * FROM cyber_incidents")  # Fetch all incident records
-    rows = cursor.fetchall()  # Retrieve all rows from the query result
+    with DB_READ_SECONDS.labels(table="cyber_incidents").time():
+        cursor = conn.cursor()  # Create a cursor to execute SQL commands
+        cursor.execute("SELECT * FROM cyber_incidents")  # Fetch all incident records
+        rows = cursor.fetchall()  # Retrieve all rows from the query result
+    DB_READ_ROWS.labels(table="cyber_incidents").inc(len(rows))
 
     df = pd.DataFrame(rows, columns=[col[0] for col in cursor.description])  # Convert rows to DataFrame with column names
     return df  # Return the DataFrame containing all incidents
 
-def insert_incident(conn, incident_id, timestamp, severity, category, status, description):
+def get_incidents_page(conn, page=1, page_size=50):
+    """
+    Retrieve one page of incidents, most recent first.
+    Returns (DataFrame, total number of incidents).
+    Rows are read in the order of the timestamp index, so a page never sorts
+    the whole table; the total comes from the summary table.
+    """
+    offset = (max(page, 1) - 1) * page_size  # Rows of the previous pages
+
+    with DB_READ_SECONDS.labels(table="cyber_incidents").time():
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT * FROM cyber_incidents
+            ORDER BY timestamp DESC
+            LIMIT ? OFFSET ?
+        """, (page_size, offset))
+        rows = cursor.fetchall()
+    DB_READ_ROWS.labels(table="cyber_incidents").inc(len(rows))
+
+    df = pd.DataFrame(rows, columns=[col[0] for col in cursor.description])
+    return df, get_total_count(conn, "incidents")
+
+def get_incident_clusters_page(conn, page=1, page_size=50):
+    """
+    Retrieve one page of near-duplicate clusters, most recent first: one row
+    per cluster (its latest report) with a 'duplicates' column holding the
+    size of the whole cluster, not only of the reports on this page.
+    Returns (DataFrame, total number of clusters).
+    Rows are read in timestamp-index order; whether a row is its cluster's
+    latest and the cluster size are lookups on the cluster_id index.
+    """
+    offset = (max(page, 1) - 1) * page_size  # Clusters of the previous pages
+
+    with DB_READ_SECONDS.labels(table="cyber_incidents").time():
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT i.*,
+                   CASE WHEN i.cluster_id IS NULL THEN 1 ELSE (
+                       SELECT COUNT(*) FROM cyber_incidents AS d WHERE d.cluster_id = i.cluster_id
+                   ) END AS duplicates
+            FROM cyber_incidents AS i
+            WHERE i.cluster_id IS NULL OR NOT EXISTS (
+                SELECT 1 FROM cyber_incidents AS n
+                WHERE n.cluster_id = i.cluster_id
+                  AND (COALESCE(n.timestamp, '') > COALESCE(i.timestamp, '')
+                       OR (COALESCE(n.timestamp, '') = COALESCE(i.timestamp, '') AND n.rowid > i.rowid))
+            )
+            ORDER BY i.timestamp DESC
+            LIMIT ? OFFSET ?
+        """, (page_size, offset))
+        rows = cursor.fetchall()
+        columns = [col[0] for col in cursor.description]
+
+        # Distinct clusters, counted on the cluster_id index (unclustered incidents count alone)
+        cursor.execute("""
+            SELECT (SELECT COUNT(DISTINCT cluster_id) FROM cyber_incidents)
+                 + (SELECT COUNT(*) FROM cyber_incidents WHERE cluster_id IS NULL)
+        """)
+        total_clusters = cursor.fetchone()[0]
+    DB_READ_ROWS.labels(table="cyber_incidents").inc(len(rows))
+
+    return pd.DataFrame(rows, columns=columns), total_clusters
+
+def incident_exists(conn, incident_id):
+    """
+    Return True if an incident with this ID is already stored (primary key lookup).
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM cyber_incidents WHERE incident_id = ?", (incident_id,))
+    return cursor.fetchone() is not None
+
+def insert_incident(conn, incident_id, timestamp, severity, category, status, description, created_by=None):
     """
     Insert a single new incident entry into the cyber_incidents table.
+    The incident is linked to its near-duplicates through cluster_id.
+    created_by is the username of the analyst adding it.
     Returns the ID of the newly inserted row.
     """
     cursor = conn.cursor()  # Create a cursor to execute SQL commands
     cursor.execute("""
-        INSERT INTO cyber_incidents (incident_id, timestamp, severity, category, status, description)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (incident_id, timestamp, severity, category, status, description))  # Insert the new incident into the table
+        INSERT INTO cyber_incidents (incident_id, timestamp, severity, category, status, description, created_by)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (incident_id, timestamp, severity, category, status, description, created_by))  # Insert the new incident
+    row_id = cursor.lastrowid  # Keep the row ID before other statements run
+
+    assign_duplicate_cluster(conn, incident_id, description)  # Same transaction as the insert
 
     conn.commit()  # Save the changes to the database
+    DB_WRITES.labels(table="cyber_incidents").inc()
+
+    return row_id  # Return the ID of the inserted row for confirmation or logging
+
+
+def insert_incident_if_new(conn, incident_id, timestamp, severity, category, status, description, created_by=None):
+    """
+    Insert an incident unless its ID is already stored. The check and the
+    insert run in the same transaction (on the writer thread, see
+    write_queue), so two uploads of the same ID cannot both insert it.
+    Returns the ID of the inserted row, or None when the ID exists.
+    """
+    if incident_exists(conn, incident_id):
+        return None
+    return insert_incident(conn, incident_id, timestamp, severity, category, status, description, created_by)
+
+
+def delete_incident(conn, incident_id, username):
+    """
+    Delete an incident added by this user. Summaries, the search index and
+    the near-duplicate tables are updated by their triggers.
+    Returns True if it was deleted, False if it does not exist or was
+    added by someone else.
+    """
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM cyber_incidents WHERE incident_id = ? AND created_by = ?", (incident_id, username))
+    deleted = cursor.rowcount > 0
+    conn.commit()
+    if deleted:
+        DB_WRITES.labels(table="cyber_incidents").inc()
+    return deleted
+
+
+def get_incident_alerts(conn=None, limit=50):
+    """
+    Retrieve the most recent incident spikes flagged by the anomaly job
+    and return them as a pandas DataFrame (newest day first).
+    """
+    if conn is None:
+        conn = connect_readonly()  # Create a new database connection if none is provided
 
-    return cursor.lastrowid  # Return the ID of the inserted row for confirmation or logging
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT bucket AS day, dimension, value, count, ROUND(baseline, 1) AS baseline,
+               ROUND(zscore, 1) AS zscore, ROUND(ewma_zscore, 1) AS ewma_zscore, method
+        FROM incident_alerts
+        ORDER BY bucket DESC
+        LIMIT ?
+    """, (limit,))  # Alerts are precomputed, the page only reads a few rows
+    rows = cursor.fetchall()
+
+    df = pd.DataFrame(rows, columns=[col[0] for col in cursor.description])  # Convert rows to DataFrame with column names
+    return df  # Return the DataFrame containing the alerts
@@ -0,0 +1,360 @@
+import bisect
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.data import query_profiler
+
+# Exposition endpoint, served by start_metrics_server() next to Streamlit.
+# Bound to localhost by default; APP_METRICS_PORT=0 disables it.
+METRICS_HOST = os.environ.get("APP_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("APP_METRICS_PORT", "9464"))
+
+# Default histogram buckets, in seconds (upper bounds; +Inf is implicit)
+DEFAULT_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value):
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+# ---------------------------
+# METRIC TYPES
+# ---------------------------
+class _Metric:
+    """
+    A metric family: one child (set of values) per combination of label values.
+    Metrics without labels are used directly, the others through labels().
+    """
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.children = {}
+        self.lock = threading.Lock()
+
+    def labels(self, **labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self.children.get(key)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} has labels {self.labelnames}, use labels()")
+        return self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self):
+        """
+        Yield (suffix, label values, extra label, value) for the exposition.
+        """
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, values, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_label_text(self.labelnames, values, extra)} {_format_value(value)}")
+        return lines
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        if amount < 0:
+            raise ValueError("Counters can only go up")
+        with self.lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    """
+    Monotonic total (logins, rows imported, errors...). Exposed with a _total suffix.
+    """
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+    def samples(self):
+        for values, child in list(self.children.items()):
+            yield "_total", values, None, child.value
+
+
+class _GaugeChild:
+    def __init__(self):
+        self.value = 0.0
+        self.function = None
+        self.lock = threading.Lock()
+
+    def set(self, value):
+        with self.lock:
+            self.value = float(value)
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set_function(self, function):
+        # Read the value at scrape time instead of keeping it up to date
+        self.function = function
+
+    def get(self):
+        if self.function is not None:
+            try:
+                return float(self.function())
+            except Exception:
+                return float("nan")
+        return self.value
+
+
+class Gauge(_Metric):
+    """
+    Value that goes up and down (queue depth, rows in a table...).
+    """
+
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._default().set(value)
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+    def dec(self, amount=1):
+        self._default().dec(amount)
+
+    def set_function(self, function):
+        self._default().set_function(function)
+
+    def samples(self):
+        for values, child in list(self.children.items()):
+            yield "", values, None, child.get()
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        with self.lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        """
+        Observe the duration (seconds) of the with block, even when it raises.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values (latencies in seconds, batch sizes...)
+    in cumulative buckets, with their sum and count.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=None):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = sorted(buckets if buckets is not None else DEFAULT_BUCKETS)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+    def samples(self):
+        for values, child in list(self.children.items()):
+            with child.lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + [float("inf")], counts):
+                cumulative += count
+                yield "_bucket", values, ("le", _format_value(bound)), cumulative
+            yield "_sum", values, None, total
+            yield "_count", values, None, cumulative
+
+
+# ---------------------------
+# REGISTRY
+# ---------------------------
+class Registry:
+    """
+    Every metric of the process, by name. Modules declare their metrics at
+    import time with counter()/gauge()/histogram(), which return the
+    existing metric when the module is imported again (Streamlit reruns).
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, cls, name, documentation, labelnames=(), **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered with another type or labels")
+            return metric
+
+    def render(self):
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        with self.lock:
+            metrics = sorted(self.metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name, documentation, labelnames=()):
+    return REGISTRY.register(Counter, name, documentation, labelnames)
+
+
+def gauge(name, documentation, labelnames=()):
+    return REGISTRY.register(Gauge, name, documentation, labelnames)
+
+
+def histogram(name, documentation, labelnames=(), buckets=None):
+    return REGISTRY.register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+
+# ---------------------------
+# SHARED APPLICATION METRICS
+# ---------------------------
+# Declared here so the data layer, the services and the pages use the same families
+DB_CONNECTIONS = counter("app_db_connections_opened", "SQLite connections opened by connect_database()")
+DB_STATEMENT_SECONDS = histogram(
+    "app_db_statement_seconds", "SQL statement latency (recorded when APP_SQL_PROFILE=1)", ["verb"]
+)
+DB_READ_SECONDS = histogram("app_db_read_seconds", "Latency of the data-layer table readers", ["table"])
+DB_READ_ROWS = counter("app_db_read_rows", "Rows returned by the data-layer table readers", ["table"])
+DB_WRITES = counter("app_db_writes", "Rows written by the data-layer insert functions", ["table"])
+CSV_IMPORT_ROWS = counter("app_csv_import_rows", "Rows processed by CSV imports", ["table", "source", "result"])
+CSV_IMPORT_SECONDS = histogram("app_csv_import_seconds", "Duration of CSV imports", ["table", "source"])
+
+
+
+def _on_sql(shape, elapsed_ms):
+    # Labelled by statement verb only: one series per shape would explode cardinality
+    DB_STATEMENT_SECONDS.labels(verb=shape.split(" ", 1)[0].upper() or "?").observe(elapsed_ms / 1000)
+
+
+query_profiler.STATS.listeners.append(_on_sql)
+
+PROCESS_START = time.time()
+gauge("app_process_start_time_seconds", "Unix time the app process started").set(PROCESS_START)
+
+
+# ---------------------------
+# EXPOSITION SERVER
+# ---------------------------
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would flood the Streamlit console
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(host=None, port=None):
+    """
+    Serve /metrics from a daemon thread, once per process (safe to call
+    from every rerun). Returns the bound (host, port), or None when the
+    endpoint is disabled (port 0) or the port is taken.
+    """
+    global _server
+    host = METRICS_HOST if host is None else host
+    port = METRICS_PORT if port is None else port
+
+    with _server_lock:
+        if _server is not None:
+            return _server.server_address[:2]
+        if not port:
+            return None
+        try:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError as e:
+            print(f"[metrics] Could not serve metrics on {host}:{port}: {e}")
+            return None
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        print(f"[metrics] Serving Prometheus metrics on http://{host}:{_server.server_address[1]}/metrics")
+        return _server.server_address[:2]
@@ -1,6 +1,7 @@
 import sqlite3
 import pandas as pd
-from app.data.db import connect_database
+from app.data.db import connect_readonly
+from app.data.metrics import DB_READ_ROWS, DB_READ_SECONDS, DB_WRITES
 
 def get_all_operations(conn=None):
     """
@@ -9,12 +10,14 @@ def get_all_operations(conn=None):
     """
     if conn is None:
         # Create a new database connection if none is provided
-        conn = connect_database()
+        conn = connect_readonly()
 
-    cursor = conn.cursor()
-    # Select all rows from the it_operations table
-    cursor.execute("SELECT * FROM it_operations")
-    rows = cursor.fetchall()
+    with DB_READ_SECONDS.labels(table="it_operations").time():
+        cursor = conn.cursor()
+        # Select all rows from the it_operations table
+        cursor.execute("SELECT * FROM it_operations")
+        rows = cursor.fetchall()
+    DB_READ_ROWS.labels(table="it_operations").inc(len(rows))
 
     # Convert query results into a DataFrame with proper column names
     df = pd.DataFrame(rows, columns=[col[0] for col in cursor.description])
@@ -38,3 +41,4 @@ def insert_operation(conn, op_id, name, status, notes):
 
     # Commit the transaction to save changes permanently
     conn.commit()
+    DB_WRITES.labels(table="it_operations").inc()
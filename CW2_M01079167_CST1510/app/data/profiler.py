@@ -0,0 +1,194 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+from app.data.sketches import HyperLogLog
+from app.data.write_queue import run_write
+
+# Rows parsed at a time: memory stays bounded whatever the file size
+CHUNK_ROWS = 100_000
+
+# Block size used when hashing file contents
+HASH_BLOCK_SIZE = 1 << 20
+
+
+# ---------------------------
+# CONTENT HASH
+# ---------------------------
+def compute_content_hash(source):
+    """
+    SHA-256 of a file's bytes, read block by block.
+    source is a path or a binary file object (e.g. a Streamlit upload),
+    which is rewound afterwards so it can be read again.
+    """
+    digest = hashlib.sha256()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+    else:
+        source.seek(0)
+        for block in iter(lambda: source.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+        source.seek(0)
+    return digest.hexdigest()
+
+
+def _source_size(source):
+    """
+    Size in bytes of a path or a seekable file object.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    size = source.seek(0, os.SEEK_END)
+    source.seek(0)
+    return size
+
+
+# ---------------------------
+# COLUMN STATISTICS
+# ---------------------------
+class ColumnProfile:
+    """
+    Running statistics of one column, updated chunk by chunk.
+    Chunks are typed independently by pandas, so the final type is the
+    most general one seen: a column that is numeric in one chunk and text
+    in another is reported as text, without numeric statistics.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.nulls = 0
+        self.kinds = set()      # dtype kinds seen: 'b', 'i', 'u', 'f', 'M', 'O'...
+        self.minimum = None
+        self.maximum = None
+        self.total = 0.0        # Sum of the numeric values (for the mean)
+        self.distinct = HyperLogLog()
+
+    def update(self, series):
+        values = series.dropna()
+        self.count += len(series)
+        self.nulls += len(series) - len(values)
+        if values.empty:
+            return
+
+        kind = values.dtype.kind
+        self.kinds.add(kind)
+        self.distinct.add_hashes(pd.util.hash_pandas_object(values, index=False).to_numpy())
+
+        if kind in "iuf":
+            low, high = values.min(), values.max()
+            self.minimum = low if self.minimum is None else min(self.minimum, low)
+            self.maximum = high if self.maximum is None else max(self.maximum, high)
+            self.total += float(values.sum())
+
+    @property
+    def type(self):
+        if not self.kinds:
+            return "empty"
+        if self.kinds <= {"i", "u"}:
+            return "integer"
+        if self.kinds <= {"i", "u", "f"}:
+            return "float"
+        if self.kinds == {"b"}:
+            return "boolean"
+        return "string"
+
+    def to_dict(self):
+        numeric = self.type in ("integer", "float")
+        non_null = self.count - self.nulls
+        return {
+            "column": self.name,
+            "type": self.type,
+            "nulls": self.nulls,
+            "distinct": self.distinct.count(),
+            "min": float(self.minimum) if numeric else None,
+            "max": float(self.maximum) if numeric else None,
+            "mean": self.total / non_null if numeric and non_null else None,
+        }
+
+
+# ---------------------------
+# PROFILE A DATASET FILE
+# ---------------------------
+def profile_dataset(source, chunk_rows=CHUNK_ROWS):
+    """
+    Stream a CSV file (path or binary file object) in chunks and return its
+    profile: row and column counts, size in bytes and per-column statistics
+    (type, null count, approximate distinct count, min/max/mean).
+    Only one chunk is held in memory at a time.
+    """
+    if not isinstance(source, (str, os.PathLike)):
+        source.seek(0)
+
+    columns = {}
+    rows = 0
+    for chunk in pd.read_csv(source, chunksize=chunk_rows, low_memory=False):
+        rows += len(chunk)
+        for name in chunk.columns:
+            columns.setdefault(name, ColumnProfile(name)).update(chunk[name])
+
+    if not isinstance(source, (str, os.PathLike)):
+        source.seek(0)
+
+    return {
+        "rows": rows,
+        "columns": len(columns),
+        "size": _source_size(source),
+        "column_profiles": [profile.to_dict() for profile in columns.values()],
+    }
+
+
+# ---------------------------
+# STORED PROFILES
+# ---------------------------
+def get_dataset_profile(conn, content_hash):
+    """
+    Return the stored profile of a file's contents, or None.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT profile FROM dataset_profiles WHERE content_hash = ?", (content_hash,))
+    row = cursor.fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def _store_profile(conn, content_hash, profile):
+    conn.execute("""
+        INSERT OR REPLACE INTO dataset_profiles (content_hash, rows, columns, size, profile, profiled_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (content_hash, profile["rows"], profile["columns"], profile["size"],
+          json.dumps(profile), datetime.now().isoformat()))
+    conn.commit()
+
+
+def profile_and_store(conn, source):
+    """
+    Profile a dataset file and store the result keyed by its content hash.
+    A file whose exact bytes were already profiled is not parsed again.
+    conn is only read (it can be a read-only snapshot): the file is
+    profiled here and only the insert runs on the writer thread.
+    Returns (content_hash, profile, already_known).
+    """
+    content_hash = compute_content_hash(source)
+    profile = get_dataset_profile(conn, content_hash)
+    if profile is not None:
+        return content_hash, profile, True
+
+    profile = profile_dataset(source)
+    run_write(_store_profile, content_hash, profile)
+    return content_hash, profile, False
+
+
+# Command line: python -m app.data.profiler path/to/file.csv
+if __name__ == "__main__":
+    import sys
+    from app.data.db import connect_database
+
+    conn = connect_database()
+    content_hash, profile, known = profile_and_store(conn, sys.argv[1])
+    conn.close()
+    print(f"{'Already profiled' if known else 'Profiled'}: {content_hash}")
+    print(pd.DataFrame(profile["column_profiles"]).to_string(index=False))
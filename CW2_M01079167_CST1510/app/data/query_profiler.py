@@ -0,0 +1,307 @@
+import bisect
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+# Profiling is off unless APP_SQL_PROFILE=1 (or enable_profiling() is called)
+ENABLED = os.environ.get("APP_SQL_PROFILE", "0") == "1"
+
+# Statements slower than this (milliseconds) go to the slow-query log with their plan
+SLOW_QUERY_MS = float(os.environ.get("APP_SLOW_QUERY_MS", "100"))
+
+# Upper bounds (milliseconds) of the latency histogram buckets; the last one is open
+LATENCY_BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+
+# Entries kept in the slow-query log (oldest dropped first)
+SLOW_LOG_SIZE = 200
+
+_STRING_LITERAL = re.compile(r"[xX]?'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+# Statements that have a query plan worth logging (not DDL or transaction control)
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+def statement_shape(sql):
+    """
+    Normalize a statement so that executions differing only by their
+    values are counted together: literals become ?, IN lists of any
+    length become (?...), whitespace is collapsed.
+    """
+    shape = _STRING_LITERAL.sub("?", sql)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _PLACEHOLDER_LIST.sub("(?...)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+# ---------------------------
+# STATISTICS REGISTRY
+# ---------------------------
+class QueryStats:
+    """
+    Per-shape counters shared by every profiled connection of the process.
+    """
+
+    def __init__(self):
+        self.shapes = {}    # shape -> dict of counters
+        self.slow_log = deque(maxlen=SLOW_LOG_SIZE)
+        self.lock = threading.Lock()
+        self.listeners = []     # Called with (shape, elapsed_ms) after each timed statement
+        self.captures = []      # Lists filled by capture_plans() blocks
+
+    def _entry(self, shape):
+        entry = self.shapes.get(shape)
+        if entry is None:
+            entry = self.shapes[shape] = {
+                "calls": 0,         # Executions through execute()/executemany()
+                "traced": 0,        # Statements run by SQLite (includes trigger bodies)
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "fetch_ms": 0.0,    # Time spent fetching rows after execute()
+                "histogram": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+            }
+        return entry
+
+    def record(self, shape, elapsed_ms):
+        with self.lock:
+            entry = self._entry(shape)
+            entry["calls"] += 1
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["histogram"][bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+        for listener in self.listeners:
+            listener(shape, elapsed_ms)
+
+    def record_fetch(self, shape, elapsed_ms):
+        with self.lock:
+            self._entry(shape)["fetch_ms"] += elapsed_ms
+
+    def record_trace(self, sql):
+        shape = statement_shape(sql)
+        with self.lock:
+            self._entry(shape)["traced"] += 1
+
+    def reset(self):
+        with self.lock:
+            self.shapes.clear()
+            self.slow_log.clear()
+
+
+STATS = QueryStats()
+
+
+def _explain(conn, sql, params):
+    """
+    EXPLAIN QUERY PLAN of a statement, as a list of plan lines.
+    Runs on a plain cursor so it is not profiled itself.
+    """
+    try:
+        cursor = sqlite3.Connection.cursor(conn, sqlite3.Cursor)
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return [row[3] for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        return [f"(plan unavailable: {e})"]
+
+
+def _timed(conn, cursor_method, sql, params, many=False):
+    """
+    Run a statement through the original cursor method and record its latency.
+    Slow statements are logged with their query plan.
+    """
+    started = time.perf_counter()
+    try:
+        return cursor_method(sql, params)
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        shape = statement_shape(sql)
+        STATS.record(shape, elapsed_ms)
+        explainable = shape.upper().startswith(_EXPLAINABLE)
+        # For executemany, the plan is explained with the first parameter set
+        plan_params = (next(iter(params), ()) if many else params) if params is not None else ()
+        if STATS.captures and explainable:
+            captured = {"statement": shape, "plan": _explain(conn, sql, plan_params)}
+            with STATS.lock:
+                for capture in STATS.captures:
+                    capture.append(captured)
+        if elapsed_ms >= SLOW_QUERY_MS:
+            entry = {
+                "at": datetime.now().isoformat(timespec="seconds"),
+                "ms": round(elapsed_ms, 2),
+                "statement": shape,
+                "plan": _explain(conn, sql, plan_params) if explainable else [],
+            }
+            with STATS.lock:
+                STATS.slow_log.append(entry)
+            print(f"[sql] Slow query ({entry['ms']} ms): {shape[:200]} | plan: {'; '.join(entry['plan'])}")
+
+
+# ---------------------------
+# PROFILED CONNECTION
+# ---------------------------
+class ProfiledCursor(sqlite3.Cursor):
+    """
+    Cursor timing execute()/executemany() and the row fetches that follow.
+    """
+
+    _shape = None
+
+    def execute(self, sql, params=()):
+        self._shape = statement_shape(sql)
+        _timed(self.connection, super().execute, sql, params)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._shape = statement_shape(sql)
+        _timed(self.connection, super().executemany, sql, seq_of_params, many=True)
+        return self
+
+    def _fetch(self, method, *args):
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            if self._shape is not None:
+                STATS.record_fetch(self._shape, (time.perf_counter() - started) * 1000)
+
+    def fetchone(self):
+        return self._fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._fetch(super().fetchmany, self.arraysize if size is None else size)
+
+    def fetchall(self):
+        return self._fetch(super().fetchall)
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """
+    Connection whose cursors are ProfiledCursor. The SQLite trace callback
+    also counts every statement SQLite actually runs, including the ones
+    fired by triggers, which never go through a Python cursor.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.set_trace_callback(STATS.record_trace)
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+
+def enable_profiling(slow_query_ms=None):
+    """
+    Profile every connection opened from now on by connect_database().
+    """
+    global ENABLED, SLOW_QUERY_MS
+    ENABLED = True
+    if slow_query_ms is not None:
+        SLOW_QUERY_MS = slow_query_ms
+
+
+def is_enabled():
+    return ENABLED
+
+
+@contextmanager
+def capture_plans():
+    """
+    Collect the statements run by profiled connections inside the with
+    block, each with its query plan (list of {"statement", "plan"} dicts).
+    Used by the query-plan guard to check the plans of the real code paths.
+    """
+    captured = []
+    with STATS.lock:
+        STATS.captures.append(captured)
+    try:
+        yield captured
+    finally:
+        with STATS.lock:
+            STATS.captures.remove(captured)
+
+
+# ---------------------------
+# REPORTS
+# ---------------------------
+def _percentile(histogram, q):
+    """
+    Upper bound of the histogram bucket holding the q-th fraction of calls.
+    """
+    total = sum(histogram)
+    if not total:
+        return None
+    threshold = q * total
+    cumulative = 0
+    for bound, count in zip(LATENCY_BUCKETS_MS + [float("inf")], histogram):
+        cumulative += count
+        if cumulative >= threshold:
+            return bound
+    return float("inf")
+
+
+def query_report():
+    """
+    One row per statement shape, slowest total time first:
+    calls, traced executions, total/mean/max latency, approximate p50/p95
+    (histogram bucket bounds) and fetch time, in milliseconds.
+    """
+    with STATS.lock:
+        shapes = {shape: dict(entry, histogram=list(entry["histogram"])) for shape, entry in STATS.shapes.items()}
+
+    records = []
+    for shape, entry in shapes.items():
+        records.append({
+            "statement": shape,
+            "calls": entry["calls"],
+            "traced": entry["traced"],
+            "total_ms": round(entry["total_ms"], 2),
+            "mean_ms": round(entry["total_ms"] / entry["calls"], 3) if entry["calls"] else None,
+            "p50_ms": _percentile(entry["histogram"], 0.5),
+            "p95_ms": _percentile(entry["histogram"], 0.95),
+            "max_ms": round(entry["max_ms"], 2),
+            "fetch_ms": round(entry["fetch_ms"], 2),
+        })
+    columns = ["statement", "calls", "traced", "total_ms", "mean_ms", "p50_ms", "p95_ms", "max_ms", "fetch_ms"]
+    return pd.DataFrame(records, columns=columns).sort_values("total_ms", ascending=False).reset_index(drop=True)
+
+
+def slow_queries():
+    """
+    The slow-query log (most recent last) as a list of dicts with the plan lines.
+    """
+    with STATS.lock:
+        return list(STATS.slow_log)
+
+
+def dump_report(path=None):
+    """
+    Per-shape statistics with the full histograms and the slow-query log,
+    as a JSON string; also written to path when one is given.
+    """
+    with STATS.lock:
+        shapes = {shape: dict(entry, histogram=list(entry["histogram"])) for shape, entry in STATS.shapes.items()}
+    report = json.dumps({
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "bucket_bounds_ms": LATENCY_BUCKETS_MS,
+        "statements": shapes,
+        "slow_queries": slow_queries(),
+    }, indent=2)
+    if path is not None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(report)
+    return report
@@ -1,4 +1,20 @@
 import sqlite3
+from app.data.search import create_search_tables
+from app.data.summaries import create_summary_tables
+from app.data.sla import rebuild_sla_sketches
+
+
+def add_column_if_missing(cursor, table, column, definition):
+    """
+    Add a column to an existing table if it is not there yet.
+    CREATE TABLE IF NOT EXISTS does not change tables that already exist,
+    so new columns must be added with ALTER TABLE on older databases.
+    """
+    cursor.execute(f"PRAGMA table_info({table})")
+    existing = {row[1] for row in cursor.fetchall()}
+    if column not in existing:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
 
 def create_all_tables(conn: sqlite3.Connection):
     """
@@ -39,9 +55,47 @@ def create_all_tables(conn: sqlite3.Connection):
             severity TEXT,
             category TEXT,
             status TEXT,
-            description TEXT
+            description TEXT,
+            cluster_id TEXT,
+            created_by TEXT
         )
     """)
+    # - cluster_id: incident ID of the first report of a group of near-duplicates
+    add_column_if_missing(cursor, "cyber_incidents", "cluster_id", "TEXT")
+    # - created_by: username of the analyst who added the incident (only they can delete it)
+    add_column_if_missing(cursor, "cyber_incidents", "created_by", "TEXT")
+    # Index used by time range filters (hourly trend charts)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_incidents_timestamp ON cyber_incidents (timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_incidents_cluster ON cyber_incidents (cluster_id)")
+
+    # ---------------------------
+    # NEAR-DUPLICATE DETECTION TABLES
+    # ---------------------------
+    # incident_signatures: MinHash signature of each incident description (BLOB of uint32)
+    # incident_lsh_buckets: one row per (band, bucket) of each signature, looked up
+    #                       to find candidate duplicates without comparing every incident
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS incident_signatures (
+            incident_id TEXT PRIMARY KEY,
+            signature BLOB NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS incident_lsh_buckets (
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            incident_id TEXT NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_lsh_buckets ON incident_lsh_buckets (band, bucket)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_lsh_buckets_incident ON incident_lsh_buckets (incident_id)")
+    # Deleted incidents must not be offered as duplicates any more
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS dedup_incidents_ad AFTER DELETE ON cyber_incidents BEGIN
+            DELETE FROM incident_signatures WHERE incident_id = old.incident_id;
+            DELETE FROM incident_lsh_buckets WHERE incident_id = old.incident_id;
+        END
+    """)
 
     # ---------------------------
     # DATASETS METADATA TABLE
@@ -60,7 +114,43 @@ def create_all_tables(conn: sqlite3.Connection):
             description TEXT,
             rows INTEGER,
             columns INTEGER,
-            size INTEGER
+            size INTEGER,
+            content_hash TEXT
+        )
+    """)
+    # - content_hash: SHA-256 of the uploaded file, links the dataset to its profile
+    add_column_if_missing(cursor, "datasets_metadata", "content_hash", "TEXT")
+
+    # ---------------------------
+    # DATASET PROFILES TABLE
+    # ---------------------------
+    # Statistics computed from the actual file contents (see app/data/profiler.py),
+    # keyed by content hash so identical uploads are profiled only once.
+    # - profile: JSON with the per-column statistics
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS dataset_profiles (
+            content_hash TEXT PRIMARY KEY,
+            rows INTEGER,
+            columns INTEGER,
+            size INTEGER,
+            profile TEXT NOT NULL,
+            profiled_at TEXT
+        )
+    """)
+
+    # ---------------------------
+    # DATASET PREVIEWS TABLE
+    # ---------------------------
+    # Cached reservoir sample and column histograms of a stored dataset file
+    # (see app/services/preview_service.py), keyed by content hash.
+    # - sample: JSON (pandas "split" orient), histograms: JSON by column
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS dataset_previews (
+            content_hash TEXT PRIMARY KEY,
+            rows INTEGER,
+            sample TEXT NOT NULL,
+            histograms TEXT NOT NULL,
+            created_at TEXT
         )
     """)
 
@@ -74,6 +164,8 @@ def create_all_tables(conn: sqlite3.Connection):
     # - priority: urgency level (low, medium, high)
     # - assigned_to: user responsible for handling the ticket
     # - created_at: timestamp when the ticket was created
+    # - description: full text of the problem reported
+    # - resolution_time_hours: hours taken to resolve the ticket (SLA analytics)
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS it_tickets (
             ticket_id TEXT PRIMARY KEY,
@@ -81,9 +173,18 @@ def create_all_tables(conn: sqlite3.Connection):
             status TEXT,
             priority TEXT,
             assigned_to TEXT,
-            created_at TEXT
+            created_at TEXT,
+            description TEXT,
+            resolution_time_hours REAL
         )
     """)
+    # Databases created before these columns existed need them added
+    add_column_if_missing(cursor, "it_tickets", "description", "TEXT")
+    add_column_if_missing(cursor, "it_tickets", "resolution_time_hours", "REAL")
+    # Index used by time range filters (hourly trend charts)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tickets_created_at ON it_tickets (created_at)")
+    # Index used to load the open tickets (workload of each assignee) without a full scan
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tickets_status ON it_tickets (status, assigned_to, priority)")
 
     # ---------------------------
     # SESSIONS TABLE
@@ -117,5 +218,130 @@ def create_all_tables(conn: sqlite3.Connection):
         )
     """)
 
+    # ---------------------------
+    # CHAT MESSAGES TABLE
+    # ---------------------------
+    # Stores the Gemini chat history of each user, per domain page:
+    # - id: auto-increment integer, gives the message order
+    # - username: owner of the conversation
+    # - domain: page the conversation belongs to (cybersecurity, datascience, itoperations)
+    # - role: "user" or "model"
+    # - text: message content
+    # - created_at: timestamp when the message was stored
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS chat_messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            domain TEXT NOT NULL,
+            role TEXT NOT NULL,
+            text TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        )
+    """)
+    # Index used to read the latest messages of one user/domain without a full scan
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_chat_messages_user_domain
+        ON chat_messages (username, domain, id)
+    """)
+
+    # ---------------------------
+    # LLM TELEMETRY TABLE
+    # ---------------------------
+    # Stores one record per Gemini chat call:
+    # - created_at: when the call was made
+    # - username / domain: who called and from which page
+    # - model: Gemini model name
+    # - ttft_ms: time to first token (milliseconds)
+    # - latency_ms: total call duration (milliseconds)
+    # - input_tokens / output_tokens: token usage reported by the API
+    # - status: "ok" or "error"
+    # - error_class: exception class name when the call failed
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS llm_telemetry (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at TEXT NOT NULL,
+            username TEXT,
+            domain TEXT,
+            model TEXT,
+            ttft_ms REAL,
+            latency_ms REAL,
+            input_tokens INTEGER,
+            output_tokens INTEGER,
+            status TEXT NOT NULL,
+            error_class TEXT
+        )
+    """)
+    # Index used by the dashboard to read only the recent time window
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_llm_telemetry_created_at
+        ON llm_telemetry (created_at)
+    """)
+
+    # ---------------------------
+    # INCIDENT ALERTS TABLE
+    # ---------------------------
+    # Stores incident spikes found by the anomaly detection job:
+    # - bucket: day of the spike (YYYY-MM-DD)
+    # - dimension / value: series that spiked (e.g. category / Phishing, or _all / _all)
+    # - count: number of incidents that day
+    # - baseline: rolling mean of the previous days
+    # - zscore / ewma_zscore: distance from the rolling and EWMA baselines
+    # - method: which baseline raised the alert ("zscore" or "ewma")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS incident_alerts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            bucket TEXT NOT NULL,
+            dimension TEXT NOT NULL,
+            value TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            baseline REAL,
+            zscore REAL,
+            ewma_zscore REAL,
+            method TEXT,
+            created_at TEXT NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_incident_alerts_bucket
+        ON incident_alerts (bucket)
+    """)
+
+    # Remembers the last day processed by the anomaly job for each series
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS anomaly_state (
+            series_key TEXT PRIMARY KEY,
+            last_bucket TEXT NOT NULL
+        )
+    """)
+
+    # ---------------------------
+    # TICKET SLA SKETCHES TABLE
+    # ---------------------------
+    # Stores one t-digest of ticket resolution times per group:
+    # - dimension: grouping ("all", "priority", "assigned_to", "month")
+    # - key: group value (e.g. "High", "IT_Support_A", "2024-05")
+    # - count: number of tickets summarized
+    # - digest: t-digest centroids as JSON
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ticket_sla_sketches'")
+    sla_sketches_exist = cursor.fetchone() is not None
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ticket_sla_sketches (
+            dimension TEXT NOT NULL,
+            key TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            digest TEXT NOT NULL,
+            PRIMARY KEY (dimension, key)
+        )
+    """)
+    if not sla_sketches_exist:
+        # Fill the new table from the tickets already stored
+        rebuild_sla_sketches(conn)
+
+    # Full-text search indexes over incident and ticket descriptions
+    create_search_tables(conn)
+
+    # Pre-aggregated counts (severity, status, category, priority...) for the dashboards
+    create_summary_tables(conn)
+
     # Commit all table creation statements to the database
     conn.commit()
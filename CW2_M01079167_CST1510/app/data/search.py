@@ -0,0 +1,211 @@
+import re
+import pandas as pd
+
+# ---------------------------
+# FULL-TEXT SEARCH TABLES
+# ---------------------------
+# FTS5 "external content" tables: the text stays in cyber_incidents / it_tickets,
+# the FTS table only stores the inverted index, kept in sync by triggers.
+FTS_TABLES = {
+    "incidents_fts": {
+        "content": "cyber_incidents",
+        "columns": ["description"],
+    },
+    "tickets_fts": {
+        "content": "it_tickets",
+        "columns": ["title", "description"],
+    },
+}
+
+# Tables indexed in memory by the chat retrieval (app/services/retrieval_service.py)
+# and the ticket recommender, with the columns they index. The indexes only append
+# new rowids, so deletes and updates of these columns are logged in
+# retrieval_changes and the indexes re-read just those rows.
+RETRIEVAL_COLUMNS = {
+    "cyber_incidents": ["incident_id", "timestamp", "severity", "category", "status", "description"],
+    "it_tickets": ["ticket_id", "title", "status", "priority", "assigned_to", "created_at", "description"],
+    "datasets_metadata": ["dataset_id", "name", "description", "rows", "columns", "size"],
+}
+
+# Entries kept in retrieval_changes; an index further behind re-indexes its table
+RETRIEVAL_CHANGES_KEPT = 50_000
+
+
+def create_search_tables(conn):
+    """
+    Create the FTS5 tables and their sync triggers if they do not exist.
+    A newly created index is backfilled from the rows already in the table.
+    """
+    cursor = conn.cursor()
+    for fts, spec in FTS_TABLES.items():
+        content = spec["content"]
+        columns = ", ".join(spec["columns"])
+        new_values = ", ".join(f"new.{c}" for c in spec["columns"])
+        old_values = ", ".join(f"old.{c}" for c in spec["columns"])
+
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,))
+        already_exists = cursor.fetchone() is not None
+
+        cursor.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {fts}
+            USING fts5({columns}, content='{content}', content_rowid='rowid')
+        """)
+
+        # Keep the index in sync with every insert, delete and text update
+        # (updates of other columns, e.g. status, do not touch the index)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {content} BEGIN
+                INSERT INTO {fts} (rowid, {columns}) VALUES (new.rowid, {new_values});
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {content} BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {columns}) VALUES ('delete', old.rowid, {old_values});
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {columns} ON {content} BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {columns}) VALUES ('delete', old.rowid, {old_values});
+                INSERT INTO {fts} (rowid, {columns}) VALUES (new.rowid, {new_values});
+            END
+        """)
+
+        if not already_exists:
+            # Backfill: index the rows inserted before the FTS table existed
+            cursor.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+    # Change log of the in-memory indexes (replaces the per-table generation counters)
+    cursor.execute("DROP TABLE IF EXISTS retrieval_generations")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS retrieval_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT NOT NULL,
+            row_id INTEGER NOT NULL
+        )
+    """)
+    prune = f"DELETE FROM retrieval_changes WHERE seq <= (SELECT MAX(seq) FROM retrieval_changes) - {RETRIEVAL_CHANGES_KEPT};"
+    for table, columns in RETRIEVAL_COLUMNS.items():
+        # Recreated on every start, so databases get the current statements
+        cursor.execute(f"DROP TRIGGER IF EXISTS {table}_retrieval_ad")
+        cursor.execute(f"DROP TRIGGER IF EXISTS {table}_retrieval_au")
+        # A deleted rowid can be reused by the next insert (tables with a TEXT primary key)
+        cursor.execute(f"""
+            CREATE TRIGGER {table}_retrieval_ad AFTER DELETE ON {table} BEGIN
+                INSERT INTO retrieval_changes (source, row_id) VALUES ('{table}', old.rowid);
+                {prune}
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER {table}_retrieval_au
+            AFTER UPDATE OF {", ".join(f'"{c}"' for c in columns)} ON {table} BEGIN
+                INSERT INTO retrieval_changes (source, row_id) VALUES ('{table}', new.rowid);
+                {prune}
+            END
+        """)
+
+    conn.commit()
+
+
+def get_row_changes(conn, source, since):
+    """
+    Rowids of a source table deleted or updated (indexed columns) after
+    change number since, for the in-memory indexes to re-read.
+    Returns (set of rowids, last change number). The set is None when
+    since is None (nothing indexed yet) or when changes after since were
+    already pruned from the log: the caller re-indexes the whole table.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT MIN(seq), MAX(seq) FROM retrieval_changes")
+    first, last = cursor.fetchone()
+    last = last or 0
+    if since is None or (first is not None and first > since + 1):
+        return None, last
+    cursor.execute(
+        "SELECT DISTINCT row_id FROM retrieval_changes WHERE seq > ? AND seq <= ? AND source = ?",
+        (since, last, source)
+    )
+    return {row[0] for row in cursor.fetchall()}, last
+
+
+def rebuild_search_index(conn):
+    """
+    Rebuild every full-text index from its content table.
+    Useful after bulk changes made with triggers disabled.
+    """
+    cursor = conn.cursor()
+    for fts in FTS_TABLES:
+        cursor.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+    conn.commit()
+
+
+def build_match_query(text):
+    """
+    Turn free text typed by a user into a safe FTS5 MATCH expression.
+    Every word must appear (AND); the last word is a prefix so results
+    show up while typing. Quotes and operators typed by the user are ignored.
+    """
+    words = re.findall(r"\w+", text or "")
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def _run_search(conn, fts, select_columns, content, query, page, page_size):
+    """
+    Shared search logic: returns (DataFrame of one page of results, total matches).
+    Results are ordered by BM25 rank (best first).
+    """
+    match = build_match_query(query)
+    if match is None:
+        return pd.DataFrame(), 0
+
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM {fts} WHERE {fts} MATCH ?", (match,))
+    total = cursor.fetchone()[0]
+
+    offset = (max(page, 1) - 1) * page_size
+    cursor.execute(f"""
+        SELECT {select_columns},
+               snippet({fts}, -1, '**', '**', '…', 12) AS snippet,
+               bm25({fts}) AS rank
+        FROM {fts}
+        JOIN {content} AS t ON t.rowid = {fts}.rowid
+        WHERE {fts} MATCH ?
+        ORDER BY rank
+        LIMIT ? OFFSET ?
+    """, (match, page_size, offset))
+    rows = cursor.fetchall()
+
+    df = pd.DataFrame(rows, columns=[col[0] for col in cursor.description])
+    return df, total
+
+
+# ---------------------------
+# SEARCH API
+# ---------------------------
+def search_incidents(conn, query, page=1, page_size=20):
+    """
+    Full-text search over incident descriptions.
+    Returns (DataFrame, total) where the DataFrame holds one page of
+    matching incidents with a highlighted snippet, best matches first.
+    """
+    return _run_search(
+        conn, "incidents_fts",
+        "t.incident_id, t.timestamp, t.severity, t.category, t.status",
+        "cyber_incidents", query, page, page_size
+    )
+
+
+def search_tickets(conn, query, page=1, page_size=20):
+    """
+    Full-text search over ticket titles and descriptions.
+    Returns (DataFrame, total) where the DataFrame holds one page of
+    matching tickets with a highlighted snippet, best matches first.
+    """
+    return _run_search(
+        conn, "tickets_fts",
+        "t.ticket_id, t.title, t.status, t.priority, t.assigned_to, t.created_at",
+        "it_tickets", query, page, page_size
+    )
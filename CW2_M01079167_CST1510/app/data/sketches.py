@@ -0,0 +1,327 @@
+import bisect
+import hashlib
+import math
+import zlib
+
+import numpy as np
+
+# ---------------------------
+# T-DIGEST (QUANTILE SKETCH)
+# ---------------------------
+# Small, mergeable summary of a distribution that answers quantile and CDF
+# queries with good accuracy at the tails (p90, p99). Memory stays bounded
+# (about `compression` centroids) whatever the number of values added.
+# Reference: Dunning & Ertl, "Computing Extremely Accurate Quantiles Using t-Digests".
+
+
+class TDigest:
+    """
+    Merging t-digest. Values are buffered and merged into centroids
+    (mean, weight) using the arcsine scale function, which keeps small
+    centroids near the tails and large ones around the median.
+    """
+
+    def __init__(self, compression=100):
+        self.compression = compression
+        self.means = []         # Centroid means, sorted
+        self.weights = []       # Centroid weights, same order as means
+        self.buffer = []        # Values not merged yet, as (value, weight)
+        self.total = 0.0        # Total weight (number of values added)
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value, weight=1):
+        """
+        Add a value (optionally weighted) to the digest.
+        """
+        value = float(value)
+        self.buffer.append((value, weight))
+        self.total += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self.buffer) >= 5 * self.compression:
+            self._compress()
+
+    def add_array(self, values):
+        """
+        Add a batch of values at once (e.g. a DataFrame column chunk).
+        The sorted batch is cut into groups along the same scale function
+        with NumPy, and only the group centroids are merged into the digest.
+        """
+        values = np.sort(np.asarray(values, dtype=float))
+        n = len(values)
+        if n == 0:
+            return
+        q = (np.arange(n) + 0.5) / n
+        groups = np.floor(self.compression / (2 * math.pi) * np.arcsin(2 * q - 1)).astype(np.int64)
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(groups)) + 1))
+        weights = np.diff(np.append(starts, n))
+        means = np.add.reduceat(values, starts) / weights
+
+        self.buffer.extend(zip(means.tolist(), weights.tolist()))
+        self.total += n
+        self.min = min(self.min, float(values[0]))
+        self.max = max(self.max, float(values[-1]))
+        self._compress()
+
+    def merge(self, other):
+        """
+        Merge another digest into this one (e.g. two months into a quarter).
+        """
+        other._compress()
+        for mean, weight in zip(other.means, other.weights):
+            self.buffer.append((mean, weight))
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _k(self, q):
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _k_inverse(self, k):
+        return (math.sin(k * 2 * math.pi / self.compression) + 1) / 2
+
+    def _compress(self):
+        """
+        Merge buffered values and existing centroids into a new centroid list.
+        """
+        if not self.buffer:
+            return
+        points = sorted(list(zip(self.means, self.weights)) + self.buffer)
+        self.buffer = []
+
+        means, weights = [], []
+        cumulative = 0.0
+        q_limit = self._k_inverse(self._k(0) + 1) * self.total
+        current_mean, current_weight = points[0]
+        for mean, weight in points[1:]:
+            if cumulative + current_weight + weight <= q_limit:
+                # Still room in the current centroid: merge the point into it
+                current_weight += weight
+                current_mean += (mean - current_mean) * weight / current_weight
+            else:
+                means.append(current_mean)
+                weights.append(current_weight)
+                cumulative += current_weight
+                q_limit = self._k_inverse(self._k(cumulative / self.total) + 1) * self.total
+                current_mean, current_weight = mean, weight
+        means.append(current_mean)
+        weights.append(current_weight)
+
+        self.means, self.weights = means, weights
+
+    def _positions(self):
+        """
+        Cumulative weight at the center of each centroid.
+        """
+        positions = []
+        cumulative = 0.0
+        for weight in self.weights:
+            positions.append(cumulative + weight / 2)
+            cumulative += weight
+        return positions
+
+    def quantile(self, q):
+        """
+        Estimated value below which a fraction q (0-1) of the values fall.
+        Returns None for an empty digest.
+        """
+        self._compress()
+        if self.total == 0:
+            return None
+        if len(self.means) == 1:
+            return self.means[0]
+
+        # Piecewise-linear curve through (0, min), centroid centers, (total, max)
+        xs = [0.0] + self._positions() + [self.total]
+        ys = [self.min] + self.means + [self.max]
+        target = min(max(q, 0.0), 1.0) * self.total
+        i = min(bisect.bisect_right(xs, target), len(xs) - 1)
+        x0, x1, y0, y1 = xs[i - 1], xs[i], ys[i - 1], ys[i]
+        if x1 == x0:
+            return y1
+        return y0 + (y1 - y0) * (target - x0) / (x1 - x0)
+
+    def cdf(self, value):
+        """
+        Estimated fraction (0-1) of the values lower than or equal to value.
+        """
+        self._compress()
+        if self.total == 0:
+            return None
+        if value < self.min:
+            return 0.0
+        if value >= self.max:
+            return 1.0
+
+        xs = [self.min] + self.means + [self.max]
+        ys = [0.0] + self._positions() + [self.total]
+        i = min(bisect.bisect_right(xs, value), len(xs) - 1)
+        x0, x1, y0, y1 = xs[i - 1], xs[i], ys[i - 1], ys[i]
+        if x1 == x0:
+            return y1 / self.total
+        return (y0 + (y1 - y0) * (value - x0) / (x1 - x0)) / self.total
+
+    def to_dict(self):
+        """
+        Serializable form of the digest (stored as JSON in the database).
+        """
+        self._compress()
+        return {
+            "compression": self.compression,
+            "means": self.means,
+            "weights": self.weights,
+            "min": self.min if self.total else None,
+            "max": self.max if self.total else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Rebuild a digest saved with to_dict().
+        """
+        digest = cls(data["compression"])
+        digest.means = list(data["means"])
+        digest.weights = list(data["weights"])
+        digest.total = float(sum(digest.weights))
+        if digest.total:
+            digest.min = data["min"]
+            digest.max = data["max"]
+        return digest
+
+
+# ---------------------------
+# MINHASH + LSH (NEAR-DUPLICATE TEXT)
+# ---------------------------
+# A MinHash signature is a short vector whose positions agree between two
+# texts with a probability equal to their Jaccard similarity (on character
+# shingles). Cutting the signature into bands and hashing each band (LSH)
+# puts similar texts in the same bucket, so candidates are found by lookup
+# instead of comparing a new text with every stored one.
+
+MERSENNE_PRIME = (1 << 31) - 1
+
+
+class MinHasher:
+    """
+    Computes MinHash signatures with `num_perm` hash functions
+    (a * x + b) mod p, vectorized with NumPy over all shingles at once.
+    """
+
+    def __init__(self, num_perm=128, shingle_size=5, bands=16, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands = bands
+        self.rows = num_perm // bands
+        # Fixed seed: signatures stored in the database must stay comparable
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+
+    def shingles(self, text):
+        """
+        Set of hashed character shingles of a normalized text.
+        """
+        text = " ".join(str(text).lower().split())
+        if len(text) <= self.shingle_size:
+            return {zlib.crc32(text.encode("utf-8"))}
+        return {
+            zlib.crc32(text[i:i + self.shingle_size].encode("utf-8"))
+            for i in range(len(text) - self.shingle_size + 1)
+        }
+
+    def signature(self, text):
+        """
+        MinHash signature of a text, as a uint32 NumPy array of length num_perm.
+        """
+        x = np.fromiter(self.shingles(text), dtype=np.uint64) & np.uint64(MERSENNE_PRIME)
+        # One row per hash function, one column per shingle; keep the minimum of each row
+        hashed = (self.a[:, np.newaxis] * x[np.newaxis, :] + self.b[:, np.newaxis]) % np.uint64(MERSENNE_PRIME)
+        return hashed.min(axis=1).astype(np.uint32)
+
+    def band_hashes(self, signature):
+        """
+        One 63-bit bucket key per band of the signature (LSH).
+        """
+        keys = []
+        for band in range(self.bands):
+            chunk = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            digest = hashlib.blake2b(chunk, digest_size=8).digest()
+            keys.append(int.from_bytes(digest, "big") >> 1)  # Fits in a SQLite INTEGER
+        return keys
+
+
+def estimate_jaccard(signature_a, signature_b):
+    """
+    Estimated Jaccard similarity of two texts from their MinHash signatures.
+    """
+    return float(np.mean(signature_a == signature_b))
+
+
+# ---------------------------
+# HYPERLOGLOG (DISTINCT COUNT)
+# ---------------------------
+# Estimates the number of distinct values of a stream with 2^precision
+# one-byte registers (16 KB at the default precision, ~0.8% standard error),
+# whatever the number of values. Values are passed as 64-bit hashes.
+# Reference: Flajolet et al., "HyperLogLog: the analysis of a near-optimal
+# cardinality estimation algorithm", with the small-range correction.
+
+
+def _bit_length(values):
+    """
+    Number of significant bits of each uint64 value (0 for 0), exact:
+    each 32-bit half is converted to float without rounding.
+    """
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(high > 0, 32 + np.frexp(high)[1], np.frexp(low)[1])
+
+
+class HyperLogLog:
+    """
+    HyperLogLog sketch. add_hashes() takes a NumPy array of uint64 hashes
+    (e.g. pandas.util.hash_pandas_object) and updates the registers in bulk.
+    """
+
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add_hashes(self, hashes):
+        """
+        Add a batch of 64-bit hashed values.
+        """
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if hashes.size == 0:
+            return
+        tail_bits = 64 - self.precision
+        index = (hashes >> np.uint64(tail_bits)).astype(np.int64)
+        tail = hashes & np.uint64((1 << tail_bits) - 1)
+        # Position of the first 1-bit in the remaining bits (tail_bits + 1 when they are all 0)
+        rank = (tail_bits - _bit_length(tail) + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other):
+        """
+        Merge another sketch of the same precision into this one.
+        """
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        """
+        Estimated number of distinct values added.
+        """
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Small range: linear counting is more accurate
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
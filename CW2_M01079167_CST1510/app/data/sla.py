@@ -0,0 +1,102 @@
+import json
+from collections import defaultdict
+
+import pandas as pd
+from app.data.sketches import TDigest
+
+# Groupings for which a resolution-time sketch is maintained
+SLA_DIMENSIONS = ["all", "priority", "assigned_to", "month"]
+
+
+def _sketch_keys(priority, assigned_to, created_at):
+    """
+    Return the (dimension, key) pairs a ticket contributes to.
+    Missing values (None, empty, or NaN from a blank CSV cell) get the default keys.
+    """
+    def missing(value):
+        return value is None or value == "" or pd.isna(value)
+
+    return [
+        ("all", "all"),
+        ("priority", "Unknown" if missing(priority) else priority),
+        ("assigned_to", "Unassigned" if missing(assigned_to) else assigned_to),
+        ("month", "unknown" if missing(created_at) else str(created_at)[:7]),
+    ]
+
+
+# ---------------------------
+# UPDATE SKETCHES
+# ---------------------------
+def update_sla_sketches(conn, tickets):
+    """
+    Add resolution times to the stored t-digest sketches.
+    tickets is an iterable of (priority, assigned_to, created_at, resolution_time_hours);
+    tickets without a resolution time are ignored.
+    Values are first grouped in memory, then each touched sketch is read,
+    merged and written back once, so a bulk import costs one update per key.
+    The caller commits (this runs inside the caller's insert transaction).
+    """
+    new_digests = defaultdict(TDigest)
+    for priority, assigned_to, created_at, hours in tickets:
+        if hours is None or pd.isna(hours):
+            continue
+        for key in _sketch_keys(priority, assigned_to, created_at):
+            new_digests[key].add(float(hours))
+
+    cursor = conn.cursor()
+    for (dimension, key), digest in new_digests.items():
+        cursor.execute(
+            "SELECT digest FROM ticket_sla_sketches WHERE dimension = ? AND key = ?",
+            (dimension, key)
+        )
+        row = cursor.fetchone()
+        if row is not None:
+            digest = TDigest.from_dict(json.loads(row[0])).merge(digest)
+
+        cursor.execute("""
+            INSERT INTO ticket_sla_sketches (dimension, key, count, digest)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (dimension, key) DO UPDATE SET count = excluded.count, digest = excluded.digest
+        """, (dimension, key, int(digest.total), json.dumps(digest.to_dict())))
+
+
+def rebuild_sla_sketches(conn):
+    """
+    Recompute every sketch from the it_tickets table (full scan).
+    """
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM ticket_sla_sketches")
+    cursor.execute("""
+        SELECT priority, assigned_to, created_at, resolution_time_hours
+        FROM it_tickets WHERE resolution_time_hours IS NOT NULL
+    """)
+    update_sla_sketches(conn, cursor.fetchall())
+    conn.commit()
+
+
+# ---------------------------
+# READ QUANTILES
+# ---------------------------
+def get_resolution_quantiles(conn, dimension="priority", quantiles=(0.5, 0.9, 0.99)):
+    """
+    Return a DataFrame with the ticket count and the estimated resolution-time
+    quantiles (hours) for each key of a dimension (e.g. each priority).
+    Only the stored sketches are read, never the ticket history.
+    """
+    if dimension not in SLA_DIMENSIONS:
+        raise ValueError(f"Unknown dimension '{dimension}', expected one of {SLA_DIMENSIONS}")
+
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT key, count, digest FROM ticket_sla_sketches WHERE dimension = ? ORDER BY key",
+        (dimension,)
+    )
+
+    records = []
+    for key, count, data in cursor.fetchall():
+        digest = TDigest.from_dict(json.loads(data))
+        record = {dimension: key, "tickets": count}
+        for q in quantiles:
+            record[f"p{int(q * 100)} (h)"] = round(digest.quantile(q), 1)
+        records.append(record)
+    return pd.DataFrame(records)
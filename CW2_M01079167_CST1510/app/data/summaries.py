@@ -0,0 +1,272 @@
+import sys
+import pandas as pd
+from app.data.db import connect_database
+
+# ---------------------------
+# SUMMARY DEFINITIONS
+# ---------------------------
+# For each domain: the source table, the column used for time buckets
+# and the dimensions whose value counts are maintained.
+SUMMARY_DOMAINS = {
+    "incidents": {
+        "table": "cyber_incidents",
+        "time_column": "timestamp",
+        "dimensions": ["severity", "status", "category"],
+    },
+    "tickets": {
+        "table": "it_tickets",
+        "time_column": "created_at",
+        "dimensions": ["status", "priority", "assigned_to"],
+    },
+}
+
+# Pseudo dimension holding the total number of rows of a domain
+TOTAL = "_all"
+
+
+def _value_sql(prefix, dimension):
+    """
+    SQL expression of a dimension value for a trigger row (new./old.).
+    NULL values are counted under 'Unknown' so they still add up to the total.
+    """
+    if dimension == TOTAL:
+        return f"'{TOTAL}'"
+    return f"COALESCE({prefix}.{dimension}, 'Unknown')"
+
+
+def _bucket_sql(prefix, time_column):
+    """
+    SQL expression of the daily bucket (YYYY-MM-DD) of a row.
+    """
+    return f"COALESCE(date({prefix}.{time_column}), 'unknown')"
+
+
+def _trigger_statements(domain, spec, prefix, delta):
+    """
+    Build the statements a trigger runs to add (delta=1) or remove (delta=-1)
+    one row from the summary tables.
+    """
+    statements = []
+    bucket = _bucket_sql(prefix, spec["time_column"])
+    for dimension in [TOTAL] + spec["dimensions"]:
+        value = _value_sql(prefix, dimension)
+        if delta > 0:
+            statements.append(f"""
+                INSERT INTO summary_counts (domain, dimension, value, count)
+                VALUES ('{domain}', '{dimension}', {value}, 1)
+                ON CONFLICT (domain, dimension, value) DO UPDATE SET count = count + 1;""")
+            statements.append(f"""
+                INSERT INTO summary_daily_counts (domain, dimension, bucket, value, count)
+                VALUES ('{domain}', '{dimension}', {bucket}, {value}, 1)
+                ON CONFLICT (domain, dimension, bucket, value) DO UPDATE SET count = count + 1;""")
+        else:
+            statements.append(f"""
+                UPDATE summary_counts SET count = count - 1
+                WHERE domain = '{domain}' AND dimension = '{dimension}' AND value = {value};""")
+            statements.append(f"""
+                UPDATE summary_daily_counts SET count = count - 1
+                WHERE domain = '{domain}' AND dimension = '{dimension}'
+                  AND bucket = {bucket} AND value = {value};""")
+            # Do not keep empty rows around: only the keys just decremented are
+            # checked (primary-key lookups, not a scan of the domain's rows)
+            statements.append(f"""
+                DELETE FROM summary_counts
+                WHERE domain = '{domain}' AND dimension = '{dimension}' AND value = {value} AND count <= 0;""")
+            statements.append(f"""
+                DELETE FROM summary_daily_counts
+                WHERE domain = '{domain}' AND dimension = '{dimension}'
+                  AND bucket = {bucket} AND value = {value} AND count <= 0;""")
+    return "\n".join(statements)
+
+
+# ---------------------------
+# CREATE SUMMARY TABLES
+# ---------------------------
+def create_summary_tables(conn):
+    """
+    Create the summary tables and the triggers that keep them up to date.
+    Every insert, delete or update on the source tables (single inserts,
+    CSV imports, migrations, delete forms) adjusts the counts, so the
+    dashboards read a handful of rows instead of scanning the tables.
+    Newly created summary tables are filled from the existing rows.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'summary_counts'")
+    already_exists = cursor.fetchone() is not None
+
+    # Counts per (domain, dimension, value), e.g. ('incidents', 'severity', 'High')
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS summary_counts (
+            domain TEXT NOT NULL,
+            dimension TEXT NOT NULL,
+            value TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (domain, dimension, value)
+        ) WITHOUT ROWID
+    """)
+
+    # Same counts split by day, used by the trend charts
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS summary_daily_counts (
+            domain TEXT NOT NULL,
+            dimension TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            value TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (domain, dimension, bucket, value)
+        ) WITHOUT ROWID
+    """)
+
+    for domain, spec in SUMMARY_DOMAINS.items():
+        table = spec["table"]
+        watched = ", ".join([spec["time_column"]] + spec["dimensions"])
+        # Triggers are recreated on every start, so databases get the current statements
+        for suffix in ("ai", "ad", "au"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS summary_{domain}_{suffix}")
+        cursor.execute(f"""
+            CREATE TRIGGER summary_{domain}_ai AFTER INSERT ON {table} BEGIN
+                {_trigger_statements(domain, spec, "new", 1)}
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER summary_{domain}_ad AFTER DELETE ON {table} BEGIN
+                {_trigger_statements(domain, spec, "old", -1)}
+            END
+        """)
+        # Only updates of counted columns need to move a row between counts
+        cursor.execute(f"""
+            CREATE TRIGGER summary_{domain}_au AFTER UPDATE OF {watched} ON {table} BEGIN
+                {_trigger_statements(domain, spec, "old", -1)}
+                {_trigger_statements(domain, spec, "new", 1)}
+            END
+        """)
+
+    if not already_exists:
+        rebuild_summaries(conn)
+
+    conn.commit()
+
+
+def _expected_counts_sql(spec, dimension, daily):
+    """
+    GROUP BY query computing the true counts of one dimension from the source table.
+    """
+    value = "'" + TOTAL + "'" if dimension == TOTAL else f"COALESCE({dimension}, 'Unknown')"
+    if daily:
+        bucket = f"COALESCE(date({spec['time_column']}), 'unknown')"
+        return f"SELECT {bucket}, {value}, COUNT(*) FROM {spec['table']} GROUP BY 1, 2"
+    return f"SELECT {value}, COUNT(*) FROM {spec['table']} GROUP BY 1"
+
+
+# ---------------------------
+# REBUILD / CHECK
+# ---------------------------
+def rebuild_summaries(conn):
+    """
+    Recompute every summary table from the source tables (full scan).
+    Used on first creation and to repair counts after a failed check.
+    """
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM summary_counts")
+    cursor.execute("DELETE FROM summary_daily_counts")
+
+    for domain, spec in SUMMARY_DOMAINS.items():
+        for dimension in [TOTAL] + spec["dimensions"]:
+            cursor.execute(f"""
+                INSERT INTO summary_counts (domain, dimension, value, count)
+                SELECT '{domain}', '{dimension}', * FROM ({_expected_counts_sql(spec, dimension, False)})
+            """)
+            cursor.execute(f"""
+                INSERT INTO summary_daily_counts (domain, dimension, bucket, value, count)
+                SELECT '{domain}', '{dimension}', * FROM ({_expected_counts_sql(spec, dimension, True)})
+            """)
+    conn.commit()
+
+
+def check_summary_consistency(conn):
+    """
+    Compare the stored counts with counts recomputed from the source tables.
+    Returns a list of mismatches as tuples
+    (domain, dimension, bucket or None, value, expected, stored); empty if consistent.
+    """
+    cursor = conn.cursor()
+    mismatches = []
+
+    for domain, spec in SUMMARY_DOMAINS.items():
+        for dimension in [TOTAL] + spec["dimensions"]:
+            # Totals per value
+            cursor.execute(_expected_counts_sql(spec, dimension, False))
+            expected = {row[0]: row[1] for row in cursor.fetchall()}
+            cursor.execute(
+                "SELECT value, count FROM summary_counts WHERE domain = ? AND dimension = ?",
+                (domain, dimension)
+            )
+            stored = {row[0]: row[1] for row in cursor.fetchall()}
+            for value in expected.keys() | stored.keys():
+                if expected.get(value, 0) != stored.get(value, 0):
+                    mismatches.append((domain, dimension, None, value, expected.get(value, 0), stored.get(value, 0)))
+
+            # Counts per day and value
+            cursor.execute(_expected_counts_sql(spec, dimension, True))
+            expected = {(row[0], row[1]): row[2] for row in cursor.fetchall()}
+            cursor.execute(
+                "SELECT bucket, value, count FROM summary_daily_counts WHERE domain = ? AND dimension = ?",
+                (domain, dimension)
+            )
+            stored = {(row[0], row[1]): row[2] for row in cursor.fetchall()}
+            for key in expected.keys() | stored.keys():
+                if expected.get(key, 0) != stored.get(key, 0):
+                    mismatches.append((domain, dimension, key[0], key[1], expected.get(key, 0), stored.get(key, 0)))
+
+    return mismatches
+
+
+# ---------------------------
+# READ SUMMARIES
+# ---------------------------
+def get_summary_counts(conn, domain, dimension):
+    """
+    Return the counts of one dimension as a pandas Series (value -> count),
+    largest first. Reads only the summary rows of that dimension.
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT value, count FROM summary_counts WHERE domain = ? AND dimension = ? ORDER BY count DESC",
+        (domain, dimension)
+    )
+    rows = cursor.fetchall()
+    return pd.Series({row[0]: row[1] for row in rows}, name=dimension, dtype="int64")
+
+
+def get_total_count(conn, domain):
+    """
+    Return the total number of rows of a domain (incidents or tickets).
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT count FROM summary_counts WHERE domain = ? AND dimension = ? AND value = ?",
+        (domain, TOTAL, TOTAL)
+    )
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+# Command line: python -m app.data.summaries [check|rebuild]
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "check"
+    conn = connect_database()
+    if command == "rebuild":
+        rebuild_summaries(conn)
+        print("✅ Summary tables rebuilt.")
+    elif command == "check":
+        problems = check_summary_consistency(conn)
+        if problems:
+            for problem in problems:
+                print(f"❌ Mismatch: {problem}")
+            print(f"{len(problems)} mismatches found. Run 'python -m app.data.summaries rebuild' to repair.")
+            sys.exit(1)
+        print("✅ Summary tables are consistent.")
+    else:
+        print("Usage: python -m app.data.summaries [check|rebuild]")
+        sys.exit(2)
+    conn.close()
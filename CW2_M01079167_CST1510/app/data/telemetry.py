@@ -0,0 +1,192 @@
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+from app.data import db
+from app.data.db import connect_readonly
+from app.data.metrics import gauge
+
+# Columns of the llm_telemetry table filled by record_llm_call()
+TELEMETRY_COLUMNS = [
+    "created_at", "username", "domain", "model", "ttft_ms", "latency_ms",
+    "input_tokens", "output_tokens", "status", "error_class",
+]
+
+
+# ---------------------------
+# BACKGROUND BATCHED WRITER
+# ---------------------------
+class TelemetryWriter:
+    """
+    Collects telemetry records in a queue and writes them from a background
+    thread, in batches, on its own connection.
+    The chat never waits for the database: record() only puts an item in the queue.
+    """
+
+    def __init__(self, batch_size=50, flush_interval=2.0, max_pending=10000):
+        self.batch_size = batch_size            # Max records per INSERT batch
+        self.flush_interval = flush_interval    # Max seconds a record waits before being written
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        """
+        Start the writer thread once (safe to call from every rerun).
+        """
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name="telemetry-writer", daemon=True)
+                self.thread.start()
+
+    def record(self, values):
+        """
+        Queue one record. If the queue is full the record is dropped,
+        losing a sample is better than slowing down the chat.
+        """
+        self.start()
+        try:
+            self.queue.put_nowait(values)
+        except queue.Full:
+            print("[telemetry] Queue full, record dropped.")
+
+    def _run(self):
+        conn, path = None, None
+        while True:
+            # Block until at least one record arrives, then drain up to a batch:
+            # the first record of a batch waits at most flush_interval
+            batch = [self.queue.get()]
+            deadline = time.perf_counter() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get(timeout=max(deadline - time.perf_counter(), 0)))
+                except queue.Empty:
+                    break
+
+            # DB_PATH can be changed at runtime (benchmarks): follow it
+            if conn is None or path != db.DB_PATH:
+                try:
+                    if conn is not None:
+                        conn.close()
+                    conn, path = db.connect_database(db.DB_PATH), db.DB_PATH
+                except Exception as e:
+                    conn, path = None, None
+                    print(f"[telemetry] Error connecting, {len(batch)} records dropped: {e}")
+                    for _ in batch:
+                        self.queue.task_done()
+                    continue
+            self._write(conn, batch)
+
+    def _write(self, conn, batch):
+        try:
+            cursor = conn.cursor()
+            cursor.executemany(f"""
+                INSERT INTO llm_telemetry ({', '.join(TELEMETRY_COLUMNS)})
+                VALUES ({', '.join('?' for _ in TELEMETRY_COLUMNS)})
+            """, batch)
+            conn.commit()
+        except Exception as e:
+            # Telemetry must never crash the app
+            print(f"[telemetry] Error writing {len(batch)} records: {e}")
+        finally:
+            for _ in batch:
+                self.queue.task_done()
+
+    def flush(self, timeout=5.0):
+        """
+        Wait (up to timeout seconds) until every queued record is written.
+        """
+        if self.thread is None or not self.thread.is_alive():
+            return
+        done = threading.Event()
+        threading.Thread(target=lambda: (self.queue.join(), done.set()), daemon=True).start()
+        done.wait(timeout)
+
+
+# Single writer shared by every page of the app
+_writer = TelemetryWriter()
+atexit.register(_writer.flush)
+gauge("app_telemetry_queue_depth", "LLM telemetry records waiting to be written").set_function(_writer.queue.qsize)
+
+
+def record_llm_call(username, domain, model, ttft_ms, latency_ms,
+                    input_tokens=None, output_tokens=None, error_class=None):
+    """
+    Record one chat call without blocking the caller.
+    error_class is the exception class name when the call failed.
+    """
+    _writer.record((
+        datetime.now().isoformat(),
+        username,
+        domain,
+        model,
+        ttft_ms,
+        latency_ms,
+        input_tokens,
+        output_tokens,
+        "error" if error_class else "ok",
+        error_class,
+    ))
+
+
+def flush_telemetry(timeout=5.0):
+    """
+    Block until queued telemetry records are written (used by scripts and tests).
+    """
+    _writer.flush(timeout)
+
+
+# ---------------------------
+# READ TELEMETRY
+# ---------------------------
+def get_llm_telemetry(conn=None, days=30):
+    """
+    Retrieve the chat call records of the last `days` days
+    and return them as a pandas DataFrame.
+    """
+    if conn is None:
+        conn = connect_readonly()
+
+    since = (datetime.now() - timedelta(days=days)).isoformat()
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM llm_telemetry WHERE created_at >= ? ORDER BY created_at", (since,))
+    rows = cursor.fetchall()
+
+    df = pd.DataFrame(rows, columns=[col[0] for col in cursor.description])
+    return df
+
+
+def summarize_latency(df):
+    """
+    Compute per-domain call counts, error rate and p50/p95/p99
+    of total latency and time-to-first-token (milliseconds).
+    """
+    if df.empty:
+        return pd.DataFrame()
+
+    grouped = df.groupby("domain")
+    summary = pd.DataFrame({
+        "calls": grouped.size(),
+        "error_rate_%": grouped["status"].apply(lambda s: round((s == "error").mean() * 100, 1)),
+    })
+    for column in ["latency_ms", "ttft_ms"]:
+        for q in [0.50, 0.95, 0.99]:
+            summary[f"{column} p{int(q * 100)}"] = grouped[column].quantile(q).round(0)
+    return summary.reset_index()
+
+
+def token_spend_by_day(df):
+    """
+    Total input + output tokens per day and per domain, for the trend chart.
+    """
+    if df.empty:
+        return pd.DataFrame()
+
+    df = df.assign(
+        day=pd.to_datetime(df["created_at"]).dt.date,
+        tokens=df["input_tokens"].fillna(0) + df["output_tokens"].fillna(0),
+    )
+    return df.pivot_table(index="day", columns="domain", values="tokens", aggfunc="sum", fill_value=0)
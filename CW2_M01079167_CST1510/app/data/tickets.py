@@ -1,11 +1,22 @@
+from datetime import datetime
 import pandas as pd
-from app.data.db import connect_database
+from app.data.db import connect_database, connect_readonly
+from app.data.metrics import CSV_IMPORT_ROWS, CSV_IMPORT_SECONDS, DB_READ_ROWS, DB_READ_SECONDS, DB_WRITES
+from app.data.sla import update_sla_sketches
+from app.data.summaries import get_total_count
 
 def migrate_tickets_from_csv(file_path="DATA/it_tickets.csv", conn=None):
     """
     Load IT tickets from a CSV file and insert them into the it_tickets table.
-    Expected columns: ticket_id, title, status, priority, assigned_to, created_at
+    Expected columns: ticket_id, title, status, priority, assigned_to, created_at, description,
+    resolution_time_hours
+    Resolution times of the inserted tickets are added to the SLA sketches.
     """
+    with CSV_IMPORT_SECONDS.labels(table="it_tickets", source="migration").time():
+        _migrate_tickets(file_path, conn)
+
+
+def _migrate_tickets(file_path, conn):
     df = pd.read_csv(file_path)
 
     local_conn = False
@@ -14,18 +25,30 @@ def migrate_tickets_from_csv(file_path="DATA/it_tickets.csv", conn=None):
         local_conn = True
 
     cursor = conn.cursor()
+    inserted = []  # Tickets actually inserted (duplicates are ignored)
     for _, row in df.iterrows():
         cursor.execute("""
-            INSERT OR IGNORE INTO it_tickets (ticket_id, title, status, priority, assigned_to, created_at)
-            VALUES (?, ?, ?, ?, ?, ?)
+            INSERT OR IGNORE INTO it_tickets (ticket_id, title, status, priority, assigned_to, created_at, description,
+                                              resolution_time_hours)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         """, (
             row.get("ticket_id"),
             row.get("title"),
             row.get("status"),
             row.get("priority"),
             row.get("assigned_to"),
-            row.get("created_at")
+            row.get("created_at"),
+            row.get("description"),
+            row.get("resolution_time_hours")
         ))
+        if cursor.rowcount == 1:
+            inserted.append((row.get("priority"), row.get("assigned_to"), row.get("created_at"),
+                             row.get("resolution_time_hours")))
+
+    # One sketch update per priority / assignee / month for the whole file
+    update_sla_sketches(conn, inserted)
+    CSV_IMPORT_ROWS.labels(table="it_tickets", source="migration", result="inserted").inc(len(inserted))
+    CSV_IMPORT_ROWS.labels(table="it_tickets", source="migration", result="skipped").inc(len(df) - len(inserted))
 
     if local_conn:
         conn.commit()
@@ -38,26 +61,60 @@ def get_all_tickets(conn=None):
     and return them as a pandas DataFrame.
     """
     if conn is None:
-        conn = connect_database()
+        conn = connect_readonly()
 
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM it_tickets")
-    rows = cursor.fetchall()
+    with DB_READ_SECONDS.labels(table="it_tickets").time():
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM it_tickets")
+        rows = cursor.fetchall()
+    DB_READ_ROWS.labels(table="it_tickets").inc(len(rows))
 
     df = pd.DataFrame(rows, columns=[col[0] for col in cursor.description])
     return df
 
 
+def get_tickets_page(conn, page=1, page_size=50):
+    """
+    Retrieve one page of IT tickets, newest first.
+    Returns (DataFrame, total number of tickets).
+    Rows are read in the order of the created_at index, so a page never sorts
+    the whole table; the total comes from the summary table.
+    """
+    offset = (max(page, 1) - 1) * page_size
+
+    with DB_READ_SECONDS.labels(table="it_tickets").time():
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT * FROM it_tickets
+            ORDER BY created_at DESC
+            LIMIT ? OFFSET ?
+        """, (page_size, offset))
+        rows = cursor.fetchall()
+    DB_READ_ROWS.labels(table="it_tickets").inc(len(rows))
+
+    df = pd.DataFrame(rows, columns=[col[0] for col in cursor.description])
+    return df, get_total_count(conn, "tickets")
+
+
 # ---------------- NEW FUNCTION ADDED ----------------
-def insert_ticket(conn, ticket_id: int, title: str, status: str, priority: str, assigned_to: str, description: str):
+def insert_ticket(conn, ticket_id: int, title: str, status: str, priority: str, assigned_to: str, description: str,
+                  created_at: str = None, resolution_time_hours: float = None):
     """
     Insert a single ticket into the it_tickets table.
     Uses parameterized queries to prevent SQL injection.
     Note: 'description' is stored separately from 'title' for clarity.
+    created_at defaults to the current time so new tickets appear in the trend charts.
+    A known resolution time is added to the SLA sketches in the same transaction.
     """
+    if created_at is None:
+        created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
     cursor = conn.cursor()
     cursor.execute("""
-        INSERT INTO it_tickets (ticket_id, title, status, priority, assigned_to, description)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (ticket_id, title, status, priority, assigned_to, description))
-    conn.commit()
\ No newline at end of file
+        INSERT INTO it_tickets (ticket_id, title, status, priority, assigned_to, description, created_at,
+                                resolution_time_hours)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, (ticket_id, title, status, priority, assigned_to, description, created_at, resolution_time_hours))
+    update_sla_sketches(conn, [(priority, assigned_to, created_at, resolution_time_hours)])
+    conn.commit()
+    DB_WRITES.labels(table="it_tickets").inc()
\ No newline at end of file
@@ -0,0 +1,163 @@
+import numpy as np
+import pandas as pd
+from app.data.summaries import SUMMARY_DOMAINS, TOTAL
+
+# Supported bucket sizes and the matching pandas frequency used to fill gaps
+BUCKETS = {
+    "hour": "h",
+    "day": "D",
+    "week": "W-MON",
+}
+
+# Default maximum number of points sent to a chart
+MAX_CHART_POINTS = 2000
+
+
+# ---------------------------
+# TIME-SERIES QUERIES
+# ---------------------------
+def get_time_series(conn, domain, bucket="day", dimension=None, start=None, end=None):
+    """
+    Count rows of a domain ("incidents" or "tickets") per time bucket.
+    - bucket: "hour", "day" or "week" (weeks start on Monday)
+    - dimension: optional column to break the counts down by (e.g. "severity")
+    - start / end: optional "YYYY-MM-DD" bounds (inclusive)
+    Returns a DataFrame indexed by bucket start, one column per dimension
+    value (or a single "count" column). Missing buckets are filled with 0.
+
+    Day and week buckets are read from summary_daily_counts; hour buckets
+    need the raw table and use the index on the time column for the range.
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(f"Unknown bucket '{bucket}', expected one of {list(BUCKETS)}")
+
+    spec = SUMMARY_DOMAINS[domain]
+    if dimension is not None and dimension not in spec["dimensions"]:
+        raise ValueError(f"Unknown dimension '{dimension}' for {domain}")
+
+    if bucket == "hour":
+        df = _hourly_counts(conn, spec, dimension, start, end)
+    else:
+        df = _daily_counts(conn, domain, bucket, dimension, start, end)
+
+    if df.empty:
+        return pd.DataFrame()
+
+    # One column per value, one row per bucket
+    df["bucket"] = pd.to_datetime(df["bucket"], errors="coerce")
+    df = df.dropna(subset=["bucket"])
+    series = df.pivot_table(index="bucket", columns="value", values="count", aggfunc="sum", fill_value=0)
+    if dimension is None:
+        series.columns = ["count"]
+
+    # Fill missing buckets with zeros so gaps show as drops in the chart
+    full_range = pd.date_range(series.index.min(), series.index.max(), freq=BUCKETS[bucket])
+    return series.reindex(full_range, fill_value=0)
+
+
+def _daily_counts(conn, domain, bucket, dimension, start, end):
+    """
+    Read day (or week) counts from the summary table.
+    """
+    bucket_sql = "bucket" if bucket == "day" else "date(bucket, 'weekday 0', '-6 days')"
+    query = f"""
+        SELECT {bucket_sql} AS bucket, value, SUM(count) AS count
+        FROM summary_daily_counts
+        WHERE domain = ? AND dimension = ? AND bucket != 'unknown'
+    """
+    params = [domain, dimension or TOTAL]
+    if start:
+        query += " AND bucket >= ?"
+        params.append(str(start))
+    if end:
+        query += " AND bucket <= ?"
+        params.append(str(end))
+    query += " GROUP BY 1, 2"
+
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    return pd.DataFrame(cursor.fetchall(), columns=["bucket", "value", "count"])
+
+
+def _hourly_counts(conn, spec, dimension, start, end):
+    """
+    Compute hour counts from the raw table, restricted to the date range.
+    """
+    time_column = spec["time_column"]
+    value_sql = f"COALESCE({dimension}, 'Unknown')" if dimension else f"'{TOTAL}'"
+
+    query = f"""
+        SELECT strftime('%Y-%m-%d %H:00', {time_column}) AS bucket, {value_sql} AS value, COUNT(*) AS count
+        FROM {spec['table']}
+        WHERE {time_column} IS NOT NULL
+    """
+    params = []
+    if start:
+        query += f" AND {time_column} >= ?"
+        params.append(str(start))
+    if end:
+        # Inclusive end date: everything before the next day
+        query += f" AND {time_column} < date(?, '+1 day')"
+        params.append(str(end))
+    query += " GROUP BY 1, 2"
+
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    return pd.DataFrame(cursor.fetchall(), columns=["bucket", "value", "count"]).dropna(subset=["bucket"])
+
+
+# ---------------------------
+# DOWNSAMPLING (LTTB)
+# ---------------------------
+def lttb_indices(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+    Returns the indices of `threshold` points of (x, y) that keep the visual
+    shape of the series (peaks and drops are preserved, flat parts thinned).
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    # The points between the first and the last are split into threshold - 2 buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    previous = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+
+        # Average of the next bucket (or the last point for the final bucket)
+        next_start = stop
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_stop].mean()
+        avg_y = y[next_start:next_stop].mean()
+
+        # Keep the point forming the largest triangle with the previous pick and the next average
+        areas = np.abs(
+            (x[previous] - avg_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (avg_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+
+    return selected
+
+
+def downsample_series(df, max_points=MAX_CHART_POINTS):
+    """
+    Reduce a time-series DataFrame to at most max_points rows with LTTB.
+    Points are chosen on the sum of all columns so every column keeps
+    the same timestamps and the chart stays aligned.
+    """
+    if len(df) <= max_points:
+        return df
+
+    x = df.index.astype("int64").to_numpy()
+    y = df.sum(axis=1).to_numpy()
+    return df.iloc[lttb_indices(x, y, max_points)]
@@ -1,5 +1,5 @@
 import sqlite3
-from app.data.db import connect_database
+from app.data.db import connect_database, connect_readonly
 
 def insert_user(username, password_hash, role):
     """
@@ -34,7 +34,7 @@ def get_user_by_username(username):
     Returns a sqlite3.Row object (can be converted to dict for easier use).
     """
     # Establish a connection to the database
-    conn = connect_database()
+    conn = connect_readonly()
     # row_factory allows accessing columns by name (dict-like behavior)
     conn.row_factory = sqlite3.Row
     cur = conn.cursor()
@@ -0,0 +1,240 @@
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+
+from app.data import db
+from app.data.metrics import counter, gauge, histogram
+
+# Seconds run_write() waits for its operation to be committed before giving up
+WRITE_TIMEOUT = 30.0
+
+# Savepoint wrapping each operation of a batch: a failing operation is undone
+# on its own, the rest of the batch is still committed
+SAVEPOINT = "write_op"
+
+WRITE_OPS = counter("app_write_ops", "Operations run by the writer thread, by outcome", ["result"])
+WRITE_BATCH_SIZE = histogram(
+    "app_write_batch_size", "Operations per group commit", buckets=[1, 2, 5, 10, 25, 50, 100, 250, 500]
+)
+WRITE_BATCH_SECONDS = histogram("app_write_batch_seconds", "Duration of a batch transaction (operations and commit)")
+WRITE_WAIT_SECONDS = histogram("app_write_wait_seconds", "Time an operation waits in the queue before it runs")
+
+
+class _BatchConnection:
+    """
+    The writer's connection as seen by an operation. Data-layer functions
+    commit after their writes; inside a batch the writer commits once for
+    every operation, so commit() does nothing and rollback() only undoes
+    the current operation (back to its savepoint).
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        self._conn.execute(f"ROLLBACK TO {SAVEPOINT}")
+
+    def close(self):
+        pass
+
+
+# ---------------------------
+# SINGLE WRITER THREAD
+# ---------------------------
+class WriteQueue:
+    """
+    Every write of the app goes through one queue drained by one thread,
+    on one connection: sessions never compete for the SQLite write lock.
+    Operations waiting in the queue are group-committed: one transaction
+    (one fsync) per batch, one savepoint per operation. Callers get a
+    Future resolved once the batch is committed.
+    """
+
+    def __init__(self, batch_size=200, batch_window=0.002, max_pending=10000):
+        self.batch_size = batch_size        # Max operations per transaction
+        self.batch_window = batch_window    # Seconds the writer waits for more operations before committing
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        """
+        Start the writer thread once (safe to call from every rerun).
+        """
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self.thread.start()
+
+    def submit(self, operation, *args, **kwargs):
+        """
+        Queue operation(conn, *args, **kwargs) and return a Future holding
+        its return value, or its exception. Blocks while max_pending
+        operations are waiting: writes are slowed down, never dropped.
+        """
+        if threading.current_thread() is self.thread:
+            raise RuntimeError("Write operations cannot submit other writes (the writer would wait for itself)")
+        self.start()
+        future = Future()
+        self.queue.put((operation, args, kwargs, future, time.perf_counter()))
+        return future
+
+    def _run(self):
+        conn, path = None, None
+        while True:
+            # Block until one operation arrives, then take what comes within the batch window
+            batch = [self.queue.get()]
+            deadline = time.perf_counter() + self.batch_window
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get(timeout=max(deadline - time.perf_counter(), 0)))
+                except queue.Empty:
+                    break
+
+            try:
+                # DB_PATH can be changed at runtime (benchmarks): follow it
+                if conn is None or path != db.DB_PATH:
+                    if conn is not None:
+                        conn.close()
+                    conn, path = None, None
+                    conn, path = db.connect_database(db.DB_PATH), db.DB_PATH
+                    conn.isolation_level = None     # Transactions are opened and committed here
+                self._commit(conn, batch)
+            except BaseException as e:
+                # Anything escaping _commit (a failed ROLLBACK, an operation raising a
+                # BaseException): resolve the batch and start again on a new connection,
+                # the writer thread must never die with callers waiting on it
+                print(f"[writer] Batch of {len(batch)} operations aborted: {e!r}")
+                self._fail(batch, e if isinstance(e, Exception) else RuntimeError(f"Write aborted: {e!r}"))
+                try:
+                    if conn is not None:
+                        conn.close()
+                except Exception:
+                    pass
+                conn, path = None, None
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _fail(self, batch, error):
+        """
+        Give error to every operation of the batch not resolved yet.
+        """
+        for *_, future, _ in batch:
+            if future.done():
+                continue
+            if future.running() or future.set_running_or_notify_cancel():
+                WRITE_OPS.labels(result="error").inc()
+                future.set_exception(error)
+
+    def _commit(self, conn, batch):
+        started = time.perf_counter()
+        WRITE_BATCH_SIZE.observe(len(batch))
+        batch_conn = _BatchConnection(conn)
+        outcomes = []   # (future, result, error) of the operations run
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for operation, args, kwargs, future, queued_at in batch:
+                WRITE_WAIT_SECONDS.observe(started - queued_at)
+                if not future.set_running_or_notify_cancel():
+                    continue    # Cancelled while it was waiting
+                conn.execute(f"SAVEPOINT {SAVEPOINT}")
+                try:
+                    result = operation(batch_conn, *args, **kwargs)
+                except Exception as e:
+                    conn.execute(f"ROLLBACK TO {SAVEPOINT}")
+                    conn.execute(f"RELEASE {SAVEPOINT}")
+                    outcomes.append((future, None, e))
+                else:
+                    conn.execute(f"RELEASE {SAVEPOINT}")
+                    outcomes.append((future, result, None))
+            conn.execute("COMMIT")
+        except Exception as e:
+            # The transaction itself failed (lock held by another process, disk full...):
+            # nothing of the batch was written
+            print(f"[writer] Batch of {len(batch)} operations failed: {e}")
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            failed = {id(future) for future, _, error in outcomes if error is not None}
+            outcomes = [(future, None, error) for future, _, error in outcomes if id(future) in failed]
+            outcomes += [(item[3], None, e) for item in batch if id(item[3]) not in failed]
+        finally:
+            WRITE_BATCH_SECONDS.observe(time.perf_counter() - started)
+
+        # Results are only visible to the callers once the batch is committed
+        for future, result, error in outcomes:
+            if future.done():
+                continue
+            if error is None:
+                WRITE_OPS.labels(result="ok").inc()
+                future.set_result(result)
+            else:
+                WRITE_OPS.labels(result="error").inc()
+                future.set_exception(error)
+
+    def flush(self, timeout=5.0):
+        """
+        Wait (up to timeout seconds) until every queued operation is committed.
+        """
+        if self.thread is None or not self.thread.is_alive():
+            return
+        done = threading.Event()
+        threading.Thread(target=lambda: (self.queue.join(), done.set()), daemon=True).start()
+        done.wait(timeout)
+
+
+# Single writer shared by every page of the app
+_writer = WriteQueue()
+atexit.register(_writer.flush)
+gauge("app_write_queue_depth", "Write operations waiting for the writer thread").set_function(_writer.queue.qsize)
+
+
+def submit_write(operation, *args, **kwargs):
+    """
+    Queue a write without waiting for it. operation(conn, *args, **kwargs)
+    runs on the writer's connection; the returned Future gives its result.
+    """
+    return _writer.submit(operation, *args, **kwargs)
+
+
+def run_write(operation, *args, **kwargs):
+    """
+    Queue a write and wait until it is committed. Returns the operation's
+    result, or raises its exception; raises TimeoutError if it is not
+    committed within WRITE_TIMEOUT seconds.
+    """
+    return wait_write(_writer.submit(operation, *args, **kwargs))
+
+
+def wait_write(future, timeout=WRITE_TIMEOUT):
+    """
+    Result of a Future returned by submit_write(), waiting at most timeout
+    seconds: a stuck writer surfaces as a TimeoutError, never as a hung page.
+    """
+    try:
+        return future.result(timeout=timeout)
+    except FuturesTimeoutError:
+        future.cancel()     # Still queued: it will not run after the caller gave up
+        raise TimeoutError(f"Write not committed after {timeout:g} s (writer thread busy or stopped)") from None
+
+
+def flush_writes(timeout=5.0):
+    """
+    Block until queued writes are committed (used by scripts and tests).
+    """
+    _writer.flush(timeout)
@@ -0,0 +1,238 @@
+import threading
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from app.data.db import connect_database
+from app.data.summaries import TOTAL
+from app.data.write_queue import run_write
+
+# Incident series checked for spikes: the total plus each severity and category
+DIMENSIONS = [TOTAL, "severity", "category"]
+
+WINDOW_DAYS = 28        # Rolling baseline length (days before the checked day)
+MIN_HISTORY_DAYS = 7    # Days of history required before a day can be flagged
+Z_THRESHOLD = 3.0       # Standard deviations above the baseline to raise an alert
+EWMA_ALPHA = 0.3        # Smoothing factor of the exponentially weighted baseline
+MIN_COUNT = 3           # Ignore "spikes" of one or two incidents
+
+# How many days before the first unprocessed day are re-read to rebuild the baselines.
+# The EWMA started this far back has forgotten its starting value ((1 - alpha)^112 ~ 0).
+LOOKBACK_DAYS = 4 * WINDOW_DAYS
+
+# Seconds between two runs of the background job (incident writes ask for an earlier run)
+DETECTION_INTERVAL = 60
+
+
+# ---------------------------
+# LOAD DAILY SERIES
+# ---------------------------
+def _load_matrix(conn, dimension, since):
+    """
+    Read the daily incident counts of one dimension from summary_daily_counts
+    and return (values, days, matrix) where matrix[i, j] is the count of
+    values[i] on days[j]. Days without incidents are filled with 0.
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT bucket, value, count FROM summary_daily_counts
+        WHERE domain = 'incidents' AND dimension = ? AND bucket != 'unknown' AND bucket >= ?
+    """, (dimension, since))
+    rows = cursor.fetchall()
+    if not rows:
+        return [], np.array([], dtype="datetime64[D]"), np.zeros((0, 0))
+
+    buckets = np.array([row[0] for row in rows], dtype="datetime64[D]")
+    values = sorted({row[1] for row in rows})
+    value_index = {value: i for i, value in enumerate(values)}
+
+    first_day = buckets.min()
+    days = np.arange(first_day, buckets.max() + 1)
+    matrix = np.zeros((len(values), len(days)))
+
+    rows_idx = np.array([value_index[row[1]] for row in rows])
+    cols_idx = (buckets - first_day).astype(np.int64)
+    matrix[rows_idx, cols_idx] = [row[2] for row in rows]
+    return values, days, matrix
+
+
+# ---------------------------
+# BASELINES (VECTORIZED)
+# ---------------------------
+def rolling_zscores(matrix, window=WINDOW_DAYS, min_history=MIN_HISTORY_DAYS):
+    """
+    z-score of each day against the mean/std of the `window` previous days,
+    computed for every series at once with cumulative sums.
+    Days with less than `min_history` days of history get NaN.
+    """
+    n_series, n_days = matrix.shape
+    padded = np.zeros((n_series, n_days + 1))
+    padded_sq = np.zeros((n_series, n_days + 1))
+    np.cumsum(matrix, axis=1, out=padded[:, 1:])
+    np.cumsum(matrix ** 2, axis=1, out=padded_sq[:, 1:])
+
+    t = np.arange(n_days)
+    start = np.maximum(t - window, 0)
+    history = (t - start).astype(float)   # Number of days in the baseline of each day
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        total = padded[:, t] - padded[:, start]
+        total_sq = padded_sq[:, t] - padded_sq[:, start]
+        mean = total / history
+        variance = np.maximum(total_sq / history - mean ** 2, 0)
+        # A perfectly flat baseline would give an infinite z-score: use a floor of 1 incident
+        std = np.maximum(np.sqrt(variance), 1.0)
+        z = (matrix - mean) / std
+
+    z[:, history < min_history] = np.nan
+    return mean, z
+
+
+def ewma_zscores(matrix, alpha=EWMA_ALPHA, min_history=MIN_HISTORY_DAYS):
+    """
+    z-score of each day against an exponentially weighted moving mean/variance
+    of the previous days. The recursion runs over days, vectorized over series.
+    """
+    n_series, n_days = matrix.shape
+    z = np.full(matrix.shape, np.nan)
+    if n_days == 0:
+        return z
+
+    mean = matrix[:, 0].copy()
+    variance = np.zeros(n_series)
+    for day in range(1, n_days):
+        if day >= min_history:
+            z[:, day] = (matrix[:, day] - mean) / np.maximum(np.sqrt(variance), 1.0)
+        # Update the baseline with the current day
+        diff = matrix[:, day] - mean
+        mean = mean + alpha * diff
+        variance = (1 - alpha) * (variance + alpha * diff ** 2)
+    return z
+
+
+# ---------------------------
+# RUN DETECTION (INCREMENTAL)
+# ---------------------------
+def run_anomaly_detection(conn=None):
+    """
+    Flag incident spikes per day, for the total and for each severity/category.
+    Only days after the last processed day are evaluated (the last one is
+    re-evaluated because it may have been incomplete); the baselines are
+    rebuilt from the LOOKBACK_DAYS before it. Alerts are stored in
+    incident_alerts, which the Cybersecurity page reads directly.
+    Returns the number of alerts written.
+    """
+    local_conn = False
+    if conn is None:
+        conn = connect_database()
+        local_conn = True
+
+    cursor = conn.cursor()
+    created_at = datetime.now().isoformat()
+    written = 0
+
+    for dimension in DIMENSIONS:
+        series_key = f"incidents:{dimension}"
+        cursor.execute("SELECT last_bucket FROM anomaly_state WHERE series_key = ?", (series_key,))
+        row = cursor.fetchone()
+        last_bucket = row[0] if row else None
+
+        since = "0000-00-00"
+        if last_bucket:
+            since = (date.fromisoformat(last_bucket) - timedelta(days=LOOKBACK_DAYS)).isoformat()
+
+        values, days, matrix = _load_matrix(conn, dimension, since)
+        if len(days) == 0:
+            continue
+
+        mean, rolling_z = rolling_zscores(matrix)
+        ewma_z = ewma_zscores(matrix)
+
+        # Only days not processed yet (including the last processed one)
+        todo = np.ones(len(days), dtype=bool)
+        if last_bucket:
+            todo = days >= np.datetime64(last_bucket)
+
+        with np.errstate(invalid="ignore"):
+            flagged = (
+                todo[np.newaxis, :]
+                & (matrix >= MIN_COUNT)
+                & ((rolling_z >= Z_THRESHOLD) | (ewma_z >= Z_THRESHOLD))
+            )
+
+        alerts = []
+        for i, j in zip(*np.nonzero(flagged)):
+            method = "zscore" if rolling_z[i, j] >= Z_THRESHOLD else "ewma"
+            alerts.append((
+                str(days[j]), dimension, values[i], int(matrix[i, j]), float(mean[i, j]),
+                float(np.nan_to_num(rolling_z[i, j])), float(np.nan_to_num(ewma_z[i, j])), method, created_at
+            ))
+
+        # Re-evaluated days replace their previous alerts
+        first_todo = str(days[todo][0]) if todo.any() else None
+        if first_todo:
+            cursor.execute(
+                "DELETE FROM incident_alerts WHERE dimension = ? AND bucket >= ?",
+                (dimension, first_todo)
+            )
+        cursor.executemany("""
+            INSERT INTO incident_alerts (bucket, dimension, value, count, baseline, zscore, ewma_zscore, method, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, alerts)
+        written += len(alerts)
+
+        cursor.execute("""
+            INSERT INTO anomaly_state (series_key, last_bucket) VALUES (?, ?)
+            ON CONFLICT (series_key) DO UPDATE SET last_bucket = excluded.last_bucket
+        """, (series_key, str(days[-1])))
+
+    conn.commit()
+    if local_conn:
+        conn.close()
+    return written
+
+
+# Single detection worker of the process, shared by every session
+_worker = None
+_worker_lock = threading.Lock()
+_run_requested = threading.Event()
+
+
+def _detection_loop(interval):
+    while True:
+        try:
+            # On the writer thread: the read-state / delete / insert sequence of
+            # a run never overlaps another run or competes with other writes
+            count = run_write(run_anomaly_detection)
+            if count:
+                print(f"[anomaly] {count} alerts written.")
+        except Exception as e:
+            print(f"[anomaly] Error running detection: {e}")
+        _run_requested.wait(interval)
+        _run_requested.clear()
+
+
+def start_anomaly_detection_in_background(interval=DETECTION_INTERVAL):
+    """
+    Start the process-wide detection worker once (safe to call from every
+    session): it runs the incremental job every interval seconds, or sooner
+    after request_anomaly_detection(). Page rendering never waits for it.
+    """
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_detection_loop, args=(interval,), name="anomaly-detection", daemon=True)
+            _worker.start()
+
+
+def request_anomaly_detection():
+    """
+    Ask the worker for a run now, e.g. after incidents were added or deleted.
+    Requests made while a run is going on are merged into the next run.
+    """
+    start_anomaly_detection_in_background()
+    _run_requested.set()
+
+
+# Command line (e.g. from cron): python -m app.services.anomaly_service
+if __name__ == "__main__":
+    print(f"✅ {run_anomaly_detection()} alerts written.")
@@ -0,0 +1,72 @@
+import time
+from app.data.metrics import counter, histogram
+from app.data.telemetry import record_llm_call
+
+# Chat buckets go higher than the default ones: a long answer takes tens of seconds
+CHAT_BUCKETS = [0.25, 0.5, 1, 2, 3, 5, 8, 13, 20, 30, 60]
+
+CHAT_REQUESTS = counter("app_chat_requests", "Chat calls to the LLM", ["domain", "status"])
+CHAT_SECONDS = histogram("app_chat_latency_seconds", "Full chat reply latency", ["domain"], buckets=CHAT_BUCKETS)
+CHAT_TTFT_SECONDS = histogram("app_chat_ttft_seconds", "Time to the first streamed chunk", ["domain"], buckets=CHAT_BUCKETS)
+CHAT_TOKENS = counter("app_chat_tokens", "Tokens sent to and received from the LLM", ["domain", "direction"])
+
+
+# ---------------------------
+# GENERATE REPLY (INSTRUMENTED)
+# ---------------------------
+def generate_reply(model, contents, generation_config, username, domain):
+    """
+    Send a conversation to Gemini and return the reply text.
+    The call is streamed so the time to first token can be measured.
+    Every call, successful or not, is recorded in the telemetry table
+    (latency, tokens, model, domain and error class); errors are re-raised.
+    """
+    started = time.perf_counter()
+    ttft_ms = None
+    usage = None
+
+    try:
+        response = model.generate_content(
+            contents=contents,
+            generation_config=generation_config,
+            stream=True
+        )
+
+        parts = []
+        for chunk in response:
+            if ttft_ms is None:
+                # First chunk received: this is what the user perceives as "thinking time"
+                ttft_ms = (time.perf_counter() - started) * 1000
+            if chunk.parts:
+                parts.append(chunk.text)
+
+        # Token counts are available once the stream is fully consumed
+        usage = getattr(response, "usage_metadata", None)
+        reply = "".join(parts)
+    except Exception as e:
+        CHAT_REQUESTS.labels(domain=domain, status="error").inc()
+        CHAT_SECONDS.labels(domain=domain).observe(time.perf_counter() - started)
+        record_llm_call(
+            username, domain, model.model_name, ttft_ms,
+            (time.perf_counter() - started) * 1000,
+            error_class=type(e).__name__
+        )
+        raise
+
+    latency = time.perf_counter() - started
+    CHAT_REQUESTS.labels(domain=domain, status="ok").inc()
+    CHAT_SECONDS.labels(domain=domain).observe(latency)
+    if ttft_ms is not None:
+        CHAT_TTFT_SECONDS.labels(domain=domain).observe(ttft_ms / 1000)
+    for direction, field in (("input", "prompt_token_count"), ("output", "candidates_token_count")):
+        tokens = getattr(usage, field, None)
+        if tokens:
+            CHAT_TOKENS.labels(domain=domain, direction=direction).inc(tokens)
+
+    record_llm_call(
+        username, domain, model.model_name, ttft_ms,
+        latency * 1000,
+        input_tokens=getattr(usage, "prompt_token_count", None),
+        output_tokens=getattr(usage, "candidates_token_count", None)
+    )
+    return reply
@@ -0,0 +1,176 @@
+import io
+import json
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from app.data.dataset_store import iter_dataset_batches
+from app.data.sketches import TDigest
+from app.data.write_queue import run_write
+
+SAMPLE_ROWS = 1000      # Rows kept in the uniform sample shown on the page
+HISTOGRAM_BINS = 20     # Bins of the numeric column histograms
+TOP_VALUES = 10         # Bars of the text column histograms
+MAX_TRACKED_VALUES = 1000   # Distinct text values counted per column (the rarest are dropped)
+
+
+# ---------------------------
+# SINGLE-PASS ACCUMULATORS
+# ---------------------------
+class ReservoirSample:
+    """
+    Uniform random sample of `size` rows from a stream of DataFrame batches
+    (reservoir sampling, Algorithm R vectorized per batch): row number j
+    replaces a random slot with probability size / (j + 1), so every row
+    of the stream ends up in the sample with the same probability.
+    """
+
+    def __init__(self, size=SAMPLE_ROWS, seed=None):
+        self.size = size
+        self.seen = 0
+        self.rng = np.random.default_rng(seed)
+        self.rows = None    # DataFrame indexed by slot number
+
+    def add(self, batch):
+        n = len(batch)
+        if n == 0:
+            return
+        positions = np.arange(self.seen, self.seen + n)
+        # Rows that fill free slots, then random replacements
+        slots = np.where(positions < self.size, positions, self.rng.integers(0, positions + 1))
+        accepted = slots < self.size
+        self.seen += n
+
+        chosen = pd.Series(np.nonzero(accepted)[0], index=slots[accepted])
+        # When one slot is hit twice in the batch, the later row wins
+        chosen = chosen[~chosen.index.duplicated(keep="last")]
+        incoming = batch.iloc[chosen.to_numpy()].set_axis(chosen.index)
+
+        if self.rows is None:
+            self.rows = incoming
+        else:
+            self.rows = pd.concat([self.rows.drop(incoming.index, errors="ignore"), incoming])
+
+    def to_frame(self):
+        if self.rows is None:
+            return pd.DataFrame()
+        return self.rows.sort_index().reset_index(drop=True)
+
+
+class ColumnHistogram:
+    """
+    Histogram of one column built in the same pass: a t-digest for numeric
+    columns (bins are derived from its CDF at the end) and bounded value
+    counts for text columns. The type is fixed by the first batch holding
+    values; later values of a numeric column that are not numbers (an
+    "N/A" deep in a file) are counted apart instead of changing the type.
+    """
+
+    def __init__(self):
+        self.digest = TDigest()
+        self.counts = pd.Series(dtype="int64")
+        self.numeric = None     # Unknown until a batch has values
+        self.non_numeric = 0
+
+    def add(self, series):
+        values = series.dropna()
+        if values.empty:
+            return
+        if self.numeric is None:
+            self.numeric = values.dtype.kind in "iuf"
+        if self.numeric:
+            numbers = pd.to_numeric(values, errors="coerce")
+            self.non_numeric += int(numbers.isna().sum())
+            self.digest.add_array(numbers.dropna().to_numpy(dtype=float))
+        else:
+            self.counts = self.counts.add(values.astype(str).value_counts(), fill_value=0)
+            if len(self.counts) > MAX_TRACKED_VALUES:
+                self.counts = self.counts.nlargest(MAX_TRACKED_VALUES)
+
+    def to_dict(self):
+        if self.numeric:
+            labels, counts = [], []
+            if self.digest.total:
+                edges = np.linspace(self.digest.min, self.digest.max, HISTOGRAM_BINS + 1)
+                cumulative = np.array([0.0] + [self.digest.cdf(edge) for edge in edges[1:]]) * self.digest.total
+                labels = [f"{low:.4g} – {high:.4g}" for low, high in zip(edges[:-1], edges[1:])]
+                counts = np.round(np.diff(cumulative)).astype(int).tolist()
+            return {"type": "numeric", "labels": labels, "counts": counts, "non_numeric": self.non_numeric}
+        top = self.counts.nlargest(TOP_VALUES)
+        return {"type": "text", "labels": top.index.tolist(), "counts": top.astype(int).tolist()}
+
+
+# ---------------------------
+# BUILD / READ PREVIEWS
+# ---------------------------
+def build_preview(content_hash, columns=None, sample_rows=SAMPLE_ROWS):
+    """
+    Read a stored dataset once, batch by batch, and return
+    (sample DataFrame, {column: histogram dict}, row count).
+    Histograms are built for the given columns only (None: every column).
+    """
+    # Seeded by the content so the same file always gives the same sample
+    sample = ReservoirSample(sample_rows, seed=int(content_hash[:8], 16))
+    histograms = {}
+    rows = 0
+    for batch in iter_dataset_batches(content_hash):
+        rows += len(batch)
+        sample.add(batch)
+        for name in (batch.columns if columns is None else [c for c in columns if c in batch.columns]):
+            histograms.setdefault(name, ColumnHistogram()).add(batch[name])
+    return sample.to_frame(), {name: h.to_dict() for name, h in histograms.items()}, rows
+
+
+def build_histograms(content_hash, columns):
+    """
+    Histograms of some columns of a stored dataset, reading only those columns.
+    """
+    histograms = {name: ColumnHistogram() for name in columns}
+    for batch in iter_dataset_batches(content_hash, columns=list(columns)):
+        for name in columns:
+            histograms[name].add(batch[name])
+    return {name: h.to_dict() for name, h in histograms.items()}
+
+
+def get_dataset_preview(conn, content_hash, columns=()):
+    """
+    Return (sample DataFrame, histograms, row count) for a stored dataset,
+    with the histograms of the requested columns only.
+    The sample and the histograms built so far are cached in
+    dataset_previews by content hash: the sample pass runs once per
+    distinct file, and a column's histogram once, when first requested.
+    conn is only read.
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT sample, histograms, rows FROM dataset_previews WHERE content_hash = ?",
+        (content_hash,)
+    )
+    row = cursor.fetchone()
+    if row is None:
+        sample, histograms, rows = build_preview(content_hash, list(columns))
+    else:
+        sample, histograms, rows = pd.read_json(io.StringIO(row[0]), orient="split"), json.loads(row[1]), row[2]
+        missing = [name for name in columns if name not in histograms]
+        if not missing:
+            return sample, {name: histograms[name] for name in columns}, rows
+        histograms.update(build_histograms(content_hash, missing))
+
+    # Built outside the writer thread, only the cache insert is queued
+    run_write(_store_preview, content_hash, rows, sample.to_json(orient="split", index=False), json.dumps(histograms))
+    return sample, {name: histograms[name] for name in columns if name in histograms}, rows
+
+
+def _store_preview(conn, content_hash, rows, sample_json, histograms_json):
+    conn.execute("""
+        INSERT OR REPLACE INTO dataset_previews (content_hash, rows, sample, histograms, created_at)
+        VALUES (?, ?, ?, ?, ?)
+    """, (content_hash, rows, sample_json, histograms_json, datetime.now().isoformat()))
+    conn.commit()
+
+
+def histogram_frame(histogram):
+    """
+    Histogram dict as a DataFrame ready for st.bar_chart (labels as index).
+    """
+    return pd.DataFrame({"count": histogram["counts"]}, index=pd.Index(histogram["labels"], name="value"))
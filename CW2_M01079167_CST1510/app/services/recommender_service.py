@@ -0,0 +1,182 @@
+import math
+import threading
+from collections import Counter, defaultdict
+
+import pandas as pd
+from app.data.search import get_row_changes
+from app.services.retrieval_service import tokenize
+
+# Statuses of tickets whose resolution can be reused
+RESOLVED_STATUSES = ("Resolved", "Closed")
+
+# Document norms are recomputed once the collection has grown by this
+# fraction since the last computation (IDF values drift as tickets arrive)
+NORM_REFRESH_GROWTH = 0.1
+
+
+# ---------------------------
+# SPARSE TF-IDF INDEX
+# ---------------------------
+class TfidfIndex:
+    """
+    Sparse TF-IDF matrix over ticket titles and descriptions, stored as an
+    inverted index (term -> {rowid: term frequency}). A query only visits
+    the postings of its own terms, so its cost depends on how many tickets
+    share those terms, not on the size of the ticket history.
+    New tickets are added incrementally using the rowid as a watermark;
+    tickets deleted or edited since (retrieval_changes) are re-read.
+    """
+
+    def __init__(self):
+        self.postings = defaultdict(dict)   # term -> {rowid: term frequency}
+        self.doc_terms = {}                 # rowid -> Counter of terms
+        self.norms = {}                     # rowid -> length of the TF-IDF vector
+        self.watermark = 0                  # Highest rowid already indexed
+        self.change_seq = None              # Last retrieval_changes entry applied
+        self.norms_doc_count = 0            # Collection size when norms were last computed
+        self.lock = threading.Lock()        # Streamlit sessions share this index
+
+    def idf(self, term):
+        """
+        Smoothed inverse document frequency of a term.
+        """
+        return math.log((1 + len(self.doc_terms)) / (1 + len(self.postings.get(term, ())))) + 1
+
+    def _weight(self, term, freq):
+        # Sublinear term frequency: a word repeated 10 times is not 10 times as relevant
+        return (1 + math.log(freq)) * self.idf(term)
+
+    def _norm(self, terms):
+        return math.sqrt(sum(self._weight(term, freq) ** 2 for term, freq in terms.items()))
+
+    def add_document(self, rowid, text):
+        """
+        Add a single ticket to the index.
+        """
+        terms = Counter(tokenize(text))
+        self.doc_terms[rowid] = terms
+        for term, freq in terms.items():
+            self.postings[term][rowid] = freq
+        self.norms[rowid] = self._norm(terms)
+
+    def remove_document(self, rowid):
+        """
+        Remove a single ticket (deleted or edited) from the index.
+        """
+        for term in self.doc_terms.pop(rowid, ()):
+            docs = self.postings[term]
+            docs.pop(rowid, None)
+            if not docs:
+                del self.postings[term]
+        self.norms.pop(rowid, None)
+
+    def _index_rows(self, cursor, where, params):
+        cursor.execute(f"SELECT rowid, title, description FROM it_tickets WHERE {where} ORDER BY rowid", params)
+        for rowid, title, description in cursor.fetchall():
+            self.add_document(rowid, " ".join(v for v in (title, description) if v))
+            self.watermark = max(self.watermark, rowid)
+
+    def refresh(self, conn):
+        """
+        Index only the tickets inserted since the last refresh, and re-read
+        the ones deleted or edited since (a deleted rowid may have been
+        reused by a new ticket).
+        """
+        cursor = conn.cursor()
+        with self.lock:
+            changed, self.change_seq = get_row_changes(conn, "it_tickets", self.change_seq)
+            if changed is None:
+                # First refresh, or too far behind the change log: index everything
+                self.postings.clear()
+                self.doc_terms.clear()
+                self.norms.clear()
+                self.watermark = self.norms_doc_count = 0
+                changed = set()
+
+            stale = sorted(rowid for rowid in changed if rowid <= self.watermark)
+            for rowid in stale:
+                self.remove_document(rowid)
+            for start in range(0, len(stale), 500):
+                chunk = stale[start:start + 500]
+                self._index_rows(cursor, f"rowid IN ({', '.join('?' for _ in chunk)})", chunk)
+            self._index_rows(cursor, "rowid > ?", (self.watermark,))
+
+            doc_count = len(self.doc_terms)
+            if doc_count > self.norms_doc_count * (1 + NORM_REFRESH_GROWTH):
+                self.norms = {rowid: self._norm(terms) for rowid, terms in self.doc_terms.items()}
+                self.norms_doc_count = doc_count
+
+    def scores(self, text):
+        """
+        Cosine similarity between the text and every ticket sharing a term with it,
+        as a {rowid: score} dict.
+        """
+        query_terms = Counter(tokenize(text))
+        with self.lock:
+            query_weights = {t: self._weight(t, f) for t, f in query_terms.items() if t in self.postings}
+            query_norm = math.sqrt(sum(w ** 2 for w in query_weights.values()))
+            if not query_norm:
+                return {}
+
+            dot = defaultdict(float)
+            for term, query_weight in query_weights.items():
+                idf = self.idf(term)
+                for rowid, freq in self.postings[term].items():
+                    dot[rowid] += query_weight * (1 + math.log(freq)) * idf
+
+            return {rowid: value / (query_norm * self.norms[rowid]) for rowid, value in dot.items() if self.norms[rowid]}
+
+
+# One index per database file, shared by every page of the app
+_INDEXES = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_ticket_index(conn):
+    """
+    Return the shared, up to date TF-IDF index for the database behind this connection.
+    """
+    db_file = conn.execute("PRAGMA database_list").fetchone()[2]
+    with _INDEXES_LOCK:
+        if db_file not in _INDEXES:
+            _INDEXES[db_file] = TfidfIndex()
+        index = _INDEXES[db_file]
+    index.refresh(conn)
+    return index
+
+
+# ---------------------------
+# RECOMMEND SIMILAR TICKETS
+# ---------------------------
+def recommend_similar_tickets(conn, text, k=5, exclude_ticket_id=None):
+    """
+    Return the k resolved tickets most similar to the given title/description,
+    with who resolved them and how long it took, as a DataFrame sorted by similarity.
+    Candidates are ranked in memory, then read back in small batches so that
+    tickets reopened, deleted or not resolved yet are skipped.
+    """
+    columns = ["ticket_id", "title", "description", "priority", "assigned_to", "resolution_time_hours", "status"]
+    ranked = sorted(get_ticket_index(conn).scores(text).items(), key=lambda item: item[1], reverse=True)
+
+    cursor = conn.cursor()
+    records = []
+    batch_size = max(4 * k, 20)
+    for start in range(0, len(ranked), batch_size):
+        batch = dict(ranked[start:start + batch_size])
+        cursor.execute(f"""
+            SELECT rowid, {', '.join(columns)} FROM it_tickets
+            WHERE rowid IN ({', '.join('?' for _ in batch)})
+            AND status IN ({', '.join('?' for _ in RESOLVED_STATUSES)})
+        """, (*batch, *RESOLVED_STATUSES))
+        for row in cursor.fetchall():
+            record = dict(zip(columns, row[1:]))
+            if exclude_ticket_id is not None and str(record["ticket_id"]) == str(exclude_ticket_id):
+                continue
+            record["similarity"] = round(batch[row[0]], 3)
+            records.append(record)
+        if len(records) >= k:
+            break
+
+    df = pd.DataFrame(records, columns=columns + ["similarity"])
+    df = df.rename(columns={"assigned_to": "resolved_by"})
+    return df.sort_values("similarity", ascending=False).head(k).reset_index(drop=True)
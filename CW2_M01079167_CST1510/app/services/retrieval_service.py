@@ -0,0 +1,269 @@
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+from app.data.search import RETRIEVAL_COLUMNS, get_row_changes
+
+# ---------------------------
+# SOURCES USED FOR RETRIEVAL
+# ---------------------------
+# Each source describes which table feeds the index, which columns are
+# searchable and how a row is rendered as a line of prompt context.
+SOURCES = {
+    "cyber_incidents": {
+        "columns": RETRIEVAL_COLUMNS["cyber_incidents"],
+        "label": "Incident",
+    },
+    "it_tickets": {
+        "columns": RETRIEVAL_COLUMNS["it_tickets"],
+        "label": "Ticket",
+    },
+    "datasets_metadata": {
+        "columns": RETRIEVAL_COLUMNS["datasets_metadata"],
+        "label": "Dataset",
+    },
+}
+
+# Which tables each chat page is allowed to pull context from
+DOMAIN_SOURCES = {
+    "cybersecurity": ["cyber_incidents"],
+    "datascience": ["datasets_metadata"],
+    "itoperations": ["it_tickets"],
+}
+
+# Very common words that carry no meaning for ranking
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "is",
+    "it", "many", "me", "of", "on", "or", "show", "that", "the", "this", "to", "was",
+    "what", "when", "which", "who", "why", "with",
+}
+
+# BM25 tuning constants (standard values)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """
+    Split a piece of text into lowercase search terms.
+    Stopwords and empty values are removed.
+    """
+    if text is None:
+        return []
+    return [t for t in TOKEN_PATTERN.findall(str(text).lower()) if t not in STOPWORDS]
+
+
+def estimate_tokens(text):
+    """
+    Rough LLM token estimate (about 4 characters per token).
+    Good enough to keep the prompt under a budget without a tokenizer.
+    """
+    return len(text) // 4 + 1
+
+
+# ---------------------------
+# LEXICAL INDEX
+# ---------------------------
+class LexicalIndex:
+    """
+    In-memory inverted index with BM25 ranking.
+    Documents are identified by (table, rowid) so the current row can be
+    re-read from the database when the context is built.
+    """
+
+    def __init__(self):
+        self.postings = defaultdict(dict)   # term -> {doc_key: term frequency}
+        self.doc_terms = {}                 # doc_key -> terms of the document (to remove it)
+        self.doc_lengths = {}               # doc_key -> number of terms
+        self.total_length = 0               # Sum of all document lengths
+        self.watermarks = {}                # table -> highest rowid already indexed
+        self.change_seqs = {}               # table -> last retrieval_changes entry applied
+        self.lock = threading.Lock()        # Streamlit sessions share this index
+
+    def add_document(self, doc_key, text):
+        """
+        Add a single document to the index.
+        """
+        terms = Counter(tokenize(text))
+        for term, freq in terms.items():
+            self.postings[term][doc_key] = freq
+        length = sum(terms.values())
+        self.doc_terms[doc_key] = tuple(terms)
+        self.doc_lengths[doc_key] = length
+        self.total_length += length
+
+    def remove_document(self, doc_key):
+        """
+        Remove a single document (deleted or changed row) from the index.
+        """
+        for term in self.doc_terms.pop(doc_key, ()):
+            docs = self.postings[term]
+            docs.pop(doc_key, None)
+            if not docs:
+                del self.postings[term]
+        self.total_length -= self.doc_lengths.pop(doc_key, 0)
+
+    def remove_table(self, table):
+        """
+        Drop every document of a table from the index.
+        """
+        for doc_key in [key for key in self.doc_terms if key[0] == table]:
+            self.remove_document(doc_key)
+        self.watermarks.pop(table, None)
+
+    def _index_rows(self, cursor, table, where, params):
+        columns = SOURCES[table]["columns"]
+        cursor.execute(f"SELECT rowid, {', '.join(columns)} FROM {table} WHERE {where} ORDER BY rowid", params)
+        last_rowid = None
+        for row in cursor.fetchall():
+            last_rowid = row[0]
+            self.add_document((table, last_rowid), " ".join(str(v) for v in row[1:] if v is not None))
+        return last_rowid
+
+    def refresh(self, conn, tables):
+        """
+        Index only the rows inserted since the last refresh.
+        Uses the rowid of each table as a watermark, so each call is
+        proportional to the number of new rows, not to the table size.
+        Rows deleted or updated since (retrieval_changes) are removed and
+        read again: a deleted rowid may have been reused by an insert.
+        """
+        cursor = conn.cursor()
+        with self.lock:
+            for table in tables:
+                changed, self.change_seqs[table] = get_row_changes(conn, table, self.change_seqs.get(table))
+                if changed is None:
+                    # First refresh, or too far behind the change log
+                    self.remove_table(table)
+                    changed = set()
+
+                watermark = self.watermarks.get(table, 0)
+                stale = sorted(rowid for rowid in changed if rowid <= watermark)
+                for rowid in stale:
+                    self.remove_document((table, rowid))
+                for start in range(0, len(stale), 500):
+                    chunk = stale[start:start + 500]
+                    self._index_rows(cursor, table, f"rowid IN ({', '.join('?' for _ in chunk)})", chunk)
+
+                last_rowid = self._index_rows(cursor, table, "rowid > ?", (watermark,))
+                if last_rowid is not None:
+                    self.watermarks[table] = last_rowid
+                else:
+                    self.watermarks.setdefault(table, watermark)
+
+    def search(self, query, tables, k=10):
+        """
+        Return the k best (doc_key, score) pairs for the query,
+        restricted to the given tables.
+        """
+        query_terms = set(tokenize(query))
+        with self.lock:
+            doc_count = len(self.doc_lengths)
+            if doc_count == 0 or not query_terms:
+                return []
+            avg_length = self.total_length / doc_count
+
+            scores = defaultdict(float)
+            for term in query_terms:
+                docs = self.postings.get(term)
+                if not docs:
+                    continue
+                # Rare terms weigh more than frequent ones
+                idf = math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+                for doc_key, freq in docs.items():
+                    if doc_key[0] not in tables:
+                        continue
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[doc_key] / avg_length)
+                    scores[doc_key] += idf * freq * (BM25_K1 + 1) / (freq + norm)
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+# One index per database file, shared by every page of the app
+_INDEXES = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_index(conn):
+    """
+    Return the shared index for the database behind this connection.
+    """
+    db_file = conn.execute("PRAGMA database_list").fetchone()[2]
+    with _INDEXES_LOCK:
+        if db_file not in _INDEXES:
+            _INDEXES[db_file] = LexicalIndex()
+        return _INDEXES[db_file]
+
+
+# ---------------------------
+# RETRIEVE RECORDS
+# ---------------------------
+def retrieve_records(conn, question, domain=None, k=8):
+    """
+    Return up to k rows relevant to the question as (table, row_dict, score).
+    Rows are read back from the database so deleted rows are skipped
+    and updated rows show their current values.
+    """
+    tables = DOMAIN_SOURCES.get(domain, list(SOURCES))
+    index = get_index(conn)
+    index.refresh(conn, tables)
+
+    cursor = conn.cursor()
+    records = []
+    for (table, rowid), score in index.search(question, tables, k):
+        columns = SOURCES[table]["columns"]
+        cursor.execute(f"SELECT {', '.join(columns)} FROM {table} WHERE rowid = ?", (rowid,))
+        row = cursor.fetchone()
+        if row is not None:
+            records.append((table, dict(zip(columns, row)), score))
+    return records
+
+
+def format_record(table, record):
+    """
+    Render one row as a compact single line of prompt context.
+    """
+    fields = "; ".join(f"{key}={value}" for key, value in record.items() if value is not None)
+    return f"- {SOURCES[table]['label']}: {fields}"
+
+
+# ---------------------------
+# BUILD GROUNDED PROMPT
+# ---------------------------
+def build_grounded_prompt(conn, question, domain=None, k=8, token_budget=800):
+    """
+    Wrap the user's question with the most relevant local records.
+    Records are added in ranking order until the token budget is used,
+    so the prompt stays small whatever the size of the tables.
+    Returns the question unchanged when nothing relevant is found.
+    """
+    try:
+        records = retrieve_records(conn, question, domain, k)
+    except Exception as e:
+        # Retrieval must never block the chat: fall back to the raw question
+        print(f"[retrieval] Error building context: {e}")
+        return question
+
+    lines = []
+    used_tokens = 0
+    for table, record, _score in records:
+        line = format_record(table, record)
+        cost = estimate_tokens(line)
+        if used_tokens + cost > token_budget:
+            continue  # Too big for what is left, a shorter record may still fit
+        lines.append(line)
+        used_tokens += cost
+
+    if not lines:
+        return question
+
+    context = "\n".join(lines)
+    return (
+        "Use the following records from our platform database when they are relevant "
+        "to the question. Say so if they do not contain the answer.\n\n"
+        f"{context}\n\n"
+        f"Question: {question}"
+    )
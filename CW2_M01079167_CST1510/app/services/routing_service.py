@@ -0,0 +1,231 @@
+import heapq
+import threading
+import time
+
+from app.data.tickets import insert_ticket
+
+# Weight of an open ticket in an assignee's load, by priority
+PRIORITY_WEIGHTS = {"Critical": 4, "High": 3, "Medium": 2, "Low": 1}
+DEFAULT_WEIGHT = 2
+
+# Statuses counted as workload (everything not resolved or closed)
+OPEN_STATUSES = ("Open", "In Progress", "Waiting for User")
+
+# The shared router reloads loads from the database after this many seconds,
+# to pick up tickets closed or reassigned elsewhere
+REFRESH_SECONDS = 300
+
+
+def priority_weight(priority):
+    return PRIORITY_WEIGHTS.get(priority, DEFAULT_WEIGHT)
+
+
+def known_assignees(conn):
+    """
+    Return every assignee that has tickets, read from the summary table
+    instead of a DISTINCT over the whole ticket history.
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT value FROM summary_counts
+        WHERE domain = 'tickets' AND dimension = 'assigned_to' AND value != 'Unknown'
+    """)
+    return [row[0] for row in cursor.fetchall()]
+
+
+# ---------------------------
+# LEAST-LOADED ROUTER
+# ---------------------------
+class TicketRouter:
+    """
+    Keeps assignees in a min-heap keyed by their open-ticket load
+    (sum of the priority weights of their open tickets).
+    Assigning a ticket pops the least-loaded assignee and pushes it back
+    with its new load: O(log n) per ticket. Outdated heap entries are
+    skipped when popped (lazy deletion) instead of being searched for.
+    """
+
+    def __init__(self, loads=None):
+        self.loads = dict(loads or {})
+        self.heap = [(load, name) for name, load in self.loads.items()]
+        heapq.heapify(self.heap)
+        self.loaded_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_database(cls, conn, assignees=None):
+        """
+        Build a router from the open tickets in it_tickets.
+        assignees restricts (or extends) the pool; by default every
+        assignee found in the table is part of it.
+        """
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT assigned_to, priority, COUNT(*) FROM it_tickets
+            WHERE assigned_to IS NOT NULL AND status IN ({', '.join('?' for _ in OPEN_STATUSES)})
+            GROUP BY assigned_to, priority
+        """, OPEN_STATUSES)
+        open_counts = cursor.fetchall()
+
+        if assignees is None:
+            assignees = known_assignees(conn)
+
+        loads = {name: 0 for name in assignees}
+        for name, priority, count in open_counts:
+            if name in loads:
+                loads[name] += priority_weight(priority) * count
+        return cls(loads)
+
+    def assign(self, priority):
+        """
+        Return the least-loaded assignee and add the ticket to its load.
+        Returns None when there is no assignee in the pool.
+        """
+        with self.lock:
+            while self.heap:
+                load, name = heapq.heappop(self.heap)
+                if self.loads.get(name) != load:
+                    continue  # Outdated entry, a newer one is in the heap
+                self.loads[name] = load + priority_weight(priority)
+                heapq.heappush(self.heap, (self.loads[name], name))
+                return name
+            return None
+
+    def release(self, name, priority):
+        """
+        Remove a resolved ticket from an assignee's load.
+        """
+        with self.lock:
+            if name in self.loads:
+                self.loads[name] = max(self.loads[name] - priority_weight(priority), 0)
+                heapq.heappush(self.heap, (self.loads[name], name))
+
+
+# Router shared by every page of the app
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router(conn):
+    """
+    Return the shared router, (re)loading it from the database when needed.
+    """
+    global _router
+    with _router_lock:
+        if _router is None or time.monotonic() - _router.loaded_at > REFRESH_SECONDS:
+            _router = TicketRouter.from_database(conn)
+        return _router
+
+
+def route_ticket(conn, priority):
+    """
+    Pick the assignee for one new ticket.
+    """
+    return get_router(conn).assign(priority)
+
+
+def insert_routed_ticket(conn, ticket_id, title, status, priority, assigned_to, description,
+                         created_at=None, resolution_time_hours=None):
+    """
+    Write operation (run by the writer thread) inserting one ticket. A ticket
+    without an assignee goes to the least-loaded one, or stays unassigned
+    (NULL) when there is nobody to route to. The assignee's load is given
+    back if the insert fails, so rejected rows never count as work.
+    Returns the assignee.
+    """
+    router = None
+    if assigned_to is None:
+        router = get_router(conn)
+        assigned_to = router.assign(priority)
+    try:
+        insert_ticket(conn, ticket_id, title, status, priority, assigned_to, description,
+                      created_at, resolution_time_hours)
+    except Exception:
+        if router is not None and assigned_to is not None:
+            router.release(assigned_to, priority)
+        raise
+    return assigned_to
+
+
+# ---------------------------
+# BATCH REBALANCING
+# ---------------------------
+def rebalance_open_tickets(conn):
+    """
+    Even out the open-ticket load across the current assignees.
+    Open tickets without a known assignee are routed first. Then tickets
+    are moved from the most-loaded to the least-loaded assignee (two heaps)
+    as long as a move narrows the gap, so an already balanced team gets no
+    changes. All updates are written in a single transaction.
+    Returns the number of tickets reassigned.
+    """
+    global _router
+    assignees = known_assignees(conn)
+    if not assignees:
+        return 0
+
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT ticket_id, priority, assigned_to FROM it_tickets
+        WHERE status IN ({', '.join('?' for _ in OPEN_STATUSES)})
+    """, OPEN_STATUSES)
+    open_tickets = cursor.fetchall()
+
+    # Open tickets of each assignee, grouped by weight: name -> {weight: [ticket_id, ...]}
+    owned = {name: {} for name in assignees}
+    loads = {name: 0 for name in assignees}
+    orphans = []
+    for ticket_id, priority, current in open_tickets:
+        if current in owned:
+            weight = priority_weight(priority)
+            owned[current].setdefault(weight, []).append(ticket_id)
+            loads[current] += weight
+        else:
+            orphans.append((ticket_id, priority))
+
+    router = TicketRouter(loads)
+    changes = {}
+    for ticket_id, priority in orphans:
+        name = router.assign(priority)
+        owned[name].setdefault(priority_weight(priority), []).append(ticket_id)
+        changes[ticket_id] = name
+
+    # Max-heap (negated loads) next to the router's min-heap, both with lazy deletion
+    loads = router.loads
+    max_heap = [(-load, name) for name, load in loads.items()]
+    heapq.heapify(max_heap)
+    while True:
+        while loads[max_heap[0][1]] != -max_heap[0][0]:
+            heapq.heappop(max_heap)
+        while loads[router.heap[0][1]] != router.heap[0][0]:
+            heapq.heappop(router.heap)
+        busiest, idlest = max_heap[0][1], router.heap[0][1]
+        gap = loads[busiest] - loads[idlest]
+
+        # Moving a ticket of weight w helps only if w < gap; prefer the one closest to gap / 2
+        candidates = [w for w, ids in owned[busiest].items() if ids and w < gap]
+        if not candidates:
+            break
+        weight = min(candidates, key=lambda w: abs(gap / 2 - w))
+
+        ticket_id = owned[busiest][weight].pop()
+        owned[idlest].setdefault(weight, []).append(ticket_id)
+        changes[ticket_id] = idlest
+        loads[busiest] -= weight
+        loads[idlest] += weight
+        heapq.heappush(max_heap, (-loads[busiest], busiest))
+        heapq.heappush(max_heap, (-loads[idlest], idlest))
+        heapq.heappush(router.heap, (loads[busiest], busiest))
+        heapq.heappush(router.heap, (loads[idlest], idlest))
+
+    # 'with conn' commits all updates at once, or rolls everything back on error
+    with conn:
+        conn.executemany(
+            "UPDATE it_tickets SET assigned_to = ? WHERE ticket_id = ?",
+            [(name, ticket_id) for ticket_id, name in changes.items()]
+        )
+
+    # The new loads become the reference for the next assignments
+    with _router_lock:
+        _router = router
+    return len(changes)
@@ -1,7 +1,38 @@
 import sqlite3
 import uuid
 from datetime import datetime, timedelta
-from app.data.db import connect_database
+from app.data.db import connect_readonly
+from app.data.metrics import counter, histogram
+from app.data.write_queue import run_write, submit_write
+
+SESSIONS_CREATED = counter("app_sessions_created", "Sessions created at login")
+SESSIONS_DELETED = counter("app_sessions_deleted", "Sessions deleted at logout")
+SESSION_VALIDATIONS = counter("app_session_validations", "Session token checks by outcome", ["result"])
+SESSION_VALIDATION_SECONDS = histogram("app_session_validation_seconds", "Latency of validate_session()")
+
+# ---------------------------
+# WRITE OPERATIONS (run on the writer thread, see write_queue)
+# ---------------------------
+def _insert_session(conn, token, username, expires_at):
+    cursor = conn.cursor()
+    # Ensure the sessions table exists (create if not)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS sessions (
+        token TEXT PRIMARY KEY,
+        username TEXT NOT NULL,
+        expires_at TEXT NOT NULL
+    )
+    """)
+    # Insert the new session record
+    cursor.execute("""
+    INSERT INTO sessions (token, username, expires_at)
+    VALUES (?, ?, ?)
+    """, (token, username, expires_at))
+
+
+def _delete_session(conn, token):
+    conn.execute("DELETE FROM sessions WHERE token = ?", (token,))
+
 
 # ---------------------------
 # CREATE SESSION
@@ -16,24 +47,9 @@ def create_session(username, hours_valid=1):
     # Calculate expiration time based on current time + validity period
     expires_at = (datetime.now() + timedelta(hours=hours_valid)).isoformat()
 
-    # Open a database connection (context manager ensures proper closing)
-    with connect_database() as conn:
-        cursor = conn.cursor()
-        # Ensure the sessions table exists (create if not)
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS sessions (
-            token TEXT PRIMARY KEY,
-            username TEXT NOT NULL,
-            expires_at TEXT NOT NULL
-        )
-        """)
-        # Insert the new session record
-        cursor.execute("""
-        INSERT INTO sessions (token, username, expires_at)
-        VALUES (?, ?, ?)
-        """, (token, username, expires_at))
-        # Commit changes to save the session
-        conn.commit()
+    # Written by the single writer thread, committed with the other pending writes
+    run_write(_insert_session, token, username, expires_at)
+    SESSIONS_CREATED.inc()
 
     # Return the generated session token
     return token
@@ -47,36 +63,40 @@ def validate_session(token):
     Check if a session token exists and is not expired.
     Returns True if valid, False otherwise.
     """
-    try:
-        with connect_database() as conn:
-            cursor = conn.cursor()
-            # Look up the session by token
-            cursor.execute("""
-            SELECT username, expires_at FROM sessions WHERE token = ?
-            """, (token,))
-            row = cursor.fetchone()
-
-            # If no session found, token is invalid
-            if row is None:
-                return False
-
-            username, expires_at_str = row
-            # Convert expiration string back to datetime
-            expires_at = datetime.fromisoformat(expires_at_str)
-
-            # If current time is past expiration, session is invalid
-            if datetime.now() > expires_at:
-                # Delete expired session from DB
-                cursor.execute("DELETE FROM sessions WHERE token = ?", (token,))
-                conn.commit()
-                return False
-
-            # Otherwise, session is still valid
-            return True
-    except Exception as e:
-        # Handle unexpected errors gracefully
-        print(f"❌ Error validating session: {e}")
-        return False
+    with SESSION_VALIDATION_SECONDS.time():
+        try:
+            with connect_readonly() as conn:
+                cursor = conn.cursor()
+                # Look up the session by token
+                cursor.execute("""
+                SELECT username, expires_at FROM sessions WHERE token = ?
+                """, (token,))
+                row = cursor.fetchone()
+
+                # If no session found, token is invalid
+                if row is None:
+                    SESSION_VALIDATIONS.labels(result="unknown").inc()
+                    return False
+
+                username, expires_at_str = row
+                # Convert expiration string back to datetime
+                expires_at = datetime.fromisoformat(expires_at_str)
+
+                # If current time is past expiration, session is invalid
+                if datetime.now() > expires_at:
+                    # Delete expired session from DB (queued, the check does not wait for it)
+                    submit_write(_delete_session, token)
+                    SESSION_VALIDATIONS.labels(result="expired").inc()
+                    return False
+
+                # Otherwise, session is still valid
+                SESSION_VALIDATIONS.labels(result="valid").inc()
+                return True
+        except Exception as e:
+            # Handle unexpected errors gracefully
+            print(f"❌ Error validating session: {e}")
+            SESSION_VALIDATIONS.labels(result="error").inc()
+            return False
 
 
 # ---------------------------
@@ -88,12 +108,10 @@ def delete_session(token):
     Returns True if deletion succeeded, False otherwise.
     """
     try:
-        with connect_database() as conn:
-            cursor = conn.cursor()
-            # Delete the session record
-            cursor.execute("DELETE FROM sessions WHERE token = ?", (token,))
-            conn.commit()
-            return True
+        # Delete the session record
+        run_write(_delete_session, token)
+        SESSIONS_DELETED.inc()
+        return True
     except Exception as e:
         # Handle unexpected errors gracefully
         print(f"❌ Error deleting session: {e}")
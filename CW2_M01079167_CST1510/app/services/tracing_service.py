@@ -0,0 +1,249 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+from app.data import query_profiler
+
+# Tracing is off unless APP_TRACE=1 (or enable_tracing() is called)
+ENABLED = os.environ.get("APP_TRACE", "0") == "1"
+
+# Optional export file: *.jsonl gets one span per line, any other extension
+# (e.g. *.json) gets Chrome trace events, viewable in chrome://tracing or Perfetto
+TRACE_FILE = os.environ.get("APP_TRACE_FILE")
+
+# Finished page traces kept in memory for the admin overlay
+RECENT_TRACES = 100
+
+# Open page trace of each session; a run executes on one thread, so the trace
+# of the run in progress is also reachable per thread for span() and SQL timings
+_open_traces = {}
+_local = threading.local()
+_recent = deque(maxlen=RECENT_TRACES)
+_lock = threading.Lock()
+
+
+class Span:
+    """
+    One timed phase of a page run. Times are kept in nanoseconds
+    (wall-clock start for exports, monotonic clock for durations).
+    """
+
+    def __init__(self, name, trace_id, parent_id, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.wall_start_ns = time.time_ns()
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns = None
+        self.depth = 0
+
+    @property
+    def duration_ms(self):
+        end = self.end_ns if self.end_ns is not None else time.perf_counter_ns()
+        return (end - self.start_ns) / 1e6
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_us": self.wall_start_ns // 1000,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+        }
+
+
+def enable_tracing(trace_file=None):
+    global ENABLED, TRACE_FILE
+    ENABLED = True
+    if trace_file is not None:
+        TRACE_FILE = trace_file
+
+
+def is_enabled():
+    return ENABLED
+
+
+def _on_sql(shape, elapsed_ms):
+    # Charge each profiled SQL statement to the innermost open span
+    trace = getattr(_local, "trace", None)
+    if trace and trace["stack"]:
+        attributes = trace["stack"][-1].attributes
+        attributes["sql_calls"] = attributes.get("sql_calls", 0) + 1
+        attributes["sql_ms"] = round(attributes.get("sql_ms", 0.0) + elapsed_ms, 3)
+
+
+query_profiler.STATS.listeners.append(_on_sql)
+
+
+# ---------------------------
+# PAGE TRACES AND SPANS
+# ---------------------------
+@contextmanager
+def page_trace(page, key=None, **attributes):
+    """
+    Trace one run of a page: wrap the page body, the root span covers it
+    and the trace is finished however the body exits, st.rerun() and
+    st.stop() included, so the phases of actions ending in a rerun (chat,
+    uploads, forms) are kept. key identifies the session (default: the
+    thread); a trace the session left open is closed as interrupted.
+    """
+    if not ENABLED:
+        yield None
+        return
+    key = threading.get_ident() if key is None else key
+    with _lock:
+        stale = _open_traces.pop(key, None)
+    if stale is not None:
+        _finish_trace(stale, interrupted=True)
+
+    root = Span(page, uuid.uuid4().hex, None, attributes)
+    trace = {"spans": [root], "stack": [root]}
+    with _lock:
+        _open_traces[key] = trace
+    _local.trace = trace
+    try:
+        yield root
+    except BaseException as e:
+        # st.stop()/st.rerun() raise control-flow exceptions: keep them visible
+        root.attributes["exit"] = type(e).__name__
+        raise
+    finally:
+        _local.trace = None
+        with _lock:
+            finished = _open_traces.get(key) is trace
+            if finished:
+                del _open_traces[key]
+        if finished:
+            _finish_trace(trace, interrupted=False)
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Time a phase of the current page run as a child of the innermost open span:
+
+        with span("incidents.load"):
+            df = get_all_incidents(conn)
+
+    Does nothing when tracing is off or no page trace is open.
+    """
+    trace = getattr(_local, "trace", None)
+    if not ENABLED or not trace or not trace["stack"]:
+        yield None
+        return
+
+    stack = trace["stack"]
+    parent = stack[-1]
+    current = Span(name, parent.trace_id, parent.span_id, attributes)
+    current.depth = len(stack)
+    trace["spans"].append(current)
+    stack.append(current)
+    try:
+        yield current
+    except BaseException as e:
+        # st.stop()/st.rerun() raise control-flow exceptions: keep them visible
+        current.attributes["exit"] = type(e).__name__
+        raise
+    finally:
+        current.end_ns = time.perf_counter_ns()
+        if stack and stack[-1] is current:
+            stack.pop()
+
+
+def _finish_trace(trace, interrupted):
+    spans = trace["spans"]
+    root = spans[0]
+    if interrupted:
+        # The run never finished its trace: it ended with its last finished phase
+        ends = [s.end_ns for s in spans[1:] if s.end_ns is not None]
+        root.end_ns = max(ends) if ends else root.start_ns
+        root.attributes["interrupted"] = True
+    else:
+        root.end_ns = time.perf_counter_ns()
+    for s in spans:
+        if s.end_ns is None:
+            s.end_ns = root.end_ns
+    trace["stack"] = []
+
+    with _lock:
+        _recent.append(spans)
+        if TRACE_FILE:
+            _export(spans)
+
+
+def _export(spans):
+    """
+    Append the spans of one trace to TRACE_FILE (called under _lock).
+    """
+    if TRACE_FILE.endswith(".jsonl"):
+        lines = [json.dumps(s.to_dict(), default=str) for s in spans]
+    else:
+        # Chrome "JSON Array Format": the closing bracket is optional, so events can be appended
+        lines = [json.dumps({
+            "name": s.name,
+            "cat": spans[0].name,
+            "ph": "X",
+            "ts": s.wall_start_ns // 1000,
+            "dur": round((s.end_ns - s.start_ns) / 1000, 1),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": s.attributes,
+        }, default=str) + "," for s in spans]
+        if not os.path.exists(TRACE_FILE) or os.path.getsize(TRACE_FILE) == 0:
+            lines.insert(0, "[")
+    with open(TRACE_FILE, "a", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+# ---------------------------
+# OVERLAY DATA
+# ---------------------------
+def phase_summary(page=None):
+    """
+    Latency of each phase over the recent traces (optionally of one page),
+    slowest p95 first: runs, mean, p95 and max in milliseconds.
+    """
+    with _lock:
+        traces = [t for t in _recent if page is None or t[0].name == page]
+
+    durations = {}
+    for spans in traces:
+        for s in spans:
+            key = s.name if s.parent_id is None else f"{spans[0].name} › {s.name}"
+            durations.setdefault(key, []).append(s.duration_ms)
+
+    records = [{
+        "phase": key,
+        "runs": len(values),
+        "mean_ms": round(float(np.mean(values)), 1),
+        "p95_ms": round(float(np.percentile(values, 95)), 1),
+        "max_ms": round(float(np.max(values)), 1),
+    } for key, values in durations.items()]
+    columns = ["phase", "runs", "mean_ms", "p95_ms", "max_ms"]
+    return pd.DataFrame(records, columns=columns).sort_values("p95_ms", ascending=False).reset_index(drop=True)
+
+
+def last_trace(page=None):
+    """
+    Spans of the most recent finished trace (optionally of one page)
+    as a DataFrame in execution order, indented by depth.
+    """
+    with _lock:
+        traces = [t for t in _recent if page is None or t[0].name == page]
+    if not traces:
+        return pd.DataFrame(columns=["phase", "ms", "attributes"])
+    return pd.DataFrame([{
+        "phase": "  " * s.depth + s.name,
+        "ms": round(s.duration_ms, 1),
+        "attributes": ", ".join(f"{k}={v}" for k, v in s.attributes.items()),
+    } for s in traces[-1]])
@@ -1,8 +1,14 @@
-from app.data.db import connect_database
+from app.data.db import connect_database, connect_readonly
+from app.data.metrics import counter, histogram
+from app.data.write_queue import run_write
 import bcrypt
 import csv
 from app.services.session_service import create_session
 
+LOGINS = counter("app_logins", "Login attempts by outcome", ["result"])
+LOGIN_SECONDS = histogram("app_login_seconds", "Latency of login_user() (bcrypt check and session creation)")
+REGISTRATIONS = counter("app_registrations", "Registration attempts by outcome", ["result"])
+
 # ---------------------------
 # GET USER BY USERNAME
 # ---------------------------
@@ -11,7 +17,7 @@ def get_user_by_username(username):
     Retrieve a user from the database by their username.
     Returns a tuple (username, password_hash, role) or None if not found.
     """
-    with connect_database() as conn:
+    with connect_readonly() as conn:
         cursor = conn.cursor()
         cursor.execute(
             "SELECT username, password_hash, role FROM users WHERE username = ?",
@@ -23,29 +29,39 @@ def get_user_by_username(username):
 # ---------------------------
 # REGISTER USER
 # ---------------------------
+def _insert_user_if_new(conn, username, password_hash, role):
+    # Runs on the writer thread (see write_queue); returns False if the username exists
+    cursor = conn.cursor()
+
+    # Check if the username already exists
+    cursor.execute("SELECT COUNT(*) FROM users WHERE username = ?", (username,))
+    if cursor.fetchone()[0] > 0:
+        return False
+
+    # Insert the new user record
+    cursor.execute("""
+        INSERT INTO users (username, password_hash, role)
+        VALUES (?, ?, ?)
+    """, (username, password_hash, role))
+    return True
+
+
 def register_user(username, password_hash, role):
     """
     Register a new user in the database.
     Returns (success, message).
     """
     try:
-        with connect_database() as conn:
-            cursor = conn.cursor()
-
-            # Check if the username already exists
-            cursor.execute("SELECT COUNT(*) FROM users WHERE username = ?", (username,))
-            if cursor.fetchone()[0] > 0:
-                return False, "⚠️ Username already exists."
-
-            # Insert the new user record
-            cursor.execute("""
-                INSERT INTO users (username, password_hash, role)
-                VALUES (?, ?, ?)
-            """, (username, password_hash, role))
-            conn.commit()
-            return True, "✅ User registered successfully."
+        # Check and insert run together on the writer thread: two registrations
+        # of the same name cannot both pass the check
+        if not run_write(_insert_user_if_new, username, password_hash, role):
+            REGISTRATIONS.labels(result="duplicate").inc()
+            return False, "⚠️ Username already exists."
+        REGISTRATIONS.labels(result="success").inc()
+        return True, "✅ User registered successfully."
     except Exception as e:
         # Handle unexpected errors gracefully
+        REGISTRATIONS.labels(result="error").inc()
         return False, f"❌ Error registering user: {e}"
 
 
@@ -57,20 +73,24 @@ def login_user(username, password):
     Verify credentials and create a session if successful.
     Returns (success, message, token, role).
     """
-    user = get_user_by_username(username)
-    if not user:
-        return False, "❌ User not found.", None, None
-
-    # Properly unpack the tuple returned from DB
-    username_db, stored_hash, role = user
-
-    # Verify the password against the stored hash
-    if bcrypt.checkpw(password.encode('utf-8'), stored_hash.encode('utf-8')):
-        # Create a session and return the token
-        token = create_session(username_db)
-        return True, " Login successful!", token, role
-
-    return False, " Incorrect password.", None, None
+    with LOGIN_SECONDS.time():
+        user = get_user_by_username(username)
+        if not user:
+            LOGINS.labels(result="unknown_user").inc()
+            return False, "❌ User not found.", None, None
+
+        # Properly unpack the tuple returned from DB
+        username_db, stored_hash, role = user
+
+        # Verify the password against the stored hash
+        if bcrypt.checkpw(password.encode('utf-8'), stored_hash.encode('utf-8')):
+            # Create a session and return the token
+            token = create_session(username_db)
+            LOGINS.labels(result="success").inc()
+            return True, " Login successful!", token, role
+
+        LOGINS.labels(result="bad_password").inc()
+        return False, " Incorrect password.", None, None
 
 
 # ---------------------------
@@ -0,0 +1,15 @@
+# ---------------------------------------------------------------
+# Benchmark suite
+# Generates seeded synthetic data (incidents, tickets, datasets, users,
+# sessions) at a configurable scale, times the app's migrations, readers,
+# session checks, logins, uploads and aggregations, and stores the results
+# as JSON so runs of different commits can be compared. The load test drives
+# the Streamlit pages headlessly (AppTest) with concurrent simulated users.
+# The plan guard explains the statements of the hot code paths on a large
+# generated database and fails when one of them stops using its index.
+# Command line (from CW2_M01079167_CST1510):
+#   python -m benchmarks run --scale 100000
+#   python -m benchmarks compare old.json new.json
+#   python -m benchmarks load --users 1 2 4 8 16 --duration 60
+#   python -m benchmarks plans --scale 100000   (exit code 1 on a full scan)
+# ---------------------------------------------------------------
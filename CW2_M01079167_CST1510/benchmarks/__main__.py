@@ -0,0 +1,103 @@
+import argparse
+import sys
+
+from benchmarks import generate
+from benchmarks.suite import BENCHMARKS, DATA_DIR, RESULTS_DIR, compare_results, run_suite, save_results
+
+
+def table_override(text):
+    table, _, rows = text.partition("=")
+    if table not in generate.SCALE_RATIOS or not rows.isdigit():
+        raise argparse.ArgumentTypeError(f"expected TABLE=ROWS with TABLE in {list(generate.SCALE_RATIOS)}")
+    return table, int(rows)
+
+
+parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark the platform on synthetic data.")
+commands = parser.add_subparsers(dest="command", required=True)
+
+run = commands.add_parser("run", help="Generate data, run the benchmarks and save the results")
+run.add_argument("--scale", type=int, default=10_000, help="Incidents and tickets to generate (10k to 10M)")
+run.add_argument("--seed", type=int, default=42)
+run.add_argument("--repeat", type=int, default=3, help="Runs of each benchmark (the median is reported)")
+run.add_argument("--only", nargs="+", metavar="PREFIX", help=f"Benchmark name prefixes, among: {', '.join(BENCHMARKS)}")
+run.add_argument("--rows", nargs="+", type=table_override, default=[], metavar="TABLE=ROWS",
+                 help="Override the size of a table (e.g. users=5000)")
+run.add_argument("--dataset-rows", type=int, help="Rows of the dataset file (default: scale)")
+run.add_argument("--workdir", default=DATA_DIR, help="Where the generated data goes")
+run.add_argument("--reuse-data", action="store_true", help="Reuse data generated by a previous run with the same scale and seed")
+run.add_argument("--output", default=RESULTS_DIR, help="Directory of the JSON results")
+
+gen = commands.add_parser("generate", help="Only write the generated tables as CSV files")
+gen.add_argument("output", help="Output directory")
+gen.add_argument("--scale", type=int, default=10_000)
+gen.add_argument("--seed", type=int, default=42)
+
+load = commands.add_parser("load", help="Drive the Streamlit pages headlessly with concurrent simulated users")
+load.add_argument("--users", nargs="+", type=int, default=[1, 2, 4, 8], help="Concurrency levels to run")
+load.add_argument("--duration", type=float, default=30, help="Seconds per concurrency level")
+load.add_argument("--scale", type=int, default=10_000, help="Size of the generated database")
+load.add_argument("--seed", type=int, default=42)
+load.add_argument("--think", type=float, default=1.0, help="Mean seconds between two interactions of a user")
+load.add_argument("--llm-ttft", type=float, default=0.4, help="Mock LLM time to first chunk (seconds)")
+load.add_argument("--workdir", default=DATA_DIR)
+load.add_argument("--reuse-data", action="store_true")
+load.add_argument("--output", default=RESULTS_DIR)
+
+plans = commands.add_parser("plans", help="Check that the hot statements use their indexes (exit code 1 otherwise)")
+plans.add_argument("--scale", type=int, default=100_000, help="Size of the generated database")
+plans.add_argument("--seed", type=int, default=42)
+plans.add_argument("--only", nargs="+", metavar="PREFIX", help="Check name prefixes (e.g. session aggregate)")
+plans.add_argument("--workdir", default=DATA_DIR)
+plans.add_argument("--reuse-data", action="store_true")
+plans.add_argument("--verbose", action="store_true", help="Print every statement and its plan")
+
+compare = commands.add_parser("compare", help="Compare two result files")
+compare.add_argument("baseline")
+compare.add_argument("candidate")
+
+args = parser.parse_args()
+
+if args.command == "run":
+    results = run_suite(args.scale, args.seed, args.repeat, args.only, args.workdir, args.reuse_data,
+                        args.dataset_rows, dict(args.rows))
+    print(f"[bench] Results written to {save_results(results, args.output)}")
+
+elif args.command == "generate":
+    from pathlib import Path
+
+    output = Path(args.output)
+    output.mkdir(parents=True, exist_ok=True)
+    rows = generate.table_rows(args.scale)
+    for table, (_, generator) in generate.TABLE_GENERATORS.items():
+        written = generate.write_csv(generator(rows[table], args.seed), output / f"{table}.csv")
+        print(f"{table}: {written} rows")
+    written = generate.write_csv(generate.iter_sessions(rows["sessions"], rows["users"], args.seed), output / "sessions.csv")
+    print(f"sessions: {written} rows")
+
+elif args.command == "load":
+    import pandas as pd
+    from benchmarks.load_test import run_load_test, save_load_results
+
+    results = run_load_test(args.users, args.duration, args.scale, args.seed, args.workdir, args.reuse_data,
+                            args.think, args.llm_ttft)
+    print()
+    print(pd.DataFrame(results["levels"]).set_index("users").to_string())
+    print(f"[load] Results written to {save_load_results(results, args.output)}")
+
+elif args.command == "plans":
+    import pandas as pd
+    from benchmarks.query_plans import run_plan_guard
+
+    report = run_plan_guard(args.scale, args.seed, args.workdir, args.reuse_data, args.only)
+    failed = report[report["problems"] != ""]
+    shown = report if args.verbose else failed
+    if len(shown):
+        with pd.option_context("display.max_colwidth", 120, "display.width", 250):
+            print(shown.to_string(index=False))
+    print(f"[plans] {report['check'].nunique()} checks, {len(report)} statements, {len(failed)} problems")
+    sys.exit(1 if len(failed) else 0)
+
+else:
+    report = compare_results(args.baseline, args.candidate)
+    print(report.to_string())
+    sys.exit(1 if (report["verdict"] == "regression").any() else 0)
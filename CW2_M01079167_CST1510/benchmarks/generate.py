@@ -0,0 +1,277 @@
+import sqlite3
+import uuid
+from datetime import datetime
+
+import bcrypt
+import numpy as np
+import pandas as pd
+
+# Bump when the generated data changes, so cached databases are rebuilt
+GENERATOR_VERSION = 2
+
+# Rows generated per chunk; fixed so the data only depends on the seed
+CHUNK_ROWS = 200_000
+
+# Rows of each table for a given scale (incidents and tickets = scale)
+SCALE_RATIOS = {
+    "incidents": 1.0,
+    "tickets": 1.0,
+    "datasets": 0.01,
+    "users": 0.01,
+    "sessions": 0.1,
+}
+
+# Password of every generated user (one bcrypt hash is shared, hashing
+# millions of passwords would take days)
+BENCH_PASSWORD = "bench-password"
+
+SEVERITIES = ["Low", "Medium", "High", "Critical"]
+INCIDENT_CATEGORIES = ["Malware", "Phishing", "DDoS", "Unauthorized Access", "Misconfiguration", "Data Leak"]
+INCIDENT_STATUSES = ["Open", "In Progress", "Resolved", "Closed"]
+TICKET_PRIORITIES = ["Low", "Medium", "High", "Critical"]
+TICKET_STATUSES = ["Open", "In Progress", "Resolved", "Closed"]
+ASSIGNEES = [f"IT_Support_{letter}" for letter in "ABCDEFGH"]
+ROLES = ["admin", "cybersecurity", "datascience", "itoperation"]
+
+ASSETS = ["mail server", "web gateway", "VPN concentrator", "domain controller", "file share", "CRM database",
+          "payroll app", "build server", "laptop fleet", "DNS resolver", "firewall", "backup appliance"]
+ACTIONS = ["detected on", "reported for", "blocked at", "escalated from", "observed on", "contained on"]
+SOURCES = ["external IP", "compromised account", "contractor laptop", "phishing email", "unpatched service",
+           "misrouted traffic", "third-party vendor", "insider"]
+TICKET_ISSUES = ["Password reset", "VPN not connecting", "Printer offline", "Slow laptop", "Email sync failing",
+                 "Software install", "Disk full", "Access request", "Monitor flickering", "Wi-Fi drops"]
+TICKET_DETAILS = ["since this morning", "after the last update", "for the whole team", "on the 3rd floor",
+                  "intermittently", "when working remotely", "on a new device", "urgently before a deadline"]
+
+# Timestamps are spread over this window
+START = datetime(2023, 1, 1)
+SPAN_SECONDS = 2 * 365 * 24 * 3600
+
+# Share of incident descriptions copied (with a short suffix) from an earlier one
+NEAR_DUPLICATE_RATE = 0.1
+
+
+def table_rows(scale, overrides=None):
+    """
+    Number of rows of each generated table for a scale, with optional
+    per-table overrides ({"users": 1000}).
+    """
+    rows = {table: max(1, int(scale * ratio)) for table, ratio in SCALE_RATIOS.items()}
+    rows.update(overrides or {})
+    return rows
+
+
+def _rng(seed, table):
+    # One independent stream per table, so changing one table's size keeps the others identical
+    return np.random.default_rng([seed, sum(map(ord, table))])
+
+
+def _chunks(n):
+    for start in range(0, n, CHUNK_ROWS):
+        yield start, min(CHUNK_ROWS, n - start)
+
+
+def _timestamps(rng, size):
+    seconds = rng.integers(0, SPAN_SECONDS, size=size)
+    return pd.to_datetime(START) + pd.to_timedelta(seconds, unit="s")
+
+
+def _pick(rng, values, size, p=None):
+    return np.asarray(values, dtype=object)[rng.choice(len(values), size=size, p=p)]
+
+
+# ---------------------------
+# TABLE GENERATORS
+# ---------------------------
+def iter_incidents(n, seed=42, first_id=1):
+    """
+    Yield cyber incidents as DataFrames of up to CHUNK_ROWS rows, with the
+    columns of cyber_incidents.csv. About NEAR_DUPLICATE_RATE of the
+    descriptions are near-copies of an earlier one (same chunk), so the
+    duplicate clustering has something to find.
+    """
+    rng = _rng(seed, "incidents")
+    for start, size in _chunks(n):
+        category = _pick(rng, INCIDENT_CATEGORIES, size)
+        description = (
+            pd.Series(category) + " " + _pick(rng, ACTIONS, size) + " " + _pick(rng, ASSETS, size)
+            + " via " + _pick(rng, SOURCES, size) + " ticket ref " + pd.Series(rng.integers(0, 10 ** 6, size)).astype(str)
+        )
+        duplicates = np.flatnonzero(rng.random(size) < NEAR_DUPLICATE_RATE)
+        duplicates = duplicates[duplicates > 0]
+        if len(duplicates):
+            originals = (rng.random(len(duplicates)) * duplicates).astype(int)
+            description.iloc[duplicates] = (
+                description.iloc[originals].to_numpy() + " (repeat " + pd.Series(rng.integers(2, 9, len(duplicates))).astype(str).to_numpy() + ")"
+            )
+
+        yield pd.DataFrame({
+            "incident_id": np.arange(first_id + start, first_id + start + size),
+            "timestamp": _timestamps(rng, size).strftime("%Y-%m-%d %H:%M:%S.%f"),
+            "severity": _pick(rng, SEVERITIES, size, p=[0.4, 0.35, 0.2, 0.05]),
+            "category": category,
+            "status": _pick(rng, INCIDENT_STATUSES, size, p=[0.15, 0.15, 0.4, 0.3]),
+            "description": description.to_numpy(),
+        })
+
+
+def iter_tickets(n, seed=42, first_id=1):
+    """
+    Yield IT tickets as DataFrames with the columns of it_tickets.csv plus
+    title. Resolved and closed tickets get a log-normal resolution time
+    that grows as the priority drops.
+    """
+    rng = _rng(seed, "tickets")
+    for start, size in _chunks(n):
+        priority_index = rng.choice(len(TICKET_PRIORITIES), size=size, p=[0.3, 0.4, 0.2, 0.1])
+        status = _pick(rng, TICKET_STATUSES, size, p=[0.2, 0.15, 0.4, 0.25])
+        title = _pick(rng, TICKET_ISSUES, size)
+        hours = np.round(rng.lognormal(mean=3.5 - 0.6 * priority_index, sigma=0.7), 1)
+        resolved = np.isin(status, ["Resolved", "Closed"])
+
+        yield pd.DataFrame({
+            "ticket_id": np.arange(first_id + start, first_id + start + size),
+            "title": title,
+            "priority": np.asarray(TICKET_PRIORITIES, dtype=object)[priority_index],
+            "description": (pd.Series(title) + " " + _pick(rng, TICKET_DETAILS, size)).to_numpy(),
+            "status": status,
+            "assigned_to": _pick(rng, ASSIGNEES, size),
+            "created_at": _timestamps(rng, size).strftime("%Y-%m-%d %H:%M:%S"),
+            "resolution_time_hours": np.where(resolved, hours, np.nan),
+        })
+
+
+def iter_datasets(n, seed=42, first_id=1):
+    """
+    Yield dataset metadata rows (dataset_id, name, description, rows, columns, size).
+    """
+    rng = _rng(seed, "datasets")
+    topics = ["Customer_Churn", "Financial_Fraud", "Network_Flows", "Sales", "Sensor_Readings", "Web_Logs"]
+    for start, size in _chunks(n):
+        ids = np.arange(first_id + start, first_id + start + size)
+        rows = rng.integers(100, 5_000_000, size)
+        columns = rng.integers(3, 80, size)
+        yield pd.DataFrame({
+            "dataset_id": ids,
+            "name": (pd.Series(_pick(rng, topics, size)) + "_" + pd.Series(ids).astype(str)).to_numpy(),
+            "description": "Generated benchmark dataset",
+            "rows": rows,
+            "columns": columns,
+            "size": rows * columns * 8,
+        })
+
+
+def iter_users(n, seed=42):
+    """
+    Yield users (username, password_hash, role). Every user shares one
+    bcrypt hash of BENCH_PASSWORD, so login_user() can be benchmarked.
+    """
+    rng = _rng(seed, "users")
+    password_hash = bcrypt.hashpw(BENCH_PASSWORD.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    for start, size in _chunks(n):
+        yield pd.DataFrame({
+            "username": [f"user{i:08d}" for i in range(start, start + size)],
+            "password_hash": password_hash,
+            "role": _pick(rng, ROLES, size),
+        })
+
+
+def iter_sessions(n, users, seed=42, expired_rate=0.2, now=None):
+    """
+    Yield sessions (token, username, expires_at) of the generated users.
+    About expired_rate of them are already expired.
+    """
+    rng = _rng(seed, "sessions")
+    now = now or datetime.now()
+    for start, size in _chunks(n):
+        token_bytes = rng.bytes(16 * size)
+        tokens = [str(uuid.UUID(bytes=token_bytes[i:i + 16], version=4)) for i in range(0, 16 * size, 16)]
+        # Valid sessions expire in 1 to 30 days, expired ones expired up to 30 days ago
+        offsets = np.where(rng.random(size) < expired_rate, -1, 1) * rng.integers(86400, 30 * 86400, size)
+        expires_at = (pd.Timestamp(now) + pd.to_timedelta(offsets, unit="s")).strftime("%Y-%m-%dT%H:%M:%S.%f")
+        yield pd.DataFrame({
+            "token": tokens,
+            "username": [f"user{i:08d}" for i in rng.integers(0, max(users, 1), size)],
+            "expires_at": expires_at,
+        })
+
+
+TABLE_GENERATORS = {
+    "incidents": ("cyber_incidents", iter_incidents),
+    "tickets": ("it_tickets", iter_tickets),
+    "datasets": ("datasets_metadata", iter_datasets),
+    "users": ("users", iter_users),
+}
+
+
+# ---------------------------
+# OUTPUTS
+# ---------------------------
+def write_csv(frames, path):
+    """
+    Write generated chunks to one CSV file. Returns the number of rows.
+    """
+    rows = 0
+    for i, frame in enumerate(frames):
+        frame.to_csv(path, mode="w" if i == 0 else "a", header=(i == 0), index=False)
+        rows += len(frame)
+    return rows
+
+
+def write_dataset_file(path, rows, seed=42):
+    """
+    Write a mixed-type dataset file (ids, numbers, categories, free text,
+    dates, ~2% missing values) for the profiling, store and preview benchmarks.
+    """
+    rng = _rng(seed, "dataset_file")
+    for i, (start, size) in enumerate(_chunks(rows)):
+        frame = pd.DataFrame({
+            "id": np.arange(start, start + size),
+            "amount": np.round(rng.lognormal(3, 1, size), 2),
+            "score": rng.normal(0, 1, size),
+            "count": rng.poisson(4, size),
+            "segment": _pick(rng, ["retail", "smb", "enterprise", "public"], size),
+            "country": _pick(rng, ["GB", "FR", "DE", "US", "MU", "IN", "BR", "JP"], size),
+            "comment": _pick(rng, TICKET_DETAILS, size),
+            "created": _timestamps(rng, size).strftime("%Y-%m-%d"),
+        })
+        for column in ("amount", "segment", "comment"):
+            frame.loc[rng.random(size) < 0.02, column] = None
+        frame.to_csv(path, mode="w" if i == 0 else "a", header=(i == 0), index=False)
+
+
+def build_database(path, scale, seed=42, overrides=None):
+    """
+    Create a database at path with the app schema and generated rows for
+    every table. Rows are bulk-inserted with the app's triggers active
+    (summaries, full-text index), then the SLA sketches are rebuilt.
+    Near-duplicate clusters are not computed (the migration benchmark
+    measures that path): every incident is its own cluster, as stored
+    by the app for a unique report. Returns the number of rows of each table.
+    """
+    from app.data.schema import create_all_tables
+    from app.data.sla import rebuild_sla_sketches
+
+    rows = table_rows(scale, overrides)
+    conn = sqlite3.connect(str(path))
+    create_all_tables(conn)
+
+    for table, (sql_table, generator) in TABLE_GENERATORS.items():
+        for frame in generator(rows[table], seed):
+            columns = list(frame.columns)
+            conn.executemany(
+                f"INSERT INTO {sql_table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+                frame.astype(object).where(frame.notna(), None).itertuples(index=False, name=None)
+            )
+            conn.commit()
+
+    for frame in iter_sessions(rows["sessions"], rows["users"], seed):
+        conn.executemany("INSERT INTO sessions (token, username, expires_at) VALUES (?, ?, ?)",
+                         frame.itertuples(index=False, name=None))
+    conn.execute("UPDATE cyber_incidents SET cluster_id = incident_id")
+    rebuild_sla_sketches(conn)
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+    return rows
+
@@ -0,0 +1,374 @@
+import itertools
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import generate, mock_llm
+from benchmarks.suite import DATA_DIR, RESULTS_DIR, _git_commit
+
+APP_DIR = Path(__file__).resolve().parent.parent
+
+# Page each role lands on after login (same redirects as main.py)
+ROLE_PAGES = {
+    "admin": "pages/1_Dashboard.py",
+    "cybersecurity": "pages/2_Cybersecurity.py",
+    "datascience": "pages/3_DataScience.py",
+    "itoperation": "pages/4_ITOperations.py",
+}
+
+# Text of the errors counted as lock contention (raised or shown with st.error/st.warning)
+LOCK_MARKERS = ("database is locked", "database table is locked")
+
+# Seconds a simulated user waits between two interactions (mean, exponential)
+THINK_SECONDS = 1.0
+
+# Rows per simulated CSV upload
+UPLOAD_ROWS = 50
+
+# Timeout of one script run (AppTest raises if a rerun takes longer)
+RERUN_TIMEOUT = 60
+
+# Questions sent to the mock LLM
+QUESTIONS = [
+    "Which phishing incidents are still open?",
+    "Summarize the critical incidents of last month",
+    "Which tickets take the longest to resolve?",
+    "Any VPN issues reported recently?",
+    "What datasets do we have about fraud?",
+]
+
+# Incident / ticket IDs used by the simulated uploads (above the generated ones)
+_upload_ids = itertools.count(10 ** 9, UPLOAD_ROWS)
+_upload_ids_lock = threading.Lock()
+
+
+def _widget(elements, label):
+    for element in elements:
+        if element.label == label:
+            return element
+    raise LookupError(f"No widget labelled {label!r} on the page")
+
+
+def _error_texts(at):
+    texts = [str(getattr(e, "value", None) or getattr(e, "message", "")) for e in at.exception]
+    texts += [str(e.value) for e in itertools.chain(at.error, at.warning)]
+    return texts
+
+
+# ---------------------------
+# STATISTICS
+# ---------------------------
+class LoadStats:
+    """
+    Every interaction of every simulated user: action name, concurrency
+    level, latency and outcome (ok, lock error, other error).
+    """
+
+    def __init__(self):
+        self.records = []
+        self.error_samples = []
+        self.lock = threading.Lock()
+
+    def record(self, users, action, seconds, outcome, detail=None):
+        with self.lock:
+            self.records.append((users, action, seconds, outcome))
+            if detail and len(self.error_samples) < 50:
+                self.error_samples.append({"users": users, "action": action, "outcome": outcome, "error": detail[:300]})
+
+    def frame(self):
+        with self.lock:
+            return pd.DataFrame(self.records, columns=["users", "action", "seconds", "outcome"])
+
+
+def summarize_levels(df, durations):
+    """
+    One row per concurrency level: page reruns, reruns per second, rerun
+    latency percentiles (milliseconds) and error counts (uploads are not
+    reruns, but their lock errors are counted).
+    """
+    records = []
+    for users, group in df.groupby("users"):
+        reruns = group[group["action"] != "upload"]
+        ms = reruns["seconds"].to_numpy() * 1000 if len(reruns) else np.zeros(1)
+        records.append({
+            "users": users,
+            "reruns": len(reruns),
+            "reruns_per_s": round(len(reruns) / durations[users], 2),
+            "p50_ms": round(float(np.percentile(ms, 50)), 1),
+            "p95_ms": round(float(np.percentile(ms, 95)), 1),
+            "p99_ms": round(float(np.percentile(ms, 99)), 1),
+            "max_ms": round(float(ms.max()), 1),
+            "lock_errors": int((group["outcome"] == "lock").sum()),
+            "errors": int((group["outcome"] == "error").sum()),
+        })
+    return pd.DataFrame(records).set_index("users")
+
+
+def summarize_actions(df):
+    """
+    Latency percentiles (milliseconds) per concurrency level and action.
+    """
+    return (df.assign(ms=df["seconds"] * 1000)
+              .groupby(["users", "action"])["ms"]
+              .describe(percentiles=[0.5, 0.95])
+              .rename(columns={"50%": "p50_ms", "95%": "p95_ms", "max": "max_ms"})
+              [["count", "p50_ms", "p95_ms", "max_ms"]]
+              .round(1))
+
+
+# ---------------------------
+# SIMULATED USER
+# ---------------------------
+class SimulatedUser:
+    """
+    One analyst: its own AppTest session (session_state, widgets), logging
+    in through main.py, then interacting with its role page until the
+    deadline. Each interaction is one rerun of the page script.
+    """
+
+    def __init__(self, username, role, users, stats, seed, think_seconds=THINK_SECONDS):
+        self.username = username
+        self.role = role
+        self.users = users
+        self.stats = stats
+        self.rng = np.random.default_rng(seed)
+        self.think_seconds = think_seconds
+        self.at = None
+
+    def _rerun(self, action, interact):
+        """
+        Apply an interaction, run the script and record the rerun.
+        """
+        started = time.perf_counter()
+        try:
+            interact()
+            self.at.run()
+            errors = _error_texts(self.at)
+            failed = len(self.at.exception) > 0
+        except Exception as e:
+            # Widget not found, script timeout...
+            errors = [f"{type(e).__name__}: {e}"]
+            failed = True
+        seconds = time.perf_counter() - started
+
+        locked = [e for e in errors if any(marker in e for marker in LOCK_MARKERS)]
+        if locked:
+            self.stats.record(self.users, action, seconds, "lock", locked[0])
+        elif failed:
+            self.stats.record(self.users, action, seconds, "error", errors[0] if errors else None)
+        else:
+            self.stats.record(self.users, action, seconds, "ok")
+
+    def login(self):
+        from streamlit.testing.v1 import AppTest
+
+        self.at = AppTest.from_file(str(APP_DIR / "main.py"), default_timeout=RERUN_TIMEOUT)
+        self._rerun("open_app", lambda: None)
+
+        def fill_login():
+            _widget(self.at.text_input, "Username").input(self.username)
+            _widget(self.at.text_input, "Password").input(generate.BENCH_PASSWORD)
+            _widget(self.at.button, "Login").click()
+        self._rerun("login", fill_login)
+
+        if "logged_in" not in self.at.session_state or not self.at.session_state["logged_in"]:
+            raise RuntimeError(f"{self.username} could not log in")
+        self._rerun("open_page", lambda: self.at.switch_page(ROLE_PAGES[self.role]))
+
+    # Interactions per role page: (action name, weight, function applying it)
+    def _actions(self):
+        at, rng = self.at, self.rng
+
+        def chat():
+            at.chat_input[0].set_value(str(rng.choice(QUESTIONS)))
+
+        common = [("idle_rerun", 2, lambda: None), ("chat", 1, chat)]
+        if self.role == "cybersecurity":
+            return common + [
+                ("trend_bucket", 2, lambda: at.selectbox(key="incident_trend_bucket").set_value(str(rng.choice(["day", "week", "hour"])))),
+                ("collapse_toggle", 1, lambda: _widget(at.toggle, "Collapse near-duplicate incidents").set_value(bool(rng.integers(2)))),
+                ("search", 3, lambda: at.text_input(key="incident_search").input(str(rng.choice(["phishing", "malware server", "vpn", "ddos firewall"])))),
+                ("upload", 1, None),
+            ]
+        if self.role == "itoperation":
+            return common + [
+                ("trend_bucket", 2, lambda: at.selectbox(key="ticket_trend_bucket").set_value(str(rng.choice(["day", "week", "hour"])))),
+                ("sla_group_by", 2, lambda: at.selectbox(key="sla_dimension").set_value(str(rng.choice(["priority", "assigned_to", "month"])))),
+                ("search", 3, lambda: at.text_input(key="ticket_search").input(str(rng.choice(["printer", "vpn", "password reset", "disk"])))),
+                ("rebalance", 0.2, lambda: _widget(at.button, "⚖️ Rebalance open tickets").click()),
+                ("upload", 1, None),
+            ]
+        if self.role == "admin":
+            return [("idle_rerun", 2, lambda: None),
+                    ("period", 2, lambda: _widget(at.selectbox, "Period (days)").set_value(int(rng.choice([1, 7, 30, 90]))))]
+        return common
+
+    def upload(self):
+        """
+        Insert rows the way the CSV upload form of the page does (every row
+        queued to the writer thread, then wait for the group commits).
+        AppTest cannot drive st.file_uploader, so this runs the same
+        data-layer calls directly.
+        """
+        from app.data.incidents import insert_incident_if_new
+        from app.data.tickets import insert_ticket
+        from app.data.write_queue import submit_write, wait_write
+
+        with _upload_ids_lock:
+            first_id = next(_upload_ids)
+        started = time.perf_counter()
+        outcome, detail = "ok", None
+        try:
+            if self.role == "cybersecurity":
+                futures = [
+                    submit_write(insert_incident_if_new, int(row.incident_id), row.timestamp, row.severity,
+                                 row.category, row.status, row.description, created_by=self.username)
+                    for row in next(generate.iter_incidents(UPLOAD_ROWS, first_id, first_id=first_id)).itertuples(index=False)
+                ]
+            else:
+                futures = [
+                    submit_write(insert_ticket, int(row.ticket_id), row.title, row.status, row.priority,
+                                 row.assigned_to, row.description, row.created_at, None)
+                    for row in next(generate.iter_tickets(UPLOAD_ROWS, first_id, first_id=first_id)).itertuples(index=False)
+                ]
+            for future in futures:
+                wait_write(future)
+        except Exception as e:
+            outcome = "lock" if any(marker in str(e) for marker in LOCK_MARKERS) else "error"
+            detail = f"{type(e).__name__}: {e}"
+        self.stats.record(self.users, "upload", time.perf_counter() - started, outcome, detail)
+
+    def run(self, deadline):
+        try:
+            self.login()
+        except Exception as e:
+            self.stats.record(self.users, "login", 0.0, "error", f"{type(e).__name__}: {e}")
+            return
+
+        actions = self._actions()
+        weights = np.array([weight for _, weight, _ in actions], dtype=float)
+        while time.monotonic() < deadline:
+            time.sleep(self.rng.exponential(self.think_seconds))
+            name, _, interact = actions[self.rng.choice(len(actions), p=weights / weights.sum())]
+            if name == "upload":
+                self.upload()
+            else:
+                self._rerun(name, interact)
+
+
+# ---------------------------
+# LOAD TEST
+# ---------------------------
+def _users_by_role(db_path, count):
+    """
+    Pick `count` generated users, cycling through the domain roles.
+    """
+    import sqlite3
+
+    conn = sqlite3.connect(str(db_path))
+    by_role = {
+        role: [row[0] for row in conn.execute("SELECT username FROM users WHERE role = ? AND username LIKE 'user%' LIMIT ?", (role, count))]
+        for role in ROLE_PAGES
+    }
+    conn.close()
+    cycle = itertools.cycle(["cybersecurity", "itoperation", "datascience", "cybersecurity", "itoperation", "admin"])
+    picked = []
+    while len(picked) < count:
+        role = next(cycle)
+        if by_role[role]:
+            picked.append((by_role[role].pop(), role))
+    return picked
+
+
+def _install_secrets(secrets):
+    """
+    Give every session the same st.secrets. AppTest.secrets can't be used
+    here: each AppTest run swaps the global st.secrets in and restores it
+    afterwards, so concurrent sessions restore each other's and the pages
+    end up with no secrets at all.
+    """
+    import streamlit as st
+    from streamlit.runtime.secrets import Secrets
+
+    st.secrets = Secrets()
+    st.secrets._secrets = dict(secrets)
+
+
+def run_load_test(levels=(1, 2, 4, 8), duration=30, scale=10_000, seed=42, workdir=DATA_DIR, reuse=False,
+                  think_seconds=THINK_SECONDS, llm_ttft=mock_llm.TTFT_SECONDS):
+    """
+    Run the app headlessly with 1, 2, 4... concurrent simulated users (one
+    thread and one AppTest session each, like Streamlit's one thread per
+    session), `duration` seconds per level, against a generated database
+    and a mock LLM. Returns a dict with the per-level and per-action
+    summaries and samples of the errors.
+    """
+    workdir = Path(workdir)
+    workdir.mkdir(parents=True, exist_ok=True)
+    db_path = workdir / f"load-scale{scale}-seed{seed}-v{generate.GENERATOR_VERSION}.db"
+    if not (reuse and db_path.exists()):
+        db_path.unlink(missing_ok=True)
+        print(f"[load] Building {db_path.name} ...")
+        generate.build_database(db_path, scale, seed, {"users": max(200, int(scale * 0.01))})
+
+    # The pages open their connections through connect_database() and read DATA/ relative paths
+    from app.data import db
+    os.environ["APP_DB_PATH"] = str(db_path)
+    db.DB_PATH = db_path
+    os.chdir(APP_DIR)
+    mock_llm.install(ttft=llm_ttft)
+    _install_secrets({"GEMINI_API_KEY": "mock"})
+
+    stats = LoadStats()
+    durations = {}
+    accounts = _users_by_role(db_path, max(levels))
+    for level in levels:
+        print(f"[load] {level} concurrent users for {duration} s ...")
+        started = time.monotonic()
+        deadline = started + duration
+        threads = [
+            threading.Thread(
+                target=SimulatedUser(username, role, level, stats, [seed, level, i], think_seconds).run,
+                args=(deadline,), name=f"load-user-{i}", daemon=True,
+            )
+            for i, (username, role) in enumerate(accounts[:level])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        durations[level] = time.monotonic() - started
+
+    df = stats.frame()
+    if df.empty:
+        raise RuntimeError("No interaction was recorded")
+    commit, dirty = _git_commit()
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "dirty": dirty,
+        "scale": scale,
+        "seed": seed,
+        "duration_s": duration,
+        "think_seconds": think_seconds,
+        "llm_ttft_s": llm_ttft,
+        "levels": summarize_levels(df, durations).reset_index().to_dict(orient="records"),
+        "actions": summarize_actions(df).reset_index().to_dict(orient="records"),
+        "error_samples": stats.error_samples,
+    }
+
+
+def save_load_results(results, output_dir=RESULTS_DIR):
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.fromisoformat(results["created_at"]).strftime("%Y%m%d-%H%M%S")
+    commit = (results["commit"] or "nogit") + ("-dirty" if results["dirty"] else "")
+    path = output_dir / f"load_{stamp}_{commit}_scale{results['scale']}.json"
+    path.write_text(json.dumps(results, indent=2, default=str), encoding="utf-8")
+    return path
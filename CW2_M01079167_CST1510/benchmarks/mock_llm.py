@@ -0,0 +1,83 @@
+import random
+import sys
+import time
+import types
+from types import SimpleNamespace
+
+# Default timings of a mocked reply, close to what gemini-2.5-flash shows in the telemetry
+TTFT_SECONDS = 0.4
+CHUNKS = 6
+CHUNK_SECONDS = 0.1
+
+
+class MockResponse:
+    """
+    Streamed reply: chunks arrive after sleeps (time to first chunk, then
+    between chunks), token usage is set once the stream is consumed,
+    like the google.generativeai streaming response.
+    """
+
+    def __init__(self, prompt_tokens, ttft, chunks, chunk_seconds):
+        self.prompt_tokens = prompt_tokens
+        self.ttft = ttft
+        self.chunks = chunks
+        self.chunk_seconds = chunk_seconds
+        self.usage_metadata = None
+
+    def __iter__(self):
+        time.sleep(self.ttft)
+        for i in range(self.chunks):
+            if i:
+                time.sleep(self.chunk_seconds)
+            yield SimpleNamespace(parts=[True], text=f"Mock answer part {i + 1}. ")
+        self.usage_metadata = SimpleNamespace(
+            prompt_token_count=self.prompt_tokens,
+            candidates_token_count=self.chunks * 5,
+        )
+
+
+class MockModel:
+    """
+    Stand-in for genai.GenerativeModel: no network, configurable latency
+    with +/-25% jitter.
+    """
+
+    ttft = TTFT_SECONDS
+    chunks = CHUNKS
+    chunk_seconds = CHUNK_SECONDS
+
+    def __init__(self, model_name, **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, contents=None, generation_config=None, stream=False):
+        text = " ".join(
+            part.get("text", "") for message in (contents or []) for part in message.get("parts", [])
+        )
+        jitter = random.uniform(0.75, 1.25)
+        response = MockResponse(max(1, len(text) // 4), self.ttft * jitter, self.chunks, self.chunk_seconds * jitter)
+        if stream:
+            return response
+        parts = list(response)
+        return SimpleNamespace(text="".join(p.text for p in parts), parts=parts, usage_metadata=response.usage_metadata)
+
+
+def install(ttft=TTFT_SECONDS, chunks=CHUNKS, chunk_seconds=CHUNK_SECONDS):
+    """
+    Make the pages' `import google.generativeai as genai` use MockModel.
+    Patches the installed package, or registers a minimal module when the
+    package is not installed. Must run before the pages are executed.
+    """
+    MockModel.ttft, MockModel.chunks, MockModel.chunk_seconds = ttft, chunks, chunk_seconds
+    try:
+        import google.generativeai as genai
+    except ImportError:
+        google = sys.modules.setdefault("google", types.ModuleType("google"))
+        google.__path__ = getattr(google, "__path__", [])
+        genai = types.ModuleType("google.generativeai")
+        genai.types = SimpleNamespace(GenerationConfig=lambda **kwargs: kwargs)
+        google.generativeai = genai
+        sys.modules["google.generativeai"] = genai
+
+    genai.configure = lambda **kwargs: None
+    genai.GenerativeModel = MockModel
+    return genai
@@ -0,0 +1,259 @@
+import re
+import sqlite3
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from benchmarks import generate
+from benchmarks.suite import DATA_DIR
+
+# Default size of the generated database: large enough for ANALYZE to make
+# the planner prefer the indexes it would use in production
+PLAN_SCALE = 100_000
+
+_SCAN = re.compile(r"^SCAN (\S+)")
+
+
+# ---------------------------
+# REGISTRY
+# ---------------------------
+PLAN_CHECKS = {}
+
+
+def plan_check(name, indexes, ordered=False):
+    """
+    Register a hot code path. The function gets a profiled connection to the
+    generated database and a dict of sample keys, and runs the real
+    data-layer or service call; every statement it executes is explained.
+    - indexes: index names (or "PRIMARY KEY") that must appear in the plans
+    - ordered: the rows must come out of an index, not a temporary sort
+    """
+    def register(function):
+        PLAN_CHECKS[name] = {"run": function, "indexes": list(indexes), "ordered": ordered}
+        return function
+    return register
+
+
+def plan_problems(plan, ordered=False):
+    """
+    Problems of one statement's plan lines: full scans of a table (a SCAN
+    without an index, except virtual tables and subqueries) and, for ordered
+    reads, a temporary B-tree built for the ORDER BY.
+    """
+    problems = []
+    for line in plan:
+        match = _SCAN.match(line)
+        if match and "USING" not in line and "VIRTUAL TABLE" not in line \
+                and not match.group(1).startswith("(") and match.group(1) != "CONSTANT":
+            problems.append(f"full scan: {line}")
+        if ordered and "USE TEMP B-TREE FOR ORDER BY" in line:
+            problems.append(f"sort instead of index order: {line}")
+    return problems
+
+
+# ---------------------------
+# HOT STATEMENTS
+# ---------------------------
+@plan_check("session.validate", ["sqlite_autoindex_sessions_1"])
+def check_session_validate(conn, sample):
+    from app.services.session_service import validate_session
+    validate_session(sample["token"])
+
+
+@plan_check("session.delete", ["sqlite_autoindex_sessions_1"])
+def check_session_delete(conn, sample):
+    from app.services.session_service import delete_session
+    delete_session(sample["expired_token"])
+
+
+@plan_check("user.lookup", ["sqlite_autoindex_users_1"])
+def check_user_lookup(conn, sample):
+    from app.services.user_service import get_user_by_username
+    get_user_by_username(sample["username"])
+
+
+@plan_check("user.duplicate_check", ["sqlite_autoindex_users_1"])
+def check_user_duplicate(conn, sample):
+    from app.services.user_service import register_user
+    # An existing username: register_user stops after the duplicate check
+    register_user(sample["username"], "unused", "admin")
+
+
+@plan_check("incidents.page", ["idx_incidents_timestamp"], ordered=True)
+def check_incidents_page(conn, sample):
+    from app.data.incidents import get_incidents_page
+    get_incidents_page(conn, page=10, page_size=50)
+
+
+@plan_check("incidents.cluster_page", ["idx_incidents_timestamp", "idx_incidents_cluster"], ordered=True)
+def check_incident_clusters_page(conn, sample):
+    from app.data.incidents import get_incident_clusters_page
+    get_incident_clusters_page(conn, page=10, page_size=50)
+
+
+@plan_check("incidents.duplicate_check", ["sqlite_autoindex_cyber_incidents_1"])
+def check_incident_exists(conn, sample):
+    from app.data.incidents import incident_exists
+    incident_exists(conn, sample["incident_id"])
+
+
+@plan_check("incidents.delete", ["sqlite_autoindex_cyber_incidents_1"])
+def check_incident_delete(conn, sample):
+    from app.data.incidents import delete_incident
+    # Nobody created the generated incidents: nothing is deleted, the plan is the same
+    delete_incident(conn, sample["incident_id"], "plan-guard")
+
+
+@plan_check("incidents.near_duplicates", ["idx_lsh_buckets", "sqlite_autoindex_cyber_incidents_1"])
+def check_near_duplicates(conn, sample):
+    from app.data.dedup import assign_duplicate_cluster
+    # LSH bucket lookups and the cluster update; rolled back, the caller commits
+    assign_duplicate_cluster(conn, sample["incident_id"], sample["description"])
+    conn.rollback()
+
+
+@plan_check("incidents.alerts", ["idx_incident_alerts_bucket"], ordered=True)
+def check_incident_alerts(conn, sample):
+    from app.data.incidents import get_incident_alerts
+    get_incident_alerts(conn, limit=20)
+
+
+@plan_check("tickets.page", ["idx_tickets_created_at"], ordered=True)
+def check_tickets_page(conn, sample):
+    from app.data.tickets import get_tickets_page
+    get_tickets_page(conn, page=10, page_size=50)
+
+
+@plan_check("tickets.open_load", ["idx_tickets_status"])
+def check_ticket_router(conn, sample):
+    from app.services.routing_service import TicketRouter
+    TicketRouter.from_database(conn)
+
+
+@plan_check("aggregate.summary_counts", ["PRIMARY KEY"])
+def check_summary_counts(conn, sample):
+    from app.data.summaries import get_summary_counts, get_total_count
+    get_summary_counts(conn, "incidents", "severity")
+    get_total_count(conn, "tickets")
+
+
+@plan_check("aggregate.time_series_day", ["PRIMARY KEY"])
+def check_time_series_day(conn, sample):
+    from app.data.timeseries import get_time_series
+    get_time_series(conn, "incidents", "day", dimension="severity", start=sample["start"], end=sample["end"])
+
+
+@plan_check("aggregate.time_series_hour", ["idx_incidents_timestamp", "idx_tickets_created_at"])
+def check_time_series_hour(conn, sample):
+    from app.data.timeseries import get_time_series
+    get_time_series(conn, "incidents", "hour", dimension="severity", start=sample["start"], end=sample["end"])
+    get_time_series(conn, "tickets", "hour", start=sample["start"], end=sample["end"])
+
+
+@plan_check("aggregate.sla_quantiles", ["sqlite_autoindex_ticket_sla_sketches_1"])
+def check_sla_quantiles(conn, sample):
+    from app.data.sla import get_resolution_quantiles
+    get_resolution_quantiles(conn, "assigned_to")
+
+
+@plan_check("chat.recent_messages", ["idx_chat_messages_user_domain"], ordered=True)
+def check_recent_messages(conn, sample):
+    from app.data.chat_history import get_recent_messages
+    get_recent_messages(conn, sample["username"], "cybersecurity")
+
+
+@plan_check("search.incidents", ["INTEGER PRIMARY KEY"])
+def check_search_incidents(conn, sample):
+    from app.data.search import search_incidents
+    search_incidents(conn, "phishing mail server")
+
+
+# ---------------------------
+# RUNNER
+# ---------------------------
+def _samples(db_path):
+    """
+    Real keys of the generated database for the checks, read over a plain
+    (unprofiled) connection so these lookups are not checked themselves.
+    """
+    conn = sqlite3.connect(str(db_path))
+    now = pd.Timestamp.now().strftime("%Y-%m-%dT%H:%M:%S.%f")
+    sample = {
+        "token": conn.execute("SELECT token FROM sessions WHERE expires_at > ? LIMIT 1", (now,)).fetchone()[0],
+        "expired_token": (conn.execute("SELECT token FROM sessions WHERE expires_at <= ? LIMIT 1", (now,)).fetchone()
+                          or ("missing-token",))[0],
+        "username": conn.execute("SELECT username FROM users LIMIT 1").fetchone()[0],
+    }
+    sample["incident_id"], sample["description"] = conn.execute(
+        "SELECT incident_id, description FROM cyber_incidents ORDER BY rowid DESC LIMIT 1"
+    ).fetchone()
+    # One month of data, in the middle of the generated window
+    start = generate.START + (pd.Timedelta(seconds=generate.SPAN_SECONDS) / 2)
+    sample["start"], sample["end"] = str(start.date()), str((start + pd.Timedelta(days=30)).date())
+    conn.close()
+    return sample
+
+
+def check_plans(db_path, only=None):
+    """
+    Run every registered check (or the ones whose name starts with a prefix
+    of only) against the database and explain the statements they execute.
+    Returns a DataFrame with one row per statement: check, statement, plan,
+    problems; a check that executed nothing, or whose plans miss an
+    expected index, gets a row with the problem and no statement.
+    """
+    from app.data import db, query_profiler
+
+    db.DB_PATH = Path(db_path)    # Services open their own connections
+    query_profiler.enable_profiling()
+    sample = _samples(db_path)
+
+    records = []
+    for name, check in PLAN_CHECKS.items():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        conn = db.connect_database(db_path)
+        try:
+            with query_profiler.capture_plans() as captured:
+                check["run"](conn, sample)
+        finally:
+            conn.close()
+
+        lines = [line for statement in captured for line in statement["plan"]]
+        for statement in captured:
+            records.append({
+                "check": name,
+                "statement": statement["statement"],
+                "plan": " | ".join(statement["plan"]),
+                "problems": "; ".join(plan_problems(statement["plan"], check["ordered"])),
+            })
+        missing = [index for index in check["indexes"] if not any(index in line for line in lines)]
+        if not captured:
+            missing_problem = "no statement executed"
+        elif missing:
+            missing_problem = f"expected index not used: {', '.join(missing)}"
+        else:
+            continue
+        records.append({"check": name, "statement": "", "plan": "", "problems": missing_problem})
+
+    return pd.DataFrame(records, columns=["check", "statement", "plan", "problems"])
+
+
+def run_plan_guard(scale=PLAN_SCALE, seed=42, workdir=DATA_DIR, reuse=False, only=None):
+    """
+    Build (or reuse) a generated database of the given scale and check the
+    query plans of the hot statements. Returns the report of check_plans().
+    The database has its own file: the checks write a little (deleted
+    session), so it is not shared with the benchmark runs.
+    """
+    workdir = Path(workdir)
+    workdir.mkdir(parents=True, exist_ok=True)
+    db_path = workdir / f"plans-scale{scale}-seed{seed}-v{generate.GENERATOR_VERSION}.db"
+    if not (reuse and db_path.exists()):
+        db_path.unlink(missing_ok=True)
+        print(f"[plans] Building {db_path.name} ...")
+        started = time.perf_counter()
+        generate.build_database(db_path, scale, seed)
+        print(f"[plans] Database built in {time.perf_counter() - started:.1f} s")
+    return check_plans(db_path, only)
@@ -0,0 +1,519 @@
+import json
+import platform
+import sqlite3
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import generate
+
+# Results are written here by default, one JSON file per run (git-ignored)
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# Generated databases and files go here by default (git-ignored)
+DATA_DIR = Path(__file__).resolve().parent / "data"
+
+# Rows pushed through the page upload loops, per run
+UPLOAD_ROWS = 500
+
+# Session tokens checked per validate_session run
+SESSION_LOOKUPS = 1000
+
+# Sessions created per create_session run
+SESSION_CREATES = 200
+
+# Logins per run (each one is a bcrypt check, ~0.2 s)
+LOGINS = 3
+
+# A median this much slower than the baseline is reported as a regression
+REGRESSION_THRESHOLD = 0.10
+
+
+# ---------------------------
+# REGISTRY
+# ---------------------------
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """
+    Register a benchmark. The function gets the BenchContext and a Timer,
+    times only the code inside `with timer:` and returns the number of
+    operations (rows, calls...) done, used for the throughput.
+    """
+    def register(function):
+        BENCHMARKS[name] = function
+        return function
+    return register
+
+
+class Timer:
+    """
+    Accumulates the time spent inside `with timer:` blocks.
+    """
+
+    def __init__(self):
+        self.seconds = 0.0
+        self._started = None
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds += time.perf_counter() - self._started
+
+
+class BenchContext:
+    """
+    Generated data shared by the benchmarks of one run: the database, the
+    CSV and dataset files, and the number of rows of each table.
+    """
+
+    def __init__(self, workdir, scale, seed, rows, dataset_rows):
+        self.workdir = Path(workdir)
+        self.scale = scale
+        self.seed = seed
+        self.rows = rows
+        self.dataset_rows = dataset_rows
+        stem = f"scale{scale}-seed{seed}-v{generate.GENERATOR_VERSION}"
+        self.db_path = self.workdir / f"{stem}.db"
+        self.csv_paths = {table: self.workdir / f"{stem}-{table}.csv" for table in ("incidents", "tickets", "datasets")}
+        self.dataset_file = self.workdir / f"{stem}-dataset.csv"
+        self.store_dir = self.workdir / "dataset_store"
+
+    def connect(self):
+        from app.data.db import connect_database
+        return connect_database(self.db_path)
+
+    def prepare(self, reuse=False):
+        """
+        Generate the database and files (kept when reuse is True and they exist),
+        then point the app at them (DB_PATH, dataset store directory).
+        """
+        from app.data import dataset_store, db
+
+        self.workdir.mkdir(parents=True, exist_ok=True)
+        if not (reuse and self.db_path.exists()):
+            self.db_path.unlink(missing_ok=True)
+            print(f"[bench] Building {self.db_path.name} ...")
+            started = time.perf_counter()
+            generate.build_database(self.db_path, self.scale, self.seed, self.rows)
+            print(f"[bench] Database built in {time.perf_counter() - started:.1f} s")
+
+        for table, path in self.csv_paths.items():
+            if not (reuse and path.exists()):
+                _, generator = generate.TABLE_GENERATORS[table]
+                generate.write_csv(generator(self.rows[table], self.seed), path)
+        if not (reuse and self.dataset_file.exists()):
+            generate.write_dataset_file(self.dataset_file, self.dataset_rows, self.seed)
+
+        # Services open their own connections through connect_database()
+        db.DB_PATH = self.db_path
+        dataset_store.STORE_DIR = self.store_dir
+
+
+def _fresh_database(ctx, name):
+    from app.data.db import connect_database
+    from app.data.schema import create_all_tables
+
+    path = ctx.workdir / name
+    path.unlink(missing_ok=True)
+    conn = connect_database(path)
+    create_all_tables(conn)
+    return conn, path
+
+
+def _next_id(conn, table, column):
+    row = conn.execute(f"SELECT MAX(CAST({column} AS INTEGER)) FROM {table}").fetchone()
+    return (row[0] or 0) + 1
+
+
+# ---------------------------
+# MIGRATIONS (CSV -> DATABASE)
+# ---------------------------
+@benchmark("migrate.incidents")
+def bench_migrate_incidents(ctx, timer):
+    from app.data.incidents import migrate_incidents_from_csv
+
+    conn, path = _fresh_database(ctx, "migrate.db")
+    with timer:
+        migrate_incidents_from_csv(str(ctx.csv_paths["incidents"]), conn)
+        conn.commit()
+    conn.close()
+    path.unlink()
+    return ctx.rows["incidents"]
+
+
+@benchmark("migrate.tickets")
+def bench_migrate_tickets(ctx, timer):
+    from app.data.tickets import migrate_tickets_from_csv
+
+    conn, path = _fresh_database(ctx, "migrate.db")
+    with timer:
+        migrate_tickets_from_csv(str(ctx.csv_paths["tickets"]), conn)
+        conn.commit()
+    conn.close()
+    path.unlink()
+    return ctx.rows["tickets"]
+
+
+@benchmark("migrate.datasets")
+def bench_migrate_datasets(ctx, timer):
+    from app.data.datasets import migrate_datasets_from_csv
+
+    conn, path = _fresh_database(ctx, "migrate.db")
+    with timer:
+        migrate_datasets_from_csv(str(ctx.csv_paths["datasets"]), conn)
+    conn.close()
+    path.unlink()
+    return ctx.rows["datasets"]
+
+
+# ---------------------------
+# TABLE READERS
+# ---------------------------
+def _read_benchmark(name, module, function):
+    @benchmark(name)
+    def run(ctx, timer):
+        reader = getattr(__import__(module, fromlist=[function]), function)
+        conn = ctx.connect()
+        with timer:
+            df = reader(conn)
+        conn.close()
+        return len(df)
+    return run
+
+
+_read_benchmark("read.get_all_incidents", "app.data.incidents", "get_all_incidents")
+_read_benchmark("read.get_all_tickets", "app.data.tickets", "get_all_tickets")
+_read_benchmark("read.get_all_datasets", "app.data.datasets", "get_all_datasets")
+
+
+def _page_benchmark(name, module, function, table):
+    @benchmark(name)
+    def run(ctx, timer):
+        reader = getattr(__import__(module, fromlist=[function]), function)
+        conn = ctx.connect()
+        # A page in the middle of the table: OFFSET walks half the index
+        page = max(1, ctx.rows[table] // 50 // 2)
+        with timer:
+            df, _ = reader(conn, page=page, page_size=50)
+        conn.close()
+        return len(df)
+    return run
+
+
+_page_benchmark("read.incidents_page", "app.data.incidents", "get_incidents_page", "incidents")
+_page_benchmark("read.tickets_page", "app.data.tickets", "get_tickets_page", "tickets")
+
+
+# ---------------------------
+# SESSIONS AND LOGIN
+# ---------------------------
+@benchmark("session.validate")
+def bench_validate_session(ctx, timer):
+    from app.services.session_service import validate_session
+
+    conn = ctx.connect()
+    tokens = [row[0] for row in conn.execute(
+        "SELECT token FROM sessions WHERE expires_at > ? ORDER BY random() LIMIT ?",
+        (datetime.now().isoformat(), SESSION_LOOKUPS)
+    )]
+    conn.close()
+    with timer:
+        valid = sum(validate_session(token) for token in tokens)
+    if valid != len(tokens):
+        raise RuntimeError(f"{len(tokens) - valid} generated sessions failed validation")
+    return len(tokens)
+
+
+@benchmark("session.create")
+def bench_create_session(ctx, timer):
+    from app.services.session_service import create_session
+
+    with timer:
+        for i in range(SESSION_CREATES):
+            create_session(f"user{i:08d}")
+    return SESSION_CREATES
+
+
+@benchmark("user.login")
+def bench_login(ctx, timer):
+    from app.services.user_service import login_user
+
+    rng = np.random.default_rng(ctx.seed)
+    usernames = [f"user{i:08d}" for i in rng.integers(0, ctx.rows["users"], LOGINS)]
+    with timer:
+        results = [login_user(username, generate.BENCH_PASSWORD) for username in usernames]
+    if not all(result[0] for result in results):
+        raise RuntimeError("Generated users failed to log in")
+    return LOGINS
+
+
+# ---------------------------
+# PAGE UPLOADS (rows queued to the writer thread, as in the CSV upload forms)
+# ---------------------------
+@benchmark("upload.incidents")
+def bench_upload_incidents(ctx, timer):
+    from app.data.incidents import insert_incident_if_new
+    from app.data.write_queue import submit_write, wait_write
+
+    conn = ctx.connect()
+    df = next(generate.iter_incidents(UPLOAD_ROWS, ctx.seed + 1, first_id=_next_id(conn, "cyber_incidents", "incident_id")))
+    conn.close()
+    with timer:
+        # Same path as the Cybersecurity page upload: queue every row, then wait for the group commits
+        futures = [
+            submit_write(insert_incident_if_new, int(row.incident_id), row.timestamp, row.severity, row.category,
+                         row.status, row.description, created_by="bench")
+            for row in df.itertuples(index=False)
+        ]
+        for future in futures:
+            wait_write(future)
+    return len(df)
+
+
+@benchmark("upload.tickets")
+def bench_upload_tickets(ctx, timer):
+    from app.data.tickets import insert_ticket
+    from app.data.write_queue import submit_write, wait_write
+
+    conn = ctx.connect()
+    df = next(generate.iter_tickets(UPLOAD_ROWS, ctx.seed + 1, first_id=_next_id(conn, "it_tickets", "ticket_id")))
+    conn.close()
+    with timer:
+        futures = [
+            submit_write(insert_ticket, int(row.ticket_id), row.title, row.status, row.priority, row.assigned_to,
+                         row.description, row.created_at,
+                         None if pd.isna(row.resolution_time_hours) else float(row.resolution_time_hours))
+            for row in df.itertuples(index=False)
+        ]
+        for future in futures:
+            wait_write(future)
+    return len(df)
+
+
+# ---------------------------
+# DATASET FILES
+# ---------------------------
+@benchmark("dataset.profile")
+def bench_profile_dataset(ctx, timer):
+    from app.data.profiler import profile_dataset
+
+    with timer:
+        profile = profile_dataset(str(ctx.dataset_file))
+    return profile["rows"]
+
+
+@benchmark("dataset.store")
+def bench_store_dataset(ctx, timer):
+    from app.data.dataset_store import dataset_path, store_dataset
+    from app.data.profiler import compute_content_hash
+
+    content_hash = compute_content_hash(str(ctx.dataset_file))
+    existing = dataset_path(content_hash)
+    if existing is not None:
+        existing.unlink()
+    with timer:
+        store_dataset(str(ctx.dataset_file), content_hash)
+    return ctx.dataset_rows
+
+
+@benchmark("dataset.preview")
+def bench_preview_dataset(ctx, timer):
+    from app.data.dataset_store import store_dataset
+    from app.services.preview_service import build_preview
+
+    content_hash, _ = store_dataset(str(ctx.dataset_file))
+    with timer:
+        build_preview(content_hash)
+    return ctx.dataset_rows
+
+
+# ---------------------------
+# AGGREGATIONS AND SEARCH
+# ---------------------------
+@benchmark("aggregate.summary_counts")
+def bench_summary_counts(ctx, timer):
+    from app.data.summaries import SUMMARY_DOMAINS, get_summary_counts
+
+    conn = ctx.connect()
+    calls = 0
+    with timer:
+        for domain, spec in SUMMARY_DOMAINS.items():
+            for dimension in spec["dimensions"]:
+                get_summary_counts(conn, domain, dimension)
+                calls += 1
+    conn.close()
+    return calls
+
+
+@benchmark("aggregate.group_by_scan")
+def bench_group_by_scan(ctx, timer):
+    # What the summary tables avoid: the same counts from a full table scan
+    conn = ctx.connect()
+    with timer:
+        conn.execute("SELECT severity, COUNT(*) FROM cyber_incidents GROUP BY severity").fetchall()
+    conn.close()
+    return ctx.rows["incidents"]
+
+
+@benchmark("aggregate.time_series_day")
+def bench_time_series_day(ctx, timer):
+    from app.data.timeseries import get_time_series
+
+    conn = ctx.connect()
+    with timer:
+        df = get_time_series(conn, "incidents", "day", dimension="severity")
+    conn.close()
+    return len(df)
+
+
+@benchmark("aggregate.time_series_hour")
+def bench_time_series_hour(ctx, timer):
+    from app.data.timeseries import get_time_series
+
+    conn = ctx.connect()
+    with timer:
+        df = get_time_series(conn, "tickets", "hour", dimension="priority", start="2024-01-01", end="2024-01-31")
+    conn.close()
+    return len(df)
+
+
+@benchmark("aggregate.sla_quantiles")
+def bench_sla_quantiles(ctx, timer):
+    from app.data.sla import get_resolution_quantiles
+
+    conn = ctx.connect()
+    with timer:
+        df = get_resolution_quantiles(conn, "assigned_to")
+    conn.close()
+    return len(df)
+
+
+@benchmark("search.incidents")
+def bench_search_incidents(ctx, timer):
+    from app.data.search import search_incidents
+
+    conn = ctx.connect()
+    with timer:
+        search_incidents(conn, "phishing mail server", page=1)
+        search_incidents(conn, "malware firewall", page=5)
+    conn.close()
+    return 2
+
+
+# ---------------------------
+# RUN, SAVE, COMPARE
+# ---------------------------
+def _git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=Path(__file__).parent, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                               text=True, cwd=Path(__file__).parent, check=True).stdout.strip() != ""
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def run_suite(scale, seed=42, repeat=3, only=None, workdir=DATA_DIR, reuse=False, dataset_rows=None,
+              overrides=None):
+    """
+    Generate the data for a scale and run the selected benchmarks
+    (names starting with one of the `only` prefixes, all by default),
+    each `repeat` times. Returns the results as a dict.
+    """
+    rows = generate.table_rows(scale, overrides)
+    ctx = BenchContext(workdir, scale, seed, rows, dataset_rows or scale)
+    ctx.prepare(reuse)
+
+    selected = [name for name in BENCHMARKS if not only or name.startswith(tuple(only))]
+    results = {}
+    for name in selected:
+        runs, ops = [], 0
+        for _ in range(repeat):
+            timer = Timer()
+            ops = BENCHMARKS[name](ctx, timer)
+            runs.append(timer.seconds)
+        median = statistics.median(runs)
+        results[name] = {
+            "ops": ops,
+            "runs_s": [round(r, 6) for r in runs],
+            "min_s": round(min(runs), 6),
+            "median_s": round(median, 6),
+            "mean_s": round(statistics.fmean(runs), 6),
+            "max_s": round(max(runs), 6),
+            "ops_per_s": round(ops / median, 1) if median > 0 else None,
+        }
+        print(f"[bench] {name:<28} median {median * 1000:10.2f} ms  ({results[name]['ops_per_s']} ops/s)")
+
+    commit, dirty = _git_commit()
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "dirty": dirty,
+        "scale": scale,
+        "seed": seed,
+        "repeat": repeat,
+        "generator_version": generate.GENERATOR_VERSION,
+        "rows": rows,
+        "dataset_rows": ctx.dataset_rows,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "benchmarks": results,
+    }
+
+
+def save_results(results, output_dir=RESULTS_DIR):
+    """
+    Write results to <output_dir>/<date>_<commit>_scale<scale>.json and return the path.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.fromisoformat(results["created_at"]).strftime("%Y%m%d-%H%M%S")
+    commit = (results["commit"] or "nogit") + ("-dirty" if results["dirty"] else "")
+    path = output_dir / f"{stamp}_{commit}_scale{results['scale']}.json"
+    path.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    return path
+
+
+def compare_results(baseline_path, candidate_path, threshold=REGRESSION_THRESHOLD):
+    """
+    Compare the median times of two result files, benchmark by benchmark.
+    Returns a DataFrame with both medians, the ratio (candidate / baseline)
+    and a verdict (regression, improvement or same within the threshold).
+    """
+    baseline = json.loads(Path(baseline_path).read_text(encoding="utf-8"))
+    candidate = json.loads(Path(candidate_path).read_text(encoding="utf-8"))
+    if (baseline["scale"], baseline["seed"]) != (candidate["scale"], candidate["seed"]):
+        print("[bench] Warning: the two runs used different scales or seeds")
+
+    records = []
+    for name in sorted(set(baseline["benchmarks"]) | set(candidate["benchmarks"])):
+        old = baseline["benchmarks"].get(name, {}).get("median_s")
+        new = candidate["benchmarks"].get(name, {}).get("median_s")
+        ratio = new / old if old and new else None
+        if ratio is None:
+            verdict = "missing"
+        elif ratio > 1 + threshold:
+            verdict = "regression"
+        elif ratio < 1 - threshold:
+            verdict = "improvement"
+        else:
+            verdict = "same"
+        records.append({
+            "benchmark": name,
+            "baseline_ms": None if old is None else round(old * 1000, 2),
+            "candidate_ms": None if new is None else round(new * 1000, 2),
+            "ratio": None if ratio is None else round(ratio, 3),
+            "verdict": verdict,
+        })
+    return pd.DataFrame(records).set_index("benchmark")
@@ -10,6 +10,8 @@ from app.services.user_service import (
     create_default_admin,
 )
 from app.services.session_service import validate_session, delete_session
+from app.services.anomaly_service import start_anomaly_detection_in_background
+from app.data.metrics import start_metrics_server
 
 # CSV migrations
 from app.data.incidents import migrate_incidents_from_csv
@@ -103,6 +105,9 @@ def main():
     """
     st.set_page_config(page_title="Intelligence Platform", layout="wide")
 
+    # Prometheus endpoint next to Streamlit (started once per process, APP_METRICS_PORT)
+    start_metrics_server()
+
     #  Welcome message at the top
     st.markdown("##  Welcome to Multi-Domain Intelligence Platform")
 
@@ -121,6 +126,9 @@ def main():
         conn.commit()
         conn.close()
 
+        # Look for new incident spikes without delaying the page
+        start_anomaly_detection_in_background()
+
         st.session_state["db_initialized"] = True
         st.success("✅ Database initialized successfully.")
 
@@ -1,48 +1,114 @@
+import uuid
 import streamlit as st
 from app.services.session_service import validate_session, delete_session
+from app.data.db import connect_readonly
+from app.data.telemetry import get_llm_telemetry, summarize_latency, token_spend_by_day
+from app.data import query_profiler
+from app.services.tracing_service import (
+    is_enabled as tracing_enabled,
+    page_trace,
+    phase_summary,
+    span,
+)
+import pandas as pd
 
-# ---------------- SECURITY CHECK ----------------
-# Initialize session state variables with default values if not already set
-st.session_state.setdefault("logged_in", False)
-st.session_state.setdefault("username", "")
-st.session_state.setdefault("role", "")
-st.session_state.setdefault("token", "")
-
-# Verify if the user is logged in and the session token is valid
-if not st.session_state["logged_in"] or not validate_session(st.session_state["token"]):
-    st.error("Session expired or unauthorized.")   # Show error message
-    st.session_state.clear()                       # Clear all session state values
-    st.switch_page("main.py")                      # Redirect to login/main page
-    st.stop()                                      # Stop execution of the current page
-
-# Retrieve username and role from session state for display and access control
-username = st.session_state["username"]
-role = st.session_state["role"]
-
-# ---------------- HEADER + LOGOUT ----------------
-# Display logged-in user information
-st.write(f"👤 Logged in as **{username}** (role: {role})")
-
-# Logout button: deletes session, clears state, and refreshes the app
-if st.button("🚪 Logout"):
-    delete_session(st.session_state["token"])      # Remove session from DB
-    st.session_state.clear()                       # Clear session state
-    st.success("✅ You have been logged out.")      # Confirmation message
-    st.rerun()                                     # Reload the app to reset state
-
-# ---------------- DASHBOARD ----------------
-# Main dashboard title and welcome message
-st.title("📊 Intelligence Platform Dashboard")
-st.success(f"Welcome {username} ({role})")
-
-# Navigation links (only visible to admin users)
-if role == "admin":
-    st.page_link("pages/2_Cybersecurity.py", label="Cybersecurity")
-    st.page_link("pages/3_DataScience.py", label="Data Science")
-    st.page_link("pages/4_ITOperations.py", label="IT Operations")
-
-# Inject custom CSS for purple gradient background
-page_bg_css = """
+# Every rerun of this page is one trace, finished however the run ends; its phases
+# are nested spans (APP_TRACE=1). The session key identifies this browser session
+# across reruns (trace, read snapshot).
+session_key = st.session_state.setdefault("session_key", uuid.uuid4().hex)
+with page_trace("dashboard", session_key):
+    # ---------------- SECURITY CHECK ----------------
+    # Initialize session state variables with default values if not already set
+    st.session_state.setdefault("logged_in", False)
+    st.session_state.setdefault("username", "")
+    st.session_state.setdefault("role", "")
+    st.session_state.setdefault("token", "")
+
+    # Verify if the user is logged in and the session token is valid
+    with span("auth"):
+        if not st.session_state["logged_in"] or not validate_session(st.session_state["token"]):
+            st.error("Session expired or unauthorized.")   # Show error message
+            st.session_state.clear()                       # Clear all session state values
+            st.switch_page("main.py")                      # Redirect to login/main page
+            st.stop()                                      # Stop execution of the current page
+
+    # Retrieve username and role from session state for display and access control
+    username = st.session_state["username"]
+    role = st.session_state["role"]
+
+    # ---------------- HEADER + LOGOUT ----------------
+    # Display logged-in user information
+    st.write(f"👤 Logged in as **{username}** (role: {role})")
+
+    # Logout button: deletes session, clears state, and refreshes the app
+    if st.button("🚪 Logout"):
+        delete_session(st.session_state["token"])      # Remove session from DB
+        st.session_state.clear()                       # Clear session state
+        st.success("✅ You have been logged out.")      # Confirmation message
+        st.rerun()                                     # Reload the app to reset state
+
+    # ---------------- DASHBOARD ----------------
+    # Main dashboard title and welcome message
+    st.title("📊 Intelligence Platform Dashboard")
+    st.success(f"Welcome {username} ({role})")
+
+    # Navigation links (only visible to admin users)
+    if role == "admin":
+        st.page_link("pages/2_Cybersecurity.py", label="Cybersecurity")
+        st.page_link("pages/3_DataScience.py", label="Data Science")
+        st.page_link("pages/4_ITOperations.py", label="IT Operations")
+
+    # ---------------- LLM USAGE & LATENCY (ADMIN ONLY) ----------------
+    # Reads the telemetry recorded for every Gemini chat call on the domain pages
+    if role == "admin":
+        st.subheader("🤖 LLM Usage & Latency")
+        days = st.selectbox("Period (days)", [1, 7, 30, 90], index=2)
+
+        conn = connect_readonly()
+        with span("telemetry.load"):
+            telemetry_df = get_llm_telemetry(conn, days=days)
+        conn.close()
+
+        if telemetry_df.empty:
+            st.info("No chat calls recorded for this period.")
+        else:
+            # Latency percentiles per domain page (milliseconds)
+            st.dataframe(summarize_latency(telemetry_df), use_container_width=True)
+
+            # Token spend trend per day and domain
+            st.caption("Token spend per day (input + output)")
+            st.line_chart(token_spend_by_day(telemetry_df))
+
+            # Most frequent errors, to spot regressions quickly
+            errors = telemetry_df[telemetry_df["status"] == "error"]
+            if not errors.empty:
+                st.caption("Errors by class")
+                st.bar_chart(errors["error_class"].value_counts())
+
+    # SQL profiler (admin only, when the app runs with APP_SQL_PROFILE=1)
+    if role == "admin" and query_profiler.is_enabled():
+        st.subheader("🐢 SQL Query Profiler")
+        st.caption(f"Statements grouped by shape since the server started (slow threshold: {query_profiler.SLOW_QUERY_MS:g} ms)")
+        st.dataframe(query_profiler.query_report(), use_container_width=True)
+
+        slow = query_profiler.slow_queries()
+        if slow:
+            st.caption("Slow queries with their EXPLAIN QUERY PLAN (most recent first)")
+            st.dataframe(pd.DataFrame(slow[::-1]).assign(plan=lambda d: d["plan"].str.join(" | ")), use_container_width=True)
+
+        st.download_button("Download report (JSON)", query_profiler.dump_report(), file_name="sql_profile.json")
+        if st.button("Reset profiler"):
+            query_profiler.STATS.reset()
+            st.rerun()
+
+    # Page phase timings across the app (admin only, when the app runs with APP_TRACE=1)
+    if role == "admin" and tracing_enabled():
+        st.subheader("⏱️ Page Timings")
+        st.caption("Phases of the recent page runs, slowest p95 first")
+        st.dataframe(phase_summary(), use_container_width=True)
+
+    # Inject custom CSS for purple gradient background
+    page_bg_css = """
 <style>
 [data-testid="stAppViewContainer"] {
     background: linear-gradient(135deg, #4B0082, #8A2BE2, #DA70D6);
@@ -57,5 +123,4 @@ page_bg_css = """
 </style>
 """
 
-st.markdown(page_bg_css, unsafe_allow_html=True)
-
+    st.markdown(page_bg_css, unsafe_allow_html=True)
@@ -1,191 +1,330 @@
+import time
+import uuid
 import streamlit as st
 from app.services.session_service import validate_session, delete_session
-from app.data.db import connect_database
-from app.data.incidents import get_all_incidents, insert_incident
-
-# ---------------- SECURITY CHECK ----------------
-st.session_state.setdefault("logged_in", False)
-st.session_state.setdefault("username", "")
-st.session_state.setdefault("role", "")
-st.session_state.setdefault("token", "")
-
-if not st.session_state["logged_in"] or not validate_session(st.session_state["token"]):
-    st.error("Session expired or unauthorized.")
-    st.session_state.clear()
-    st.switch_page("main.py")
-    st.stop()
-
-if st.session_state["role"] not in ["admin", "cybersecurity"]:
-    st.error("⛔ Access denied. You do not have permission to view this page.")
-    st.stop()
-
-# ---------------- HEADER + LOGOUT ----------------
-st.write(f"👤 Logged in as **{st.session_state['username']}** (role: {st.session_state['role']})")
-
-if st.button("🚪 Logout"):
-    delete_session(st.session_state["token"])
-    st.session_state.clear()
-    st.success("✅ You have been logged out.")
-    st.rerun()
-
-# ---------------- PAGE CONTENT ----------------
-st.title("🔐 Cybersecurity Dashboard")
-
-conn = connect_database()
-df = get_all_incidents(conn)
-
-import pandas as pd
-# ✅ Handle mixed timestamp formats and display only date + hour:minute
-df["timestamp"] = pd.to_datetime(df["timestamp"], format="mixed", errors="coerce").dt.strftime("%Y-%m-%d %H:%M")
-
-st.dataframe(df, use_container_width=True)
-
-# ---------------- ADD NEW INCIDENT FORM ----------------
-st.subheader("➕ Add New Incident")
-with st.form("new_incident"):
-    incident_id = st.number_input("Incident ID", min_value=1, step=1)
-
-    date = st.date_input("Date")
-    hour = st.selectbox("Hour", [f"{h:02d}" for h in range(0, 24)], index=12)
-    timestamp = f"{date} {hour}:00"
-
-    severity = st.selectbox("Severity", ["Low", "Medium", "High", "Critical"])
-    category = st.selectbox("Category", ["malware", "misconfiguration", "phishing", "unauthorized access", "ddos"])
-    status = st.selectbox("Status", ["Open", "In Progress", "Resolved"])
-    description = st.text_area("Description")
-    submitted = st.form_submit_button("Add Incident")
-
-    if submitted and incident_id:
-        cursor = conn.cursor()
-        cursor.execute("SELECT 1 FROM cyber_incidents WHERE incident_id = ?", (incident_id,))
-        if cursor.fetchone():
-            st.error(f"⚠️ Incident ID {incident_id} already exists. Please choose another ID.")
-        else:
-            insert_incident(conn, incident_id, timestamp, severity, category, status, description)
-            st.success("Incident added successfully!")
-            st.rerun()
-
-# ---------------- IMPORT CSV TO DATABASE ----------------
-st.subheader("Import CSV to Database")
-
-uploaded_file = st.file_uploader("Upload a CSV file", type=["csv"], accept_multiple_files=False)
-
-if uploaded_file:
-    try:
-        import pandas as pd
-        df_uploaded = pd.read_csv(uploaded_file)
-
-        expected_columns = {"incident_id", "timestamp", "severity", "category", "status", "description"}
-
-        if not expected_columns.issubset(df_uploaded.columns):
-            st.error(f"Invalid CSV format. Required columns: {expected_columns}")
-        else:
-            inserted_count = 0
-            for _, row in df_uploaded.iterrows():
-                try:
-                    cursor = conn.cursor()
-                    cursor.execute("SELECT 1 FROM cyber_incidents WHERE incident_id = ?", (int(row["incident_id"]),))
-                    if cursor.fetchone():
-                        st.warning(f"Row skipped: Incident ID {row['incident_id']} already exists.")
-                        continue
-
-                    insert_incident(
-                        conn,
-                        int(row["incident_id"]),
-                        str(row["timestamp"]),
-                        str(row["severity"]),
-                        str(row["category"]),
-                        str(row["status"]),
-                        str(row["description"])
-                    )
-                    inserted_count += 1
-                except Exception as e:
-                    st.warning(f"Row skipped due to error: {e}")
-            st.success(f"{inserted_count} incidents imported successfully.")
-            st.rerun()
-    except Exception as e:
-        st.error(f"Failed to read CSV file: {e}")
-
-  # AI CHAT BOX
+from app.data.db import read_snapshot
+from app.data.incidents import get_incident_clusters_page, get_incidents_page, insert_incident_if_new, delete_incident, get_incident_alerts
+from app.data.write_queue import run_write, submit_write, wait_write
+from app.data.metrics import CSV_IMPORT_ROWS, CSV_IMPORT_SECONDS
+from app.data.search import search_incidents
+from app.data.summaries import get_summary_counts, get_total_count
+from app.data.timeseries import get_time_series, downsample_series
+from app.services.anomaly_service import request_anomaly_detection
+from app.services.tracing_service import (
+    is_enabled as tracing_enabled,
+    last_trace,
+    page_trace,
+    phase_summary,
+    span,
+)
+
+# Every rerun of this page is one trace, finished however the run ends; its phases
+# are nested spans (APP_TRACE=1). The session key identifies this browser session
+# across reruns (trace, read snapshot).
+session_key = st.session_state.setdefault("session_key", uuid.uuid4().hex)
+with page_trace("cybersecurity", session_key):
+    # ---------------- SECURITY CHECK ----------------
+    st.session_state.setdefault("logged_in", False)
+    st.session_state.setdefault("username", "")
+    st.session_state.setdefault("role", "")
+    st.session_state.setdefault("token", "")
+
+    with span("auth"):
+        if not st.session_state["logged_in"] or not validate_session(st.session_state["token"]):
+            st.error("Session expired or unauthorized.")
+            st.session_state.clear()
+            st.switch_page("main.py")
+            st.stop()
+
+    if st.session_state["role"] not in ["admin", "cybersecurity"]:
+        st.error("⛔ Access denied. You do not have permission to view this page.")
+        st.stop()
+
+    # ---------------- HEADER + LOGOUT ----------------
+    st.write(f"👤 Logged in as **{st.session_state['username']}** (role: {st.session_state['role']})")
+
+    if st.button("🚪 Logout"):
+        delete_session(st.session_state["token"])
+        st.session_state.clear()
+        st.success("✅ You have been logged out.")
+        st.rerun()
 
-import streamlit as st
-import google.generativeai as genai
+    # ---------------- PAGE CONTENT ----------------
+    st.title("🔐 Cybersecurity Dashboard")
+
+    # Every read of this rerun goes through one read-only snapshot: consistent figures,
+    # and never blocked by an import or the writer thread (WAL). Writes go to the write queue.
+    # The snapshot is keyed by session and ended however the rerun exits (st.rerun, errors).
+    with read_snapshot(session_key) as conn:
+        # ---------------- KEY FIGURES ----------------
+        # Read from the summary tables (a few rows) instead of counting the incidents table
+        with span("kpis"):
+            severity_counts = get_summary_counts(conn, "incidents", "severity")
+            status_counts = get_summary_counts(conn, "incidents", "status")
+            kpi1, kpi2, kpi3 = st.columns(3)
+            kpi1.metric("Total incidents", get_total_count(conn, "incidents"))
+            kpi2.metric("Open incidents", int(status_counts.get("Open", 0) + status_counts.get("In Progress", 0)))
+            kpi3.metric("Critical incidents", int(severity_counts.get("Critical", 0)))
+
+            chart1, chart2 = st.columns(2)
+            chart1.caption("Incidents by severity")
+            chart1.bar_chart(severity_counts)
+            chart2.caption("Incidents by category")
+            chart2.bar_chart(get_summary_counts(conn, "incidents", "category"))
+
+        # ---------------- SPIKE ALERTS ----------------
+        # Precomputed by the anomaly detection job (app/services/anomaly_service.py)
+        with span("alerts"):
+            alerts_df = get_incident_alerts(conn, limit=20)
+            if not alerts_df.empty:
+                st.subheader("🚨 Incident Spikes")
+                st.dataframe(alerts_df, use_container_width=True)
+
+        # ---------------- INCIDENT TREND ----------------
+        st.subheader("📈 Incident Trend")
+        trend1, trend2, trend3 = st.columns(3)
+        trend_bucket = trend1.selectbox("Bucket", ["day", "week", "hour"], key="incident_trend_bucket")
+        trend_dimension = trend2.selectbox("Break down by", ["(none)", "severity", "category", "status"], key="incident_trend_dimension")
+        trend_range = trend3.date_input("Date range", value=[], key="incident_trend_range")
+
+        with span("trend", bucket=trend_bucket):
+            trend_start, trend_end = (trend_range[0], trend_range[1]) if len(trend_range) == 2 else (None, None)
+            incident_trend = get_time_series(
+                conn, "incidents", trend_bucket,
+                dimension=None if trend_dimension == "(none)" else trend_dimension,
+                start=trend_start, end=trend_end
+            )
+            if incident_trend.empty:
+                st.info("No incidents in this period.")
+            else:
+                # Years of hourly buckets are reduced to a few thousand points before charting
+                st.line_chart(downsample_series(incident_trend))
+
+        # One page of incidents at a time, read in timestamp-index order (newest first)
+        INCIDENTS_PAGE_SIZE = 50
+        # Near-duplicate reports share a cluster_id: optionally show one row per cluster,
+        # paged over the clusters in SQL so sizes and pages cover the whole table
+        collapse = st.toggle("Collapse near-duplicate incidents", value=True)
+        incidents_page = st.number_input("Page", min_value=1, value=1, step=1, key="incidents_page")
+        with span("incidents.load", page=incidents_page):
+            if collapse:
+                df, total_incidents = get_incident_clusters_page(conn, page=incidents_page, page_size=INCIDENTS_PAGE_SIZE)
+                unit = "clusters"
+            else:
+                df, total_incidents = get_incidents_page(conn, page=incidents_page, page_size=INCIDENTS_PAGE_SIZE)
+                unit = "incidents"
+        st.caption(f"{total_incidents} {unit}, page {incidents_page} of {max(1, -(-total_incidents // INCIDENTS_PAGE_SIZE))}")
 
-# Configure Gemini with your API key stored securely in Streamlit secrets.toml
-genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
+        import pandas as pd
+        with span("incidents.transform", rows=len(df)):
+            # ✅ Handle mixed timestamp formats and display only date + hour:minute
+            df["timestamp"] = pd.to_datetime(df["timestamp"], format="mixed", errors="coerce").dt.strftime("%Y-%m-%d %H:%M")
+
+        with span("incidents.render", rows=len(df)):
+            st.dataframe(df, use_container_width=True)
+
+        # ---------------- SEARCH INCIDENTS ----------------
+        # Full-text search (FTS5 index) over incident descriptions, best matches first
+        st.subheader("🔎 Search Incidents")
+        search_col, page_col = st.columns([4, 1])
+        incident_query = search_col.text_input("Keywords", key="incident_search")
+        incident_page = page_col.number_input("Page", min_value=1, step=1, key="incident_search_page")
+
+        with span("search"):
+            if incident_query:
+                results, total = search_incidents(conn, incident_query, page=incident_page, page_size=20)
+                st.caption(f"{total} matching incidents")
+                st.dataframe(results, use_container_width=True)
+
+        # ---------------- ADD NEW INCIDENT FORM ----------------
+        st.subheader("➕ Add New Incident")
+        with st.form("new_incident"):
+            incident_id = st.number_input("Incident ID", min_value=1, step=1)
+
+            date = st.date_input("Date")
+            hour = st.selectbox("Hour", [f"{h:02d}" for h in range(0, 24)], index=12)
+            timestamp = f"{date} {hour}:00"
+
+            severity = st.selectbox("Severity", ["Low", "Medium", "High", "Critical"])
+            category = st.selectbox("Category", ["malware", "misconfiguration", "phishing", "unauthorized access", "ddos"])
+            status = st.selectbox("Status", ["Open", "In Progress", "Resolved"])
+            description = st.text_area("Description")
+            submitted = st.form_submit_button("Add Incident")
+
+            if submitted and incident_id:
+                # Existence check and insert run together on the writer thread
+                if run_write(insert_incident_if_new, incident_id, timestamp, severity, category, status, description,
+                             created_by=st.session_state["username"]) is None:
+                    st.error(f"⚠️ Incident ID {incident_id} already exists. Please choose another ID.")
+                else:
+                    request_anomaly_detection()
+                    st.success("Incident added successfully!")
+                    st.rerun()
+
+        # ---------------- IMPORT CSV TO DATABASE ----------------
+        st.subheader("Import CSV to Database")
+
+        uploaded_file = st.file_uploader("Upload a CSV file", type=["csv"], accept_multiple_files=False)
+
+        if uploaded_file:
+            try:
+                import pandas as pd
+                df_uploaded = pd.read_csv(uploaded_file)
+
+                expected_columns = {"incident_id", "timestamp", "severity", "category", "status", "description"}
+
+                if not expected_columns.issubset(df_uploaded.columns):
+                    st.error(f"Invalid CSV format. Required columns: {expected_columns}")
+                else:
+                    import_started = time.perf_counter()
+                    inserted_count = 0
+                    # Every row is queued first, then the writer thread commits them in batches
+                    pending = []
+                    for _, row in df_uploaded.iterrows():
+                        try:
+                            pending.append((row["incident_id"], submit_write(
+                                insert_incident_if_new,
+                                int(row["incident_id"]),
+                                str(row["timestamp"]),
+                                str(row["severity"]),
+                                str(row["category"]),
+                                str(row["status"]),
+                                str(row["description"]),
+                                created_by=st.session_state["username"]
+                            )))
+                        except Exception as e:
+                            st.warning(f"Row skipped due to error: {e}")
+                    for row_incident_id, future in pending:
+                        try:
+                            if wait_write(future) is None:
+                                st.warning(f"Row skipped: Incident ID {row_incident_id} already exists.")
+                                continue
+                            inserted_count += 1
+                        except Exception as e:
+                            st.warning(f"Row skipped due to error: {e}")
+                    CSV_IMPORT_SECONDS.labels(table="cyber_incidents", source="upload").observe(time.perf_counter() - import_started)
+                    CSV_IMPORT_ROWS.labels(table="cyber_incidents", source="upload", result="inserted").inc(inserted_count)
+                    CSV_IMPORT_ROWS.labels(table="cyber_incidents", source="upload", result="skipped").inc(len(df_uploaded) - inserted_count)
+                    if inserted_count:
+                        request_anomaly_detection()
+                    st.success(f"{inserted_count} incidents imported successfully.")
+                    st.rerun()
+            except Exception as e:
+                st.error(f"Failed to read CSV file: {e}")
+
+          # AI CHAT BOX
+
+        import streamlit as st
+        import google.generativeai as genai
+        from app.services.retrieval_service import build_grounded_prompt
+        from app.services.llm_service import generate_reply
+        from app.data.chat_history import (
+            CHAT_WINDOW,
+            append_messages,
+            clear_chat_history,
+            count_messages,
+            get_recent_messages,
+            to_gemini_contents,
+        )
 
-# Initialize the Gemini model (fast/free version)
-model = genai.GenerativeModel("models/gemini-2.5-flash")
+        with span("llm.setup"):
+            # Configure Gemini with your API key stored securely in Streamlit secrets.toml
+            genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
 
-st.subheader("Gemini Cybersecurity Assistant")
+            # Initialize the Gemini model (fast/free version)
+            model = genai.GenerativeModel("models/gemini-2.5-flash")
 
-# Initialize chat history in session state if not already present
-if "messages" not in st.session_state:
-    st.session_state.messages = []
+        st.subheader("Gemini Cybersecurity Assistant")
 
-# Display all previous messages in the chat interface
-for message in st.session_state.messages:
-    role = "assistant" if message["role"] == "model" else message["role"]
-    with st.chat_message(role):
-        st.markdown(message["parts"][0]["text"])
+        # Chat history is stored per user and per domain page in SQLite.
+        # Only the most recent window is loaded and rendered; "Load older" widens it.
+        chat_user = st.session_state["username"]
+        chat_domain = "cybersecurity"
+        window_key = f"chat_window_{chat_domain}"
+        st.session_state.setdefault(window_key, CHAT_WINDOW)
 
-# Sidebar with controls
-with st.sidebar:
-    st.title("💬 Chat Controls")
-    message_count = len(st.session_state.get("messages", []))
-    st.metric("Messages", message_count)
+        with span("chat.history"):
+            messages = get_recent_messages(conn, chat_user, chat_domain, st.session_state[window_key])
+            message_count = count_messages(conn, chat_user, chat_domain)
 
-    #  Clear Chat button
-    if st.button("🗑️ Clear Chat", use_container_width=True):
-        st.session_state.messages = []
-        st.rerun()
+        # Offer to page back through older messages when the window does not show them all
+        if message_count > len(messages):
+            if st.button("⬆️ Load older messages"):
+                st.session_state[window_key] += CHAT_WINDOW
+                st.rerun()
 
-# Input box for the user to type a new question
-prompt = st.chat_input("Pose ta question...")
-
-if prompt:
-    # Save the user message into session state
-    st.session_state.messages.append({
-        "role": "user",
-        "parts": [{"text": prompt}]
-    })
-
-    try:
-        # Send the full conversation history to Gemini for response generation
-        response = model.generate_content(
-            contents=st.session_state.messages,
-            generation_config=genai.types.GenerationConfig(
-                temperature=0.7,        # Controls creativity (higher = more creative)
-                max_output_tokens=512   # Limits the length of the response
-            )
-        )
+        # Display the messages of the current window in the chat interface
+        for message in messages:
+            role = "assistant" if message["role"] == "model" else message["role"]
+            with st.chat_message(role):
+                st.markdown(message["text"])
+
+        # Sidebar with controls
+        with st.sidebar:
+            st.title("💬 Chat Controls")
+            st.metric("Messages", message_count)
+
+            #  Clear Chat button
+            if st.button("🗑️ Clear Chat", use_container_width=True):
+                run_write(clear_chat_history, chat_user, chat_domain)
+                st.session_state[window_key] = CHAT_WINDOW
+                st.rerun()
 
-        # Extract the text reply from Gemini's response object
-        reply = response.text
+        # Input box for the user to type a new question
+        prompt = st.chat_input("Pose ta question...")
+
+        if prompt:
+            # Show the question right away, it is saved together with the reply
+            with st.chat_message("user"):
+                st.markdown(prompt)
+
+            try:
+                # Ground the latest question in our own records: only the most relevant
+                # rows are packed into the prompt, the stored history keeps the raw question
+                with span("llm.retrieval"):
+                    grounded_prompt = build_grounded_prompt(conn, prompt, domain=chat_domain)
+
+                # Only the last CHAT_WINDOW messages are sent as context, however far back
+                # the user paged in the rendered history
+                contents = to_gemini_contents(messages[-CHAT_WINDOW:]) + [{
+                    "role": "user",
+                    "parts": [{"text": grounded_prompt}]
+                }]
+
+                # Send the conversation history to Gemini for response generation
+                # (latency, tokens and errors are recorded in the telemetry table)
+                with span("llm.generate"):
+                    reply = generate_reply(
+                        model,
+                        contents,
+                        genai.types.GenerationConfig(
+                            temperature=0.7,        # Controls creativity (higher = more creative)
+                            max_output_tokens=512   # Limits the length of the response
+                        ),
+                        chat_user,
+                        chat_domain
+                    )
 
-        # Display Gemini's reply in the chat interface
-        with st.chat_message("assistant"):
-            st.markdown(reply)
+                # Display Gemini's reply in the chat interface
+                with st.chat_message("assistant"):
+                    st.markdown(reply)
 
-        # Save Gemini's reply into session state for future context
-        st.session_state.messages.append({
-            "role": "model",
-            "parts": [{"text": reply}]
-        })
+                # Append the question and the reply to the stored history in one batch
+                run_write(append_messages, chat_user, chat_domain, [("user", prompt), ("model", reply)])
 
-        # Rerun the app to refresh the chat interface with the new message
-        st.rerun()
+                # Rerun the app to refresh the chat interface with the new message
+                st.rerun()
 
-    except Exception as e:
-        # Display any error that occurs during the API call
-        st.error(f"Erreur Gemini: {e}")
+            except Exception as e:
+                # Display any error that occurs during the API call
+                st.error(f"Erreur Gemini: {e}")
 
-# Inject custom CSS for purple gradient background
-# References:
-# - Streamlit Docs – Colors and borders customization
-# - YouTube – Custom Streamlit Background Image/Color Gradient through CSS
-# - GitHub – streamlit-css-styling-demo
-page_bg_css = """
+        # Inject custom CSS for purple gradient background
+        # References:
+        # - Streamlit Docs – Colors and borders customization
+        # - YouTube – Custom Streamlit Background Image/Color Gradient through CSS
+        # - GitHub – streamlit-css-styling-demo
+        page_bg_css = """
 <style>
 [data-testid="stAppViewContainer"] {
     background: linear-gradient(135deg, #4B0082, #8A2BE2, #DA70D6);
@@ -199,38 +338,33 @@ page_bg_css = """
 }
 </style>
 """
-st.markdown(page_bg_css, unsafe_allow_html=True)
-
-import sqlite3
+        st.markdown(page_bg_css, unsafe_allow_html=True)
 
-#  DELETE INCIDENT BY ID
-st.subheader("Delete Incident by ID")
-
-with st.form("delete_incident"):
-    delete_id = st.number_input("Enter Incident ID to delete", min_value=1, step=1)
-    confirm_delete = st.form_submit_button("Delete Incident")
-
-    if confirm_delete:
-        cursor = conn.cursor()
-        try:
-            cursor.execute(
-                "SELECT 1 FROM cyber_incidents WHERE incident_id = ? AND created_by = ?",
-                (delete_id, st.session_state["username"])
-            )
-            if cursor.fetchone():
-                cursor.execute(
-                    "DELETE FROM cyber_incidents WHERE incident_id = ? AND created_by = ?",
-                    (delete_id, st.session_state["username"])
-                )
-                conn.commit()
-                st.success(f"Incident ID {delete_id} has been deleted.")
-                st.rerun()
-            else:
-                st.error(" You can’t delete this incident.")
-        except sqlite3.OperationalError:
-            st.error(" You can’t delete this incident.")
-
-conn.close()
+        import sqlite3
 
+        #  DELETE INCIDENT BY ID
+        st.subheader("Delete Incident by ID")
 
+        with st.form("delete_incident"):
+            delete_id = st.number_input("Enter Incident ID to delete", min_value=1, step=1)
+            confirm_delete = st.form_submit_button("Delete Incident")
 
+            if confirm_delete:
+                try:
+                    # Only the analyst who added the incident can delete it
+                    if run_write(delete_incident, delete_id, st.session_state["username"]):
+                        request_anomaly_detection()
+                        st.success(f"Incident ID {delete_id} has been deleted.")
+                        st.rerun()
+                    else:
+                        st.error(" You can’t delete this incident.")
+                except sqlite3.Error:
+                    st.error(" You can’t delete this incident.")
+
+    # ---------------- PAGE TIMINGS (ADMIN) ----------------
+    # Slowest phases of the recent runs of this page, from the tracing spans
+    if st.session_state.get("role") == "admin" and tracing_enabled():
+        with st.sidebar.expander("⏱️ Page timings"):
+            st.dataframe(phase_summary("cybersecurity"), use_container_width=True)
+            st.caption("Last run")
+            st.dataframe(last_trace("cybersecurity"), use_container_width=True)
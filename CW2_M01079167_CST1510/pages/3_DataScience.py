@@ -1,175 +1,310 @@
+import time
+import uuid
 import streamlit as st
+import pandas as pd
 from app.services.session_service import validate_session, delete_session
-from app.data.db import connect_database
+from app.data.db import read_snapshot
+from app.data.write_queue import run_write, submit_write, wait_write
 from app.data.datasets import get_all_datasets, insert_dataset
-
-# ---------------- SECURITY CHECK ----------------
-# Initialize session state variables with default values if not already set
-st.session_state.setdefault("logged_in", False)
-st.session_state.setdefault("username", "")
-st.session_state.setdefault("role", "")
-st.session_state.setdefault("token", "")
-
-# Verify if the user is logged in and the session token is valid
-if not st.session_state["logged_in"] or not validate_session(st.session_state["token"]):
-    st.error("Session expired or unauthorized.")  # Show error message
-    st.session_state.clear()  # Clear all session state values
-    st.switch_page("main.py")  # Redirect to login/main page
-    st.stop()  # Stop execution of the current page
-
-# Role-based access control: only admin or datascience roles can view this page
-if st.session_state["role"] not in ["admin", "datascience"]:
-    st.error("Access denied. You do not have permission to view this page.")
-    st.stop()
-
-# ---------------- HEADER + LOGOUT ----------------
-# Display logged-in user information
-st.write(f"Logged in as **{st.session_state['username']}** (role: {st.session_state['role']})")
-
-# Logout button: deletes session, clears state, and refreshes the app
-if st.button("Logout"):
-    delete_session(st.session_state["token"])  # Remove session from DB
-    st.session_state.clear()  # Clear session state
-    st.success("You have been logged out.")  # Confirmation message
-    st.rerun()  # Reload the app to reset state
-
-# ---------------- PAGE CONTENT ----------------
-# Data Science dashboard title
-st.title("Data Science Dashboard")
-
-# Connect to database and display all datasets in a table
-conn = connect_database()
-df = get_all_datasets(conn)
-st.dataframe(df, use_container_width=True)
-
-# Section: Import CSV to populate the datasets table
-st.subheader("Import CSV to Database")
-
-# File uploader restricted to CSV files only
-uploaded_file = st.file_uploader("Upload a CSV file", type=["csv"], accept_multiple_files=False)
-
-if uploaded_file:
-    try:
-        import pandas as pd
-
-        # Read the uploaded CSV file into a DataFrame
-        df_uploaded = pd.read_csv(uploaded_file)
-
-        # Define the expected columns for the datasets table
-        expected_columns = {"dataset_id", "name", "rows", "columns", "description"}
-
-        # Validate that the uploaded CSV contains all required columns
-        if not expected_columns.issubset(df_uploaded.columns):
-            st.error(f"Invalid CSV format. Required columns: {expected_columns}")
-        else:
-            # Insert each row into the database using the secure insert_dataset function
-            inserted_count = 0
-            for _, row in df_uploaded.iterrows():
+from app.data.metrics import CSV_IMPORT_ROWS, CSV_IMPORT_SECONDS
+from app.data.profiler import profile_and_store
+from app.data.dataset_store import dataset_path, store_dataset
+from app.services.preview_service import get_dataset_preview, histogram_frame
+from app.services.tracing_service import (
+    is_enabled as tracing_enabled,
+    last_trace,
+    page_trace,
+    phase_summary,
+    span,
+)
+
+# Every rerun of this page is one trace, finished however the run ends; its phases
+# are nested spans (APP_TRACE=1). The session key identifies this browser session
+# across reruns (trace, read snapshot).
+session_key = st.session_state.setdefault("session_key", uuid.uuid4().hex)
+with page_trace("datascience", session_key):
+    # ---------------- SECURITY CHECK ----------------
+    # Initialize session state variables with default values if not already set
+    st.session_state.setdefault("logged_in", False)
+    st.session_state.setdefault("username", "")
+    st.session_state.setdefault("role", "")
+    st.session_state.setdefault("token", "")
+
+    # Verify if the user is logged in and the session token is valid
+    with span("auth"):
+        if not st.session_state["logged_in"] or not validate_session(st.session_state["token"]):
+            st.error("Session expired or unauthorized.")  # Show error message
+            st.session_state.clear()  # Clear all session state values
+            st.switch_page("main.py")  # Redirect to login/main page
+            st.stop()  # Stop execution of the current page
+
+    # Role-based access control: only admin or datascience roles can view this page
+    if st.session_state["role"] not in ["admin", "datascience"]:
+        st.error("Access denied. You do not have permission to view this page.")
+        st.stop()
+
+    # ---------------- HEADER + LOGOUT ----------------
+    # Display logged-in user information
+    st.write(f"Logged in as **{st.session_state['username']}** (role: {st.session_state['role']})")
+
+    # Logout button: deletes session, clears state, and refreshes the app
+    if st.button("Logout"):
+        delete_session(st.session_state["token"])  # Remove session from DB
+        st.session_state.clear()  # Clear session state
+        st.success("You have been logged out.")  # Confirmation message
+        st.rerun()  # Reload the app to reset state
+
+    # ---------------- PAGE CONTENT ----------------
+    # Data Science dashboard title
+    st.title("Data Science Dashboard")
+
+    # Connect to database and display all datasets in a table
+    # Every read of this rerun goes through one read-only snapshot: consistent figures,
+    # and never blocked by an import or the writer thread (WAL). Writes go to the write queue.
+    # The snapshot is keyed by session and ended however the rerun exits (st.rerun, errors).
+    with read_snapshot(session_key) as conn:
+        with span("datasets.load"):
+            df = get_all_datasets(conn)
+        with span("datasets.render", rows=len(df)):
+            st.dataframe(df, use_container_width=True)
+
+        # Section: Import CSV to populate the datasets table
+        st.subheader("Import CSV to Database")
+
+        # File uploader restricted to CSV files only
+        uploaded_file = st.file_uploader("Upload a CSV file", type=["csv"], accept_multiple_files=False)
+
+        if uploaded_file:
+            try:
+                import pandas as pd
+
+                # Read the uploaded CSV file into a DataFrame
+                df_uploaded = pd.read_csv(uploaded_file)
+
+                # Define the expected columns for the datasets table
+                expected_columns = {"dataset_id", "name", "rows", "columns", "description"}
+
+                # Validate that the uploaded CSV contains all required columns
+                if not expected_columns.issubset(df_uploaded.columns):
+                    st.error(f"Invalid CSV format. Required columns: {expected_columns}")
+                else:
+                    # Insert each row into the database using the secure insert_dataset function
+                    import_started = time.perf_counter()
+                    inserted_count = 0
+                    # Every row is queued first, then the writer thread commits them in batches
+                    pending = []
+                    for _, row in df_uploaded.iterrows():
+                        try:
+                            pending.append(submit_write(
+                                insert_dataset,
+                                int(row["dataset_id"]),
+                                str(row["name"]),
+                                str(row["description"]),
+                                rows=int(row["rows"]),
+                                columns=int(row["columns"])
+                            ))
+                        except Exception as e:
+                            st.warning(f"Row skipped due to error: {e}")
+                    for future in pending:
+                        try:
+                            wait_write(future)
+                            inserted_count += 1
+                        except Exception as e:
+                            # Skip rows that cause errors during insertion
+                            st.warning(f"Row skipped due to error: {e}")
+                    CSV_IMPORT_SECONDS.labels(table="datasets_metadata", source="upload").observe(time.perf_counter() - import_started)
+                    CSV_IMPORT_ROWS.labels(table="datasets_metadata", source="upload", result="inserted").inc(inserted_count)
+                    CSV_IMPORT_ROWS.labels(table="datasets_metadata", source="upload", result="skipped").inc(len(df_uploaded) - inserted_count)
+                    st.success(f"{inserted_count} datasets imported successfully.")
+                    st.rerun()
+            except Exception as e:
+                # Handle errors during CSV reading
+                st.error(f"Failed to read CSV file: {e}")
+
+        # Section: register a dataset from its actual data file
+        # The file is streamed in chunks and profiled (rows, columns, types, nulls,
+        # distinct counts, min/max/mean); identical files are only profiled once.
+        st.subheader("Profile and Register a Dataset File")
+
+        with st.form("profile_dataset_form"):
+            data_file = st.file_uploader("Dataset file (CSV)", type=["csv"], key="dataset_file")
+            new_dataset_id = st.text_input("Dataset ID")
+            new_dataset_name = st.text_input("Name")
+            new_dataset_description = st.text_area("Description")
+            profile_submitted = st.form_submit_button("Profile and register")
+
+        if profile_submitted:
+            if not data_file or not new_dataset_id or not new_dataset_name:
+                st.error("A file, a dataset ID and a name are required.")
+            else:
                 try:
-                    insert_dataset(
-                        conn,
-                        int(row["dataset_id"]),
-                        str(row["name"]),
-                        int(row["rows"]),
-                        int(row["columns"]),
-                        str(row["description"])
+                    content_hash, profile, known = profile_and_store(conn, data_file)
+                    if known:
+                        st.info("This file was already profiled: stored statistics reused.")
+                    # Keep the file itself in the content-addressed store (no-op for a re-upload)
+                    store_dataset(data_file, content_hash)
+                    run_write(
+                        insert_dataset,
+                        new_dataset_id,
+                        new_dataset_name,
+                        new_dataset_description,
+                        rows=profile["rows"],
+                        columns=profile["columns"],
+                        size=profile["size"],
+                        content_hash=content_hash
                     )
-                    inserted_count += 1
+                    st.success(f"Dataset registered: {profile['rows']} rows, {profile['columns']} columns.")
+                    st.dataframe(pd.DataFrame(profile["column_profiles"]), use_container_width=True)
                 except Exception as e:
-                    # Skip rows that cause errors during insertion
-                    st.warning(f"Row skipped due to error: {e}")
-            st.success(f"{inserted_count} datasets imported successfully.")
-            st.rerun()
-    except Exception as e:
-        # Handle errors during CSV reading
-        st.error(f"Failed to read CSV file: {e}")
-
-# Visualize dataset size distribution using rows and columns
-st.subheader("Dataset Size Distribution (Line Graph)")
-if "rows" in df.columns and "columns" in df.columns:
-    st.line_chart(df[["rows", "columns"]])
-
-  # AI CHAT BOX
-
-import streamlit as st
-import google.generativeai as genai
-
-# Configure Gemini with your API key stored securely in Streamlit secrets.toml
-genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
-
-# Initialize the Gemini model (fast/free version)
-model = genai.GenerativeModel("models/gemini-2.5-flash")
-
-st.subheader("Gemini Cybersecurity Assistant")
-
-# Initialize chat history in session state if not already present
-if "messages" not in st.session_state:
-    st.session_state.messages = []
-
-# Display all previous messages in the chat interface
-for message in st.session_state.messages:
-    role = "assistant" if message["role"] == "model" else message["role"]
-    with st.chat_message(role):
-        st.markdown(message["parts"][0]["text"])
-
-# Sidebar with controls
-with st.sidebar:
-    st.title("💬 Chat Controls")
-    message_count = len(st.session_state.get("messages", []))
-    st.metric("Messages", message_count)
-
-    #  Clear Chat button
-    if st.button("🗑️ Clear Chat", use_container_width=True):
-        st.session_state.messages = []
-        st.rerun()
-
-# Input box for the user to type a new question
-prompt = st.chat_input("Pose ta question...")
-
-if prompt:
-    # Save the user message into session state
-    st.session_state.messages.append({
-        "role": "user",
-        "parts": [{"text": prompt}]
-    })
-
-    try:
-        # Send the full conversation history to Gemini for response generation
-        response = model.generate_content(
-            contents=st.session_state.messages,
-            generation_config=genai.types.GenerationConfig(
-                temperature=0.7,        # Controls creativity (higher = more creative)
-                max_output_tokens=512   # Limits the length of the response
-            )
+                    st.error(f"Failed to profile dataset: {e}")
+
+        # Section: look at the data of a stored dataset
+        # A uniform random sample is computed in one streaming pass over the stored
+        # file, and histograms only for the columns picked, all cached by content
+        # hash: only the sample is rendered, never the whole dataset.
+        stored = df[df["content_hash"].notna()] if "content_hash" in df.columns else df.iloc[0:0]
+        if not stored.empty:
+            st.subheader("Stored Dataset Preview")
+            preview_name = st.selectbox("Dataset", stored["name"].tolist(), key="preview_dataset")
+            preview_hash = stored.loc[stored["name"] == preview_name, "content_hash"].iloc[0]
+            if dataset_path(preview_hash) is None:
+                st.warning("The file of this dataset is not in the local store.")
+            else:
+                with st.spinner("Sampling dataset..."), span("preview.load"):
+                    sample, _, total_rows = get_dataset_preview(conn, preview_hash)
+                st.caption(f"Random sample of {len(sample)} rows out of {total_rows}")
+                st.dataframe(sample, use_container_width=True)
+
+                histogram_columns = st.multiselect("Column histograms", list(sample.columns), key="preview_histograms")
+                if histogram_columns:
+                    with st.spinner("Building histograms..."), span("preview.histograms"):
+                        _, histograms, _ = get_dataset_preview(conn, preview_hash, histogram_columns)
+                    for column in histogram_columns:
+                        st.write(f"**{column}**")
+                        st.bar_chart(histogram_frame(histograms[column]))
+                        if histograms[column].get("non_numeric"):
+                            st.caption(f"{histograms[column]['non_numeric']} values are not numbers")
+
+        # Visualize dataset size distribution using rows and columns, one bar per dataset
+        # (indexed by name rather than by the DataFrame row number)
+        st.subheader("Dataset Size Distribution")
+        if {"name", "rows", "columns"}.issubset(df.columns) and not df.empty:
+            st.bar_chart(df.set_index("name")[["rows", "columns"]])
+
+          # AI CHAT BOX
+
+        import streamlit as st
+        import google.generativeai as genai
+        from app.services.retrieval_service import build_grounded_prompt
+        from app.services.llm_service import generate_reply
+        from app.data.chat_history import (
+            CHAT_WINDOW,
+            append_messages,
+            clear_chat_history,
+            count_messages,
+            get_recent_messages,
+            to_gemini_contents,
         )
 
-        # Extract the text reply from Gemini's response object
-        reply = response.text
+        with span("llm.setup"):
+            # Configure Gemini with your API key stored securely in Streamlit secrets.toml
+            genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
+
+            # Initialize the Gemini model (fast/free version)
+            model = genai.GenerativeModel("models/gemini-2.5-flash")
+
+        st.subheader("Gemini Cybersecurity Assistant")
+
+        # Chat history is stored per user and per domain page in SQLite.
+        # Only the most recent window is loaded and rendered; "Load older" widens it.
+        chat_user = st.session_state["username"]
+        chat_domain = "datascience"
+        window_key = f"chat_window_{chat_domain}"
+        st.session_state.setdefault(window_key, CHAT_WINDOW)
+
+        with span("chat.history"):
+            messages = get_recent_messages(conn, chat_user, chat_domain, st.session_state[window_key])
+            message_count = count_messages(conn, chat_user, chat_domain)
+
+        # Offer to page back through older messages when the window does not show them all
+        if message_count > len(messages):
+            if st.button("⬆️ Load older messages"):
+                st.session_state[window_key] += CHAT_WINDOW
+                st.rerun()
+
+        # Display the messages of the current window in the chat interface
+        for message in messages:
+            role = "assistant" if message["role"] == "model" else message["role"]
+            with st.chat_message(role):
+                st.markdown(message["text"])
+
+        # Sidebar with controls
+        with st.sidebar:
+            st.title("💬 Chat Controls")
+            st.metric("Messages", message_count)
+
+            #  Clear Chat button
+            if st.button("🗑️ Clear Chat", use_container_width=True):
+                run_write(clear_chat_history, chat_user, chat_domain)
+                st.session_state[window_key] = CHAT_WINDOW
+                st.rerun()
+
+        # Input box for the user to type a new question
+        prompt = st.chat_input("Pose ta question...")
+
+        if prompt:
+            # Show the question right away, it is saved together with the reply
+            with st.chat_message("user"):
+                st.markdown(prompt)
+
+            try:
+                # Ground the latest question in our own records: only the most relevant
+                # rows are packed into the prompt, the stored history keeps the raw question
+                with span("llm.retrieval"):
+                    grounded_prompt = build_grounded_prompt(conn, prompt, domain=chat_domain)
+
+                # Only the last CHAT_WINDOW messages are sent as context, however far back
+                # the user paged in the rendered history
+                contents = to_gemini_contents(messages[-CHAT_WINDOW:]) + [{
+                    "role": "user",
+                    "parts": [{"text": grounded_prompt}]
+                }]
+
+                # Send the conversation history to Gemini for response generation
+                # (latency, tokens and errors are recorded in the telemetry table)
+                with span("llm.generate"):
+                    reply = generate_reply(
+                        model,
+                        contents,
+                        genai.types.GenerationConfig(
+                            temperature=0.7,        # Controls creativity (higher = more creative)
+                            max_output_tokens=512   # Limits the length of the response
+                        ),
+                        chat_user,
+                        chat_domain
+                    )
 
-        # Display Gemini's reply in the chat interface
-        with st.chat_message("assistant"):
-            st.markdown(reply)
+                # Display Gemini's reply in the chat interface
+                with st.chat_message("assistant"):
+                    st.markdown(reply)
 
-        # Save Gemini's reply into session state for future context
-        st.session_state.messages.append({
-            "role": "model",
-            "parts": [{"text": reply}]
-        })
+                # Append the question and the reply to the stored history in one batch
+                run_write(append_messages, chat_user, chat_domain, [("user", prompt), ("model", reply)])
 
-        # Rerun the app to refresh the chat interface with the new message
-        st.rerun()
+                # Rerun the app to refresh the chat interface with the new message
+                st.rerun()
 
-    except Exception as e:
-        # Display any error that occurs during the API call
-        st.error(f"Erreur Gemini: {e}")
+            except Exception as e:
+                # Display any error that occurs during the API call
+                st.error(f"Erreur Gemini: {e}")
 
 
-# Inject custom CSS for purple gradient background
-# References:
-# - Streamlit Docs – Colors and borders customization
-# - YouTube – Custom Streamlit Background Image/Color Gradient through CSS
-# - GitHub – streamlit-css-styling-demo
-page_bg_css = """
+        # Inject custom CSS for purple gradient background
+        # References:
+        # - Streamlit Docs – Colors and borders customization
+        # - YouTube – Custom Streamlit Background Image/Color Gradient through CSS
+        # - GitHub – streamlit-css-styling-demo
+        page_bg_css = """
 <style>
 [data-testid="stAppViewContainer"] {
     background: linear-gradient(135deg, #4B0082, #8A2BE2, #DA70D6);
@@ -183,8 +318,12 @@ page_bg_css = """
 }
 </style>
 """
-st.markdown(page_bg_css, unsafe_allow_html=True)
-
-# Close DB connection at the end
-conn.close()
-
+        st.markdown(page_bg_css, unsafe_allow_html=True)
+
+    # ---------------- PAGE TIMINGS (ADMIN) ----------------
+    # Slowest phases of the recent runs of this page, from the tracing spans
+    if st.session_state.get("role") == "admin" and tracing_enabled():
+        with st.sidebar.expander("⏱️ Page timings"):
+            st.dataframe(phase_summary("datascience"), use_container_width=True)
+            st.caption("Last run")
+            st.dataframe(last_trace("datascience"), use_container_width=True)
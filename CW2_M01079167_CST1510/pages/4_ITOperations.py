@@ -1,177 +1,317 @@
+import time
+import uuid
 import streamlit as st
 from app.services.session_service import validate_session, delete_session
-from app.data.db import connect_database
-from app.data.tickets import get_all_tickets, insert_ticket
+from app.data.db import read_snapshot
+from app.data.tickets import get_tickets_page
+from app.data.write_queue import run_write, submit_write, wait_write
+from app.data.metrics import CSV_IMPORT_ROWS, CSV_IMPORT_SECONDS
+from app.data.search import search_tickets
+from app.services.recommender_service import recommend_similar_tickets
+from app.data.summaries import get_summary_counts
+from app.data.timeseries import get_time_series, downsample_series
+from app.data.sla import get_resolution_quantiles
+from app.services.routing_service import insert_routed_ticket, rebalance_open_tickets
 import plotly.express as px
 import pandas as pd
-
-# ---------------- SECURITY CHECK ----------------
-st.session_state.setdefault("logged_in", False)
-st.session_state.setdefault("username", "")
-st.session_state.setdefault("role", "")
-st.session_state.setdefault("token", "")
-
-if not st.session_state["logged_in"] or not validate_session(st.session_state["token"]):
-    st.error("Session expired or unauthorized.")
-    st.session_state.clear()
-    st.switch_page("main.py")
-    st.stop()
-
-if st.session_state["role"] not in ["admin", "itoperation"]:
-    st.error("Access denied. You do not have permission to view this page.")
-    st.stop()
-
-# ---------------- HEADER + LOGOUT ----------------
-st.write(f"Logged in as **{st.session_state['username']}** (role: {st.session_state['role']})")
-
-if st.button("Logout"):
-    delete_session(st.session_state["token"])
-    st.session_state.clear()
-    st.success("You have been logged out.")
-    st.rerun()
-
-# ---------------- PAGE CONTENT ----------------
-st.title("IT Operations Dashboard")
-
-conn = connect_database()
-df = get_all_tickets(conn)
-
-st.subheader("All Tickets")
-st.dataframe(df, use_container_width=True)
-
-# ---------------- CSV IMPORT ----------------
-st.subheader("Import CSV to Database")
-
-uploaded_file = st.file_uploader("Upload a CSV file", type=["csv"], accept_multiple_files=False)
-
-if uploaded_file:
-    try:
-        df_uploaded = pd.read_csv(uploaded_file)
-
-        # Expected columns for tickets table
-        expected_columns = {"ticket_id", "title", "status", "priority", "assigned_to", "description"}
-        if not expected_columns.issubset(df_uploaded.columns):
-            st.error(f"Invalid CSV format. Required columns: {expected_columns}")
-        else:
-            inserted_count = 0
-            for _, row in df_uploaded.iterrows():
-                try:
-                    insert_ticket(
-                        conn,
-                        int(row["ticket_id"]),
-                        str(row["title"]),
-                        str(row["status"]),
-                        str(row["priority"]),
-                        str(row["assigned_to"]),
-                        str(row["description"])
-                    )
-                    inserted_count += 1
-                except Exception as e:
-                    st.warning(f"Row skipped due to error: {e}")
-            st.success(f"{inserted_count} tickets imported successfully.")
-            st.rerun()
-    except Exception as e:
-        st.error(f"Failed to read CSV file: {e}")
-
-# ---------------- VISUALIZATIONS ----------------
-st.subheader("Ticket Status Distribution (Line Graph)")
-if "status" in df.columns:
-    status_counts = df["status"].value_counts()
-    st.line_chart(status_counts)
-
-st.subheader("Ticket Priority Distribution (Line Graph)")
-if "priority" in df.columns:
-    priority_counts = df["priority"].value_counts()
-    st.line_chart(priority_counts)
-
-st.subheader("Tickets Assigned per Employee")
-if "assigned_to" in df.columns:
-    assigned_counts = df["assigned_to"].value_counts()
-    fig = px.pie(
-        names=assigned_counts.index,
-        values=assigned_counts.values,
-        title="Ticket Distribution by Employee"
-    )
-    st.plotly_chart(fig, use_container_width=True)
-    # AI CHAT BOX
-import streamlit as st
-import google.generativeai as genai
-
-# Configure Gemini with your API key stored securely in Streamlit secrets.toml
-genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
-
-# Initialize the Gemini model (fast/free version)
-model = genai.GenerativeModel("models/gemini-2.5-flash")
-
-st.subheader("Gemini Cybersecurity Assistant")
-
-# Initialize chat history in session state if not already present
-if "messages" not in st.session_state:
-    st.session_state.messages = []
-
-# Display all previous messages in the chat interface
-for message in st.session_state.messages:
-    role = "assistant" if message["role"] == "model" else message["role"]
-    with st.chat_message(role):
-        st.markdown(message["parts"][0]["text"])
-
-# Sidebar with controls
-with st.sidebar:
-    st.title("💬 Chat Controls")
-    message_count = len(st.session_state.get("messages", []))
-    st.metric("Messages", message_count)
-
-    #  Clear Chat button
-    if st.button("🗑️ Clear Chat", use_container_width=True):
-        st.session_state.messages = []
+from app.services.tracing_service import (
+    is_enabled as tracing_enabled,
+    last_trace,
+    page_trace,
+    phase_summary,
+    span,
+)
+
+# Every rerun of this page is one trace, finished however the run ends; its phases
+# are nested spans (APP_TRACE=1). The session key identifies this browser session
+# across reruns (trace, read snapshot).
+session_key = st.session_state.setdefault("session_key", uuid.uuid4().hex)
+with page_trace("itoperations", session_key):
+    # ---------------- SECURITY CHECK ----------------
+    st.session_state.setdefault("logged_in", False)
+    st.session_state.setdefault("username", "")
+    st.session_state.setdefault("role", "")
+    st.session_state.setdefault("token", "")
+
+    with span("auth"):
+        if not st.session_state["logged_in"] or not validate_session(st.session_state["token"]):
+            st.error("Session expired or unauthorized.")
+            st.session_state.clear()
+            st.switch_page("main.py")
+            st.stop()
+
+    if st.session_state["role"] not in ["admin", "itoperation"]:
+        st.error("Access denied. You do not have permission to view this page.")
+        st.stop()
+
+    # ---------------- HEADER + LOGOUT ----------------
+    st.write(f"Logged in as **{st.session_state['username']}** (role: {st.session_state['role']})")
+
+    if st.button("Logout"):
+        delete_session(st.session_state["token"])
+        st.session_state.clear()
+        st.success("You have been logged out.")
         st.rerun()
 
-# Input box for the user to type a new question
-prompt = st.chat_input("Pose ta question...")
-
-if prompt:
-    # Save the user message into session state
-    st.session_state.messages.append({
-        "role": "user",
-        "parts": [{"text": prompt}]
-    })
-
-    try:
-        # Send the full conversation history to Gemini for response generation
-        response = model.generate_content(
-            contents=st.session_state.messages,
-            generation_config=genai.types.GenerationConfig(
-                temperature=0.7,        # Controls creativity (higher = more creative)
-                max_output_tokens=512   # Limits the length of the response
+    # ---------------- PAGE CONTENT ----------------
+    st.title("IT Operations Dashboard")
+
+    # Every read of this rerun goes through one read-only snapshot: consistent figures,
+    # and never blocked by an import or the writer thread (WAL). Writes go to the write queue.
+    # The snapshot is keyed by session and ended however the rerun exits (st.rerun, errors).
+    with read_snapshot(session_key) as conn:
+        st.subheader("All Tickets")
+        # One page of tickets at a time, read in created_at-index order (newest first)
+        TICKETS_PAGE_SIZE = 50
+        tickets_page = st.number_input("Page", min_value=1, value=1, step=1, key="tickets_page")
+        with span("tickets.load", page=tickets_page):
+            df, total_tickets = get_tickets_page(conn, page=tickets_page, page_size=TICKETS_PAGE_SIZE)
+        st.caption(f"{total_tickets} tickets, page {tickets_page} of {max(1, -(-total_tickets // TICKETS_PAGE_SIZE))}")
+        with span("tickets.render", rows=len(df)):
+            st.dataframe(df, use_container_width=True)
+
+        # ---------------- SEARCH TICKETS ----------------
+        # Full-text search (FTS5 index) over ticket titles and descriptions, best matches first
+        st.subheader("Search Tickets")
+        search_col, page_col = st.columns([4, 1])
+        ticket_query = search_col.text_input("Keywords", key="ticket_search")
+        ticket_page = page_col.number_input("Page", min_value=1, step=1, key="ticket_search_page")
+
+        if ticket_query:
+            results, total = search_tickets(conn, ticket_query, page=ticket_page, page_size=20)
+            st.caption(f"{total} matching tickets")
+            st.dataframe(results, use_container_width=True)
+
+        # ---------------- SIMILAR RESOLVED TICKETS ----------------
+        # TF-IDF cosine similarity over past ticket titles/descriptions, resolved tickets only
+        st.subheader("Similar Resolved Tickets")
+        new_issue = st.text_area("Describe the new ticket", key="similar_ticket_text")
+
+        if new_issue:
+            with span("similar_tickets"):
+                similar = recommend_similar_tickets(conn, new_issue, k=5)
+            if similar.empty:
+                st.info("No similar resolved ticket found.")
+            else:
+                st.dataframe(similar, use_container_width=True)
+
+        # ---------------- CSV IMPORT ----------------
+        st.subheader("Import CSV to Database")
+
+        uploaded_file = st.file_uploader("Upload a CSV file", type=["csv"], accept_multiple_files=False)
+
+        if uploaded_file:
+            try:
+                df_uploaded = pd.read_csv(uploaded_file)
+
+                # Expected columns for tickets table (assigned_to is optional)
+                expected_columns = {"ticket_id", "title", "status", "priority", "description"}
+                if not expected_columns.issubset(df_uploaded.columns):
+                    st.error(f"Invalid CSV format. Required columns: {expected_columns}")
+                else:
+                    # Tickets without an assignee go to the least-loaded employee, when they are written
+                    if "assigned_to" not in df_uploaded.columns:
+                        df_uploaded["assigned_to"] = None
+                    unassigned = df_uploaded["assigned_to"].isna() | (df_uploaded["assigned_to"].astype(str).str.strip() == "")
+
+                    import_started = time.perf_counter()
+                    inserted_count = 0
+                    # Every row is queued first, then the writer thread commits them in batches
+                    pending = []
+                    for index, row in df_uploaded.iterrows():
+                        try:
+                            pending.append(submit_write(
+                                insert_routed_ticket,
+                                int(row["ticket_id"]),
+                                str(row["title"]),
+                                str(row["status"]),
+                                str(row["priority"]),
+                                None if unassigned[index] else str(row["assigned_to"]),
+                                str(row["description"]),
+                                str(row["created_at"])
+                                if "created_at" in df_uploaded.columns and pd.notna(row["created_at"])
+                                else None,
+                                float(row["resolution_time_hours"])
+                                if "resolution_time_hours" in df_uploaded.columns and pd.notna(row["resolution_time_hours"])
+                                else None
+                            ))
+                        except Exception as e:
+                            st.warning(f"Row skipped due to error: {e}")
+                    for future in pending:
+                        try:
+                            wait_write(future)
+                            inserted_count += 1
+                        except Exception as e:
+                            st.warning(f"Row skipped due to error: {e}")
+                    CSV_IMPORT_SECONDS.labels(table="it_tickets", source="upload").observe(time.perf_counter() - import_started)
+                    CSV_IMPORT_ROWS.labels(table="it_tickets", source="upload", result="inserted").inc(inserted_count)
+                    CSV_IMPORT_ROWS.labels(table="it_tickets", source="upload", result="skipped").inc(len(df_uploaded) - inserted_count)
+                    st.success(f"{inserted_count} tickets imported successfully.")
+                    st.rerun()
+            except Exception as e:
+                st.error(f"Failed to read CSV file: {e}")
+
+        # ---------------- VISUALIZATIONS ----------------
+        st.subheader("Ticket Trend")
+        trend_bucket = st.selectbox("Bucket", ["day", "week", "hour"], key="ticket_trend_bucket")
+        trend_dimension = st.selectbox("Break down by", ["(none)", "status", "priority", "assigned_to"], key="ticket_trend_dimension")
+        ticket_trend = get_time_series(
+            conn, "tickets", trend_bucket,
+            dimension=None if trend_dimension == "(none)" else trend_dimension
+        )
+        if not ticket_trend.empty:
+            # Years of hourly buckets are reduced to a few thousand points before charting
+            st.line_chart(downsample_series(ticket_trend))
+
+        # Counts come from the summary tables, kept up to date on every ticket write
+        st.subheader("Ticket Status Distribution (Line Graph)")
+        status_counts = get_summary_counts(conn, "tickets", "status")
+        if not status_counts.empty:
+            st.line_chart(status_counts)
+
+        st.subheader("Ticket Priority Distribution (Line Graph)")
+        priority_counts = get_summary_counts(conn, "tickets", "priority")
+        if not priority_counts.empty:
+            st.line_chart(priority_counts)
+
+        # Resolution-time percentiles come from t-digest sketches updated on insert,
+        # the ticket history is never scanned or sorted here
+        st.subheader("Resolution Time (SLA)")
+        sla_dimension = st.selectbox("Group by", ["priority", "assigned_to", "month", "all"], key="sla_dimension")
+        sla_df = get_resolution_quantiles(conn, sla_dimension)
+        if sla_df.empty:
+            st.info("No resolution times recorded yet.")
+        else:
+            st.dataframe(sla_df, use_container_width=True)
+
+        st.subheader("Tickets Assigned per Employee")
+        assigned_counts = get_summary_counts(conn, "tickets", "assigned_to")
+        if not assigned_counts.empty:
+            fig = px.pie(
+                names=assigned_counts.index,
+                values=assigned_counts.values,
+                title="Ticket Distribution by Employee"
             )
+            st.plotly_chart(fig, use_container_width=True)
+
+        # Reassign every open ticket so the weighted workload is even across employees
+        if st.button("⚖️ Rebalance open tickets"):
+            # Reads the open tickets and writes the new assignees in one writer transaction
+            changed = run_write(rebalance_open_tickets)
+            st.success(f"{changed} open tickets reassigned.")
+            st.rerun()
+            # AI CHAT BOX
+        import streamlit as st
+        import google.generativeai as genai
+        from app.services.retrieval_service import build_grounded_prompt
+        from app.services.llm_service import generate_reply
+        from app.data.chat_history import (
+            CHAT_WINDOW,
+            append_messages,
+            clear_chat_history,
+            count_messages,
+            get_recent_messages,
+            to_gemini_contents,
         )
 
-        # Extract the text reply from Gemini's response object
-        reply = response.text
+        with span("llm.setup"):
+            # Configure Gemini with your API key stored securely in Streamlit secrets.toml
+            genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
+
+            # Initialize the Gemini model (fast/free version)
+            model = genai.GenerativeModel("models/gemini-2.5-flash")
+
+        st.subheader("Gemini Cybersecurity Assistant")
+
+        # Chat history is stored per user and per domain page in SQLite.
+        # Only the most recent window is loaded and rendered; "Load older" widens it.
+        chat_user = st.session_state["username"]
+        chat_domain = "itoperations"
+        window_key = f"chat_window_{chat_domain}"
+        st.session_state.setdefault(window_key, CHAT_WINDOW)
+
+        with span("chat.history"):
+            messages = get_recent_messages(conn, chat_user, chat_domain, st.session_state[window_key])
+            message_count = count_messages(conn, chat_user, chat_domain)
+
+        # Offer to page back through older messages when the window does not show them all
+        if message_count > len(messages):
+            if st.button("⬆️ Load older messages"):
+                st.session_state[window_key] += CHAT_WINDOW
+                st.rerun()
+
+        # Display the messages of the current window in the chat interface
+        for message in messages:
+            role = "assistant" if message["role"] == "model" else message["role"]
+            with st.chat_message(role):
+                st.markdown(message["text"])
+
+        # Sidebar with controls
+        with st.sidebar:
+            st.title("💬 Chat Controls")
+            st.metric("Messages", message_count)
+
+            #  Clear Chat button
+            if st.button("🗑️ Clear Chat", use_container_width=True):
+                run_write(clear_chat_history, chat_user, chat_domain)
+                st.session_state[window_key] = CHAT_WINDOW
+                st.rerun()
+
+        # Input box for the user to type a new question
+        prompt = st.chat_input("Pose ta question...")
+
+        if prompt:
+            # Show the question right away, it is saved together with the reply
+            with st.chat_message("user"):
+                st.markdown(prompt)
+
+            try:
+                # Ground the latest question in our own records: only the most relevant
+                # rows are packed into the prompt, the stored history keeps the raw question
+                with span("llm.retrieval"):
+                    grounded_prompt = build_grounded_prompt(conn, prompt, domain=chat_domain)
+
+                # Only the last CHAT_WINDOW messages are sent as context, however far back
+                # the user paged in the rendered history
+                contents = to_gemini_contents(messages[-CHAT_WINDOW:]) + [{
+                    "role": "user",
+                    "parts": [{"text": grounded_prompt}]
+                }]
+
+                # Send the conversation history to Gemini for response generation
+                # (latency, tokens and errors are recorded in the telemetry table)
+                with span("llm.generate"):
+                    reply = generate_reply(
+                        model,
+                        contents,
+                        genai.types.GenerationConfig(
+                            temperature=0.7,        # Controls creativity (higher = more creative)
+                            max_output_tokens=512   # Limits the length of the response
+                        ),
+                        chat_user,
+                        chat_domain
+                    )
 
-        # Display Gemini's reply in the chat interface
-        with st.chat_message("assistant"):
-            st.markdown(reply)
+                # Display Gemini's reply in the chat interface
+                with st.chat_message("assistant"):
+                    st.markdown(reply)
 
-        # Save Gemini's reply into session state for future context
-        st.session_state.messages.append({
-            "role": "model",
-            "parts": [{"text": reply}]
-        })
+                # Append the question and the reply to the stored history in one batch
+                run_write(append_messages, chat_user, chat_domain, [("user", prompt), ("model", reply)])
 
-        # Rerun the app to refresh the chat interface with the new message
-        st.rerun()
+                # Rerun the app to refresh the chat interface with the new message
+                st.rerun()
 
-    except Exception as e:
-        # Display any error that occurs during the API call
-        st.error(f"Erreur Gemini: {e}")
+            except Exception as e:
+                # Display any error that occurs during the API call
+                st.error(f"Erreur Gemini: {e}")
 
-# CUSTOM CSS
-# References:
-# - Streamlit Docs – Colors and borders customization
-# - YouTube – Custom Streamlit Background Image/Color Gradient through CSS
-# - GitHub – streamlit-css-styling-demo
-page_bg_css = """
+        # CUSTOM CSS
+        # References:
+        # - Streamlit Docs – Colors and borders customization
+        # - YouTube – Custom Streamlit Background Image/Color Gradient through CSS
+        # - GitHub – streamlit-css-styling-demo
+        page_bg_css = """
 <style>
 [data-testid="stAppViewContainer"] {
     background: linear-gradient(135deg, #4B0082, #8A2BE2, #DA70D6);
@@ -185,7 +325,12 @@ page_bg_css = """
 }
 </style>
 """
-st.markdown(page_bg_css, unsafe_allow_html=True)
-
-conn.close()
-
+        st.markdown(page_bg_css, unsafe_allow_html=True)
+
+    # ---------------- PAGE TIMINGS (ADMIN) ----------------
+    # Slowest phases of the recent runs of this page, from the tracing spans
+    if st.session_state.get("role") == "admin" and tracing_enabled():
+        with st.sidebar.expander("⏱️ Page timings"):
+            st.dataframe(phase_summary("itoperations"), use_container_width=True)
+            st.caption("Last run")
+            st.dataframe(last_trace("itoperations"), use_container_width=True)
@@ -1,7 +1,170 @@
+import os
+import threading
+from typing import Optional
+
 import bcrypt
 
+try:
+    import fcntl  # Advisory file locks on Linux / macOS
+except ImportError:
+    fcntl = None
+    import msvcrt  # Byte-range locks on Windows
+
 USER_DATA_FILE: str = "users.txt"
 
+# Compact the file once this many of its lines are duplicates or malformed
+COMPACT_MIN_DEAD_LINES: int = 1000
+COMPACT_DEAD_RATIO: float = 0.25
+
+
+class FileLock:
+    """
+    Exclusive advisory lock on '<path>.lock', shared by every process using
+    the user file. A separate lock file is used because compaction replaces
+    the user file itself.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.lock_path: str = path + ".lock"
+        self.handle = None
+
+    def __enter__(self) -> "FileLock":
+        self.handle = open(self.lock_path, "a+")
+        if fcntl is not None:
+            fcntl.flock(self.handle, fcntl.LOCK_EX)
+        else:
+            self.handle.seek(0)
+            msvcrt.locking(self.handle.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if fcntl is not None:
+            fcntl.flock(self.handle, fcntl.LOCK_UN)
+        else:
+            self.handle.seek(0)
+            msvcrt.locking(self.handle.fileno(), msvcrt.LK_UNLCK, 1)
+        self.handle.close()
+
+
+class UserStore:
+    """
+    In-memory index (username -> (hash, role)) of the user file.
+    Each lookup only checks the file's inode, size and mtime: the index is
+    reloaded when the file was replaced, and only the appended bytes are
+    parsed when it grew. Appends happen under an exclusive file lock, and
+    the file is compacted in the background when it holds many dead lines.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        self.index: dict[str, tuple[str, str]] = {}
+        self.signature: Optional[tuple[int, int, int]] = None  # (inode, size, mtime_ns) of the indexed file
+        self.offset: int = 0            # Bytes of the file already parsed
+        self.lines: int = 0             # Lines parsed, valid or not
+        self.lock = threading.Lock()
+        self.compacting: bool = False
+
+    def _parse(self, data: bytes) -> None:
+        for raw in data.decode("utf-8").splitlines():
+            self.lines += 1
+            parts = raw.strip().split(",")
+            if len(parts) == 3 and parts[0]:
+                # The first registration of a username wins, as with a top-down scan
+                self.index.setdefault(parts[0], (parts[1], parts[2]))
+
+    def refresh(self) -> None:
+        """
+        Bring the index up to date with the file (a stat call when nothing changed).
+        """
+        with self.lock:
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                self.index, self.signature, self.offset, self.lines = {}, None, 0, 0
+                return
+
+            signature = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+            if signature == self.signature:
+                return
+
+            appended = self.signature is not None and stat.st_ino == self.signature[0] and stat.st_size >= self.offset
+            if not appended:
+                # New or rewritten file: index it from the start
+                self.index, self.offset, self.lines = {}, 0, 0
+
+            with open(self.path, "rb") as f:
+                f.seek(self.offset)
+                data = f.read()
+            # A line still being written by another process is left for the next refresh
+            complete = data.rfind(b"\n") + 1
+            self._parse(data[:complete])
+            self.offset += complete
+            self.signature = (stat.st_ino, self.offset, stat.st_mtime_ns) if complete < len(data) else signature
+
+        self._maybe_compact()
+
+    def get(self, username: str) -> Optional[tuple[str, str]]:
+        """
+        Return (hashed_password, role) for a username, or None.
+        """
+        self.refresh()
+        return self.index.get(username)
+
+    def add(self, username: str, hashed: str, role: str) -> bool:
+        """
+        Append a user under the file lock. The existence check is repeated
+        inside the lock so two concurrent registrations cannot both succeed.
+        Returns False if the username is already taken.
+        """
+        with FileLock(self.path):
+            self.refresh()
+            if username in self.index:
+                return False
+            with open(self.path, "a") as f:
+                f.write(f"{username},{hashed},{role}\n")
+                f.flush()
+                os.fsync(f.fileno())
+        self.refresh()
+        return True
+
+    def _maybe_compact(self) -> None:
+        dead = self.lines - len(self.index)
+        if dead >= COMPACT_MIN_DEAD_LINES and dead >= COMPACT_DEAD_RATIO * self.lines and not self.compacting:
+            self.compacting = True
+            threading.Thread(target=self.compact, name="user-store-compaction", daemon=True).start()
+
+    def compact(self) -> None:
+        """
+        Rewrite the file with one line per user (duplicates and malformed
+        lines dropped). The new file is written next to the old one and
+        swapped in atomically, under the lock so no append is lost.
+        """
+        try:
+            with FileLock(self.path):
+                self.refresh()
+                with self.lock:
+                    users = list(self.index.items())
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, "w") as f:
+                    for username, (hashed, role) in users:
+                        f.write(f"{username},{hashed},{role}\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+        finally:
+            self.compacting = False
+
+
+# One store per user file, shared by every caller in the process
+_stores: dict[str, UserStore] = {}
+
+
+def get_user_store(path: Optional[str] = None) -> UserStore:
+    path = path or USER_DATA_FILE
+    if path not in _stores:
+        _stores[path] = UserStore(path)
+    return _stores[path]
+
 def hash_password(plain_text_password: str) -> str:
     """
     Hashes a password using bcrypt with automatic salting.
@@ -20,11 +183,7 @@ def verify_password(plain_text_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_text_password.encode("utf-8"), hashed_password.encode("utf-8"))
 
 def user_exists(username: str) -> bool:
-    try:
-        with open(USER_DATA_FILE, "r") as f:
-            return any(line.startswith(username + ",") for line in f)
-    except FileNotFoundError:
-        return False
+    return get_user_store().get(username) is not None
 
 def validate_username(username: str) -> tuple[bool, str]:
     if not (3 <= len(username) <= 20) or not username.isalnum():
@@ -47,27 +206,27 @@ def register_user(username: str, password: str, role: str) -> bool:
         print(f"Error: Username '{username}' already exists.")
         return False
     hashed: str = hash_password(password)
-    with open(USER_DATA_FILE, "a") as f:
-        f.write(f"{username},{hashed},{role.lower()}\n")
+    if not get_user_store().add(username, hashed, role.lower()):
+        # Registered by someone else while the password was being hashed
+        print(f"Error: Username '{username}' already exists.")
+        return False
     print(f"Success: User '{username}' registered with role '{role}'.")
     return True
 
 def login_user(username: str, password: str) -> bool:
-    try:
-        with open(USER_DATA_FILE, "r") as f:
-            for line in f:
-                stored_username, stored_hash, stored_role = line.strip().split(",")
-                if stored_username == username:
-                    if verify_password(password, stored_hash):
-                        print(f"Success: Welcome, {username}! Your role is '{stored_role}'.")
-                        return True
-                    else:
-                        print("Error: Invalid password.")
-                        return False
+    if not os.path.exists(USER_DATA_FILE):
+        print("Error: No users registered yet.")
+        return False
+    user = get_user_store().get(username)
+    if user is None:
         print("Error: Username not found.")
         return False
-    except FileNotFoundError:
-        print("Error: No users registered yet.")
+    stored_hash, stored_role = user
+    if verify_password(password, stored_hash):
+        print(f"Success: Welcome, {username}! Your role is '{stored_role}'.")
+        return True
+    else:
+        print("Error: Invalid password.")
         return False
 
 def display_menu() -> None:
@@ -0,0 +1,17 @@
+# ---------------------------------------------------------------
+# CPU scheduling simulator
+# Runs FCFS, SJF, SRTF, priority and round-robin scheduling on the same
+# workload with a discrete-event core, and compares their waiting,
+# turnaround and response time distributions.
+# Command line: python -m cpu_scheduling workload.csv [--quantum 4] [--gantt]
+# ---------------------------------------------------------------
+
+from cpu_scheduling.simulator import (
+    ALGORITHMS,
+    compare_algorithms,
+    load_workload,
+    simulate,
+    summarize,
+)
+
+__all__ = ["ALGORITHMS", "compare_algorithms", "load_workload", "simulate", "summarize"]
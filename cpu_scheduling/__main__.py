@@ -0,0 +1,31 @@
+import argparse
+import time
+
+import pandas as pd
+
+from cpu_scheduling.simulator import ALGORITHMS, DEFAULT_QUANTUM, load_workload, simulate, summarize
+
+parser = argparse.ArgumentParser(description="Compare CPU scheduling algorithms on a CSV workload.")
+parser.add_argument("workload", help="CSV file with burst_time and optional arrival_time, priority columns")
+parser.add_argument("--algorithms", nargs="+", default=ALGORITHMS, choices=ALGORITHMS)
+parser.add_argument("--quantum", type=float, default=DEFAULT_QUANTUM, help="Round-robin time quantum")
+parser.add_argument("--gantt", action="store_true", help="Print the Gantt segments of each run")
+args = parser.parse_args()
+
+arrival, burst, priority = load_workload(args.workload)
+
+rows = []
+for algorithm in args.algorithms:
+    started = time.perf_counter()
+    result = simulate(arrival, burst, priority, algorithm, args.quantum, gantt=args.gantt)
+    summary = summarize(result)
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    rows.append(summary)
+
+    if args.gantt:
+        print(f"\n--- {algorithm.upper()} Gantt chart ---")
+        for pid, start, end in result["gantt"]:
+            print(f"P{pid}\t{start:g} -> {end:g}")
+
+print()
+print(pd.DataFrame(rows).set_index("algorithm").round(2).T.to_string())
@@ -0,0 +1,186 @@
+import heapq
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+# Non-preemptive policies pick the next process when the CPU becomes free;
+# preemptive ones may also switch when a process arrives.
+ALGORITHMS = ["fcfs", "sjf", "srtf", "priority", "rr"]
+PREEMPTIVE = {"srtf"}
+
+DEFAULT_QUANTUM = 4
+
+
+def _ready_key(algorithm, arrival, burst, remaining, priority, pid):
+    """
+    Heap key of a ready process: the smallest key runs first.
+    Ties are broken by arrival time, then by process index (input order).
+    """
+    if algorithm == "fcfs":
+        return (arrival[pid], pid)
+    if algorithm == "sjf":
+        return (burst[pid], arrival[pid], pid)
+    if algorithm == "srtf":
+        return (remaining[pid], arrival[pid], pid)
+    if algorithm == "priority":
+        # Lower number = higher priority
+        return (priority[pid], arrival[pid], pid)
+    raise ValueError(f"Unknown algorithm '{algorithm}', expected one of {ALGORITHMS}")
+
+
+# ---------------------------
+# DISCRETE-EVENT SIMULATION
+# ---------------------------
+def simulate(arrival, burst, priority=None, algorithm="fcfs", quantum=DEFAULT_QUANTUM, gantt=False):
+    """
+    Simulate one scheduling policy on a workload.
+    arrival, burst and priority are array-likes indexed by process.
+    The clock jumps from event to event (an arrival, a completion, the end of
+    a round-robin quantum) instead of ticking, and the ready queue is a heap
+    (a FIFO for round-robin), so each event costs O(log n).
+    Returns a dict with per-process NumPy arrays (start, completion, waiting,
+    turnaround, response) and, when gantt is True, the list of
+    (process, start, end) segments in execution order.
+    """
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown algorithm '{algorithm}', expected one of {ALGORITHMS}")
+
+    arrival = np.asarray(arrival, dtype=np.float64)
+    burst = np.asarray(burst, dtype=np.float64)
+    n = len(burst)
+    priority = np.zeros(n) if priority is None else np.asarray(priority, dtype=np.float64)
+    if arrival.shape != burst.shape or priority.shape != burst.shape:
+        raise ValueError("arrival, burst and priority must have the same length")
+
+    # Arrival events in time order (stable: input order among equal arrivals)
+    order = np.argsort(arrival, kind="stable").tolist()
+    arrival_list, burst_list, priority_list = arrival.tolist(), burst.tolist(), priority.tolist()
+    remaining = list(burst_list)
+    first_start = [None] * n
+    completion = [0.0] * n
+    segments = []
+
+    round_robin = algorithm == "rr"
+    preemptive = algorithm in PREEMPTIVE
+    ready = deque() if round_robin else []
+
+    def key(pid):
+        return _ready_key(algorithm, arrival_list, burst_list, remaining, priority_list, pid)
+
+    def admit(now):
+        # Move every process arrived by `now` into the ready queue
+        nonlocal next_arrival
+        while next_arrival < n and arrival_list[order[next_arrival]] <= now:
+            pid = order[next_arrival]
+            if round_robin:
+                ready.append(pid)
+            else:
+                heapq.heappush(ready, (key(pid), pid))
+            next_arrival += 1
+
+    clock = 0.0
+    next_arrival = 0
+    finished = 0
+    running = None
+    segment_start = 0.0
+
+    while finished < n:
+        if running is None:
+            if not ready:
+                # CPU idle: jump to the next arrival
+                clock = max(clock, arrival_list[order[next_arrival]])
+            admit(clock)
+            running = ready.popleft() if round_robin else heapq.heappop(ready)[1]
+            if first_start[running] is None:
+                first_start[running] = clock
+            segment_start = clock
+
+        run_until = clock + remaining[running]
+        if round_robin:
+            run_until = min(run_until, clock + quantum)
+
+        if preemptive and next_arrival < n and arrival_list[order[next_arrival]] < run_until:
+            # An arrival happens first: run until then and check if it should take over
+            now = arrival_list[order[next_arrival]]
+            remaining[running] -= now - clock
+            clock = now
+            admit(clock)
+            if ready and ready[0][0] < key(running):
+                if gantt and clock > segment_start:
+                    segments.append((running, segment_start, clock))
+                heapq.heappush(ready, (key(running), running))
+                running = None
+            continue
+
+        remaining[running] -= run_until - clock
+        clock = run_until
+        # Processes arriving during the slice queue up before a preempted RR process
+        admit(clock)
+        if gantt:
+            segments.append((running, segment_start, clock))
+
+        if remaining[running] <= 1e-9:
+            completion[running] = clock
+            finished += 1
+        else:
+            ready.append(running)   # Only round-robin gets here: back of the queue
+        running = None
+
+    completion = np.array(completion)
+    start = np.array(first_start, dtype=np.float64)
+    result = {
+        "algorithm": algorithm,
+        "start": start,
+        "completion": completion,
+        "turnaround": completion - arrival,
+        "waiting": completion - arrival - burst,
+        "response": start - arrival,
+    }
+    if gantt:
+        result["gantt"] = segments
+    return result
+
+
+# ---------------------------
+# STATISTICS AND COMPARISON
+# ---------------------------
+def summarize(result, percentiles=(50, 90, 99)):
+    """
+    Distribution of waiting, turnaround and response times of one run,
+    as a flat dict (mean, percentiles, max for each metric).
+    """
+    summary = {"algorithm": result["algorithm"]}
+    if len(result["completion"]) == 0:
+        return summary
+    for metric in ("waiting", "turnaround", "response"):
+        values = result[metric]
+        summary[f"{metric}_mean"] = float(values.mean())
+        for p, value in zip(percentiles, np.percentile(values, percentiles)):
+            summary[f"{metric}_p{p}"] = float(value)
+        summary[f"{metric}_max"] = float(values.max())
+    summary["makespan"] = float(result["completion"].max())
+    return summary
+
+
+def compare_algorithms(arrival, burst, priority=None, algorithms=ALGORITHMS, quantum=DEFAULT_QUANTUM):
+    """
+    Run several policies on the same workload and return one row of
+    statistics per algorithm as a DataFrame.
+    """
+    return pd.DataFrame([
+        summarize(simulate(arrival, burst, priority, algorithm, quantum))
+        for algorithm in algorithms
+    ]).set_index("algorithm")
+
+
+def load_workload(path):
+    """
+    Read a CSV workload with burst_time and optional arrival_time and
+    priority columns. Returns (arrival, burst, priority) NumPy arrays.
+    """
+    df = pd.read_csv(path)
+    burst = df["burst_time"].to_numpy(dtype=np.float64)
+    arrival = df["arrival_time"].to_numpy(dtype=np.float64) if "arrival_time" in df else np.zeros(len(df))
+    priority = df["priority"].to_numpy(dtype=np.float64) if "priority" in df else None
+    return arrival, burst, priority